@@ -0,0 +1,200 @@
+"""
+Benchmark processing a 200-routine webhook with the slotted analytics models
+and their cached derived values, against plain dataclasses that recompute
+them on every access (the models as they were before).
+
+Each iteration runs what POST /analytics/process does: parse the webhook,
+generate insights and convert the snapshot for storage.
+
+Run from the repository root:
+
+    python benchmarks/analytics_models_benchmark.py
+"""
+
+import random
+import sys
+import timeit
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+from datetime import datetime
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.analytics import processor as processor_module  # noqa: E402
+from src.analytics.insights import InsightsGenerator  # noqa: E402
+from src.analytics.models import CompletionUnit, PeriodUnit, Pillar  # noqa: E402
+from src.analytics.processor import AnalyticsProcessor  # noqa: E402
+from src.analytics.storage import AnalyticsStorage  # noqa: E402
+
+ROUTINES = 200
+PERIODS = 12
+
+
+@dataclass
+class LegacyCompletionStatistic:
+    completion_rate: int
+    completion_rate_period_unit: PeriodUnit
+    period_sequence_no: int
+    completion_unit: CompletionUnit
+    completion_target_total: float
+    completed_value_total: float
+
+    @property
+    def completion_percentage(self) -> float:
+        if self.completion_target_total == 0:
+            return 0.0
+        return (self.completed_value_total / self.completion_target_total) * 100
+
+
+@dataclass
+class LegacyPillarCompletion:
+    pillar: Pillar
+    completion_rate: float
+    total_routines: int
+    completed_routines: int
+
+    @property
+    def success_rate(self) -> float:
+        if self.total_routines == 0:
+            return 0.0
+        return (self.completed_routines / self.total_routines) * 100
+
+
+@dataclass
+class LegacyRoutineCompletion:
+    routine_id: str
+    routine_name: str
+    pillar: Pillar
+    completion_stats: List[LegacyCompletionStatistic] = field(default_factory=list)
+    schedule_changes: List[Dict] = field(default_factory=list)
+
+    @property
+    def average_completion_rate(self) -> float:
+        if not self.completion_stats:
+            return 0.0
+        return sum(stat.completion_percentage for stat in self.completion_stats) / len(self.completion_stats)
+
+    @property
+    def trend(self) -> str:
+        if len(self.completion_stats) < 2:
+            return "insufficient_data"
+        recent = self.completion_stats[-3:]
+        first_half_avg = sum(stat.completion_percentage for stat in recent[:len(recent)//2]) / (len(recent)//2)
+        second_half_avg = sum(stat.completion_percentage for stat in recent[len(recent)//2:]) / (len(recent) - len(recent)//2)
+        if second_half_avg > first_half_avg * 1.1:
+            return "improving"
+        elif second_half_avg < first_half_avg * 0.9:
+            return "declining"
+        return "stable"
+
+
+@dataclass
+class LegacyUserAnalytics:
+    user_id: str
+    timestamp: datetime
+    pillar_completions: Dict[str, LegacyPillarCompletion]
+    routine_completions: Dict[str, LegacyRoutineCompletion]
+    overall_completion_rate: float
+    engagement_score: float
+
+    @property
+    def struggling_routines(self):
+        return [r for r in self.routine_completions.values() if r.average_completion_rate < 50.0]
+
+    @property
+    def successful_routines(self):
+        return [r for r in self.routine_completions.values() if r.average_completion_rate >= 80.0]
+
+    @property
+    def pillar_rankings(self):
+        rankings = [(pillar, data.success_rate) for pillar, data in self.pillar_completions.items()]
+        return sorted(rankings, key=lambda x: x[1], reverse=True)
+
+
+@contextmanager
+def legacy_models():
+    """Make the processor build the legacy models instead."""
+    with patch.multiple(
+        processor_module,
+        CompletionStatistic=LegacyCompletionStatistic,
+        PillarCompletion=LegacyPillarCompletion,
+        RoutineCompletion=LegacyRoutineCompletion,
+        UserAnalytics=LegacyUserAnalytics
+    ):
+        yield
+
+
+def make_webhook(seed=0):
+    rng = random.Random(seed)
+    pillars = [pillar.value for pillar in Pillar]
+    routine_stats, completion_statistics = {}, []
+    for i in range(ROUTINES):
+        routine_id = f"r{i}"
+        routine_stats[routine_id] = {'name': f"Routine {i}", 'pillar': pillars[i % len(pillars)]}
+        for period in range(PERIODS):
+            target = rng.choice([3, 5, 7])
+            completion_statistics.append({
+                'routineId': routine_id,
+                'completionRate': 0,
+                'completionRatePeriodUnit': 'WEEK',
+                'periodSequenceNo': period,
+                'completionUnit': 'ROUTINE',
+                'completionTargetTotal': target,
+                'completedValueTotal': rng.randint(0, target)
+            })
+    return {
+        'userId': 'benchmark',
+        'pillarCompletionStats': {
+            pillar: {'completionRate': rng.uniform(0, 100), 'totalRoutines': 30, 'completedRoutines': rng.randint(0, 30)}
+            for pillar in pillars
+        },
+        'routineCompletionStats': routine_stats,
+        'completionStatistics': completion_statistics
+    }
+
+
+def handle(processor, insights, webhook):
+    analytics = processor.process_webhook_data(webhook)
+    insights.generate_insights(analytics)
+    return AnalyticsStorage.analytics_to_dict(analytics)
+
+
+def best_of(fn, repeat=5, number=10):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number * 1000
+
+
+def parsed_size(processor, webhook):
+    tracemalloc.start()
+    analytics = processor.process_webhook_data(webhook)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del analytics
+    return size / 1024
+
+
+def main():
+    processor, insights, webhook = AnalyticsProcessor(), InsightsGenerator(), make_webhook()
+    print(f"{ROUTINES} routines x {PERIODS} periods; best-of-5 means")
+
+    with legacy_models():
+        legacy_result = handle(processor, insights, webhook)
+        legacy_time = best_of(lambda: handle(processor, insights, webhook))
+        legacy_size = parsed_size(processor, webhook)
+    result = handle(processor, insights, webhook)
+    slotted_time = best_of(lambda: handle(processor, insights, webhook))
+    slotted_size = parsed_size(processor, webhook)
+
+    assert {k: v for k, v in result.items() if k != 'timestamp'} == \
+        {k: v for k, v in legacy_result.items() if k != 'timestamp'}
+    print(f"{'models':>8} {'request ms':>11} {'parsed KiB':>11}")
+    print(f"{'legacy':>8} {legacy_time:>11.2f} {legacy_size:>11.1f}")
+    print(f"{'slotted':>8} {slotted_time:>11.2f} {slotted_size:>11.1f}")
+    print(f"speed-up {legacy_time / slotted_time:.1f}x, memory {slotted_size / legacy_size:.0%} of legacy")
+
+
+if __name__ == "__main__":
+    main()
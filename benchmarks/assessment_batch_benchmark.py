@@ -0,0 +1,49 @@
+"""
+Benchmark scoring many questionnaires with HealthAssessment.score_batch
+against one HealthAssessment per questionnaire.
+
+Run from the repository root:
+
+    python benchmarks/assessment_batch_benchmark.py [--users 20000]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.assessments.health_assessment import HealthAssessment  # noqa: E402
+from tests.assessments.test_batch_scoring import flatten, random_questionnaire  # noqa: E402
+
+
+def per_user(questionnaires):
+    """The previous approach: one HealthAssessment (and its debug output) per user."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [HealthAssessment(**q).calculate_total_score() for q in questionnaires]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch assessment scoring benchmark")
+    parser.add_argument("--users", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    questionnaires = [random_questionnaire(rng) for _ in range(args.users)]
+    rows = [flatten(q) for q in questionnaires]
+
+    batch = HealthAssessment.score_batch(rows)
+    assert list(batch['total']) == per_user(questionnaires)
+
+    per_user_s = timeit.timeit(lambda: per_user(questionnaires), number=1)
+    batch_s = timeit.timeit(lambda: HealthAssessment.score_batch(rows), number=1)
+    print(f"{args.users} questionnaires: per-user {per_user_s * 1000:.0f} ms, "
+          f"batch {batch_s * 1000:.0f} ms ({per_user_s / batch_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
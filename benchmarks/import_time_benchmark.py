@@ -0,0 +1,66 @@
+"""
+Report how long importing the app takes (what each gunicorn worker and cold
+container start pays) and which modules dominate, from `python -X importtime`.
+
+Run from the repository root:
+
+    python benchmarks/import_time_benchmark.py [--module src.app] [--top 15]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Modules that should only be loaded on first use, not at boot
+LAZY_MODULES = ('numpy', 'scipy', 'scipy.stats', 'src.analytics.analytics_service', 'src.scheduling.scheduler')
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module):
+    """{module: (self_us, cumulative_us, depth)} for one fresh interpreter importing `module`."""
+    env = dict(os.environ, FLASK_ENV='testing')
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            profile[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time report")
+    parser.add_argument("--module", default="src.app")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+    totals = [profile[args.module][1] / 1000 for profile in profiles]
+    print(f"import {args.module}: median {statistics.median(totals):.0f} ms, "
+          f"min {min(totals):.0f} ms over {args.runs} runs")
+
+    profile = min(profiles, key=lambda p: p[args.module][1])
+    print(f"\nslowest top-level imports (cumulative ms, fastest run)")
+    direct = [(name, cumulative) for name, (_, cumulative, depth) in profile.items() if depth == 1]
+    for name, cumulative in sorted(direct, key=lambda item: -item[1])[:args.top]:
+        print(f"{cumulative / 1000:>9.1f}  {name}")
+
+    loaded = [name for name in LAZY_MODULES if name in profile]
+    print(f"\nlazy modules loaded at import: {', '.join(loaded) if loaded else 'none'}")
+    return 1 if loaded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
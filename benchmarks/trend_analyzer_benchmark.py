@@ -0,0 +1,127 @@
+"""
+Benchmark the batched trend computation against per-series linregress calls,
+and the pillar correlation matrix against pairwise pearsonr calls.
+
+Run from the repository root:
+
+    python benchmarks/trend_analyzer_benchmark.py
+"""
+
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from scipy import stats
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.analytics.trend_analyzer import TrendAnalyzer, _TrendInputs  # noqa: E402
+
+PILLARS = ['MOVEMENT', 'NUTRITION', 'SLEEP', 'SOCIAL', 'MINDFULNESS', 'COGNITION', 'ENVIRONMENT']
+ROUTINES = 40
+
+
+def make_history(n_points, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            'timestamp': (start + timedelta(days=t)).isoformat(),
+            'pillar_metrics': {
+                pillar: {
+                    'completion_score': rng.uniform(0, 100),
+                    'engagement_rate': rng.uniform(0, 1),
+                    'consistency_score': rng.uniform(0, 100)
+                }
+                for pillar in PILLARS
+            },
+            'routine_metrics': [
+                {'routine_id': i, 'routine_name': f'Routine {i}', 'adherence_rate': rng.uniform(0, 1)}
+                for i in range(ROUTINES)
+            ],
+            'engagement_metrics': {'engagement_score': rng.uniform(0, 100)},
+            'performance_indicators': {'habit_formation_index': rng.uniform(0, 100), 'completion_velocity': 'stable'}
+        }
+        for t in range(n_points)
+    ]
+
+
+def per_series_regressions(history):
+    """The previous approach: one Python list and one linregress call per series."""
+    series = {}
+    for metric in history:
+        for pillar, data in metric['pillar_metrics'].items():
+            for field in ('completion_score', 'engagement_rate', 'consistency_score'):
+                series.setdefault((pillar, field), []).append(data[field])
+        for routine in metric['routine_metrics']:
+            series.setdefault(routine['routine_id'], []).append(routine['adherence_rate'])
+        series.setdefault('engagement', []).append(metric['engagement_metrics']['engagement_score'])
+        series.setdefault('habit', []).append(metric['performance_indicators']['habit_formation_index'])
+    results = {}
+    for key, values in series.items():
+        results[key] = stats.linregress(np.arange(len(values)), values)
+        results[key, 'std'] = np.std(values)
+    return results
+
+
+def batched_regressions(history):
+    """The same regressions from aligned matrices, one batched pass per matrix."""
+    inputs = _TrendInputs(history)
+    for matrix in (inputs.completion, inputs.engagement, inputs.consistency, inputs.routines, inputs.overall):
+        matrix.volatility()
+        matrix.momentum()
+    return inputs
+
+
+def pairwise_correlations(history):
+    """The previous approach: np.std twice and one pearsonr call per pillar pair."""
+    scores = {}
+    for metric in history:
+        for pillar, data in metric['pillar_metrics'].items():
+            scores.setdefault(pillar, []).append(data['completion_score'])
+    pillars = list(scores)
+    correlations = {}
+    for i in range(len(pillars)):
+        for j in range(i + 1, len(pillars)):
+            first, second = scores[pillars[i]], scores[pillars[j]]
+            if np.std(first) > 0 and np.std(second) > 0:
+                correlations[pillars[i], pillars[j]] = stats.pearsonr(first, second)[0]
+    return correlations
+
+
+def batched_correlations(analyzer, inputs):
+    """One correlation matrix for all pillar pairs."""
+    return analyzer._analyze_pillar_correlations(inputs)
+
+
+def best_of(fn, repeat=5, number=20):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number * 1000
+
+
+def main():
+    analyzer = TrendAnalyzer()
+    print(f"{len(PILLARS)} pillars, {ROUTINES} routines; times are best-of-5 means in ms")
+    print(f"{'points':>7} {'per-series':>12} {'batched':>10} {'speed-up':>9} {'analyze_trends':>15}")
+    for n_points in (30, 90, 365):
+        history = make_history(n_points)
+        legacy = best_of(lambda: per_series_regressions(history))
+        batched = best_of(lambda: batched_regressions(history))
+        full = best_of(lambda: analyzer.analyze_trends(history), number=5)
+        print(f"{n_points:>7} {legacy:>12.2f} {batched:>10.2f} {legacy / batched:>8.1f}x {full:>15.2f}")
+
+    print()
+    print(f"pillar correlations ({len(PILLARS) * (len(PILLARS) - 1) // 2} pairs), ms")
+    print(f"{'points':>7} {'pairwise':>12} {'matrix':>10} {'speed-up':>9}")
+    for n_points in (30, 90, 365):
+        history = make_history(n_points)
+        inputs = _TrendInputs(history)
+        legacy = best_of(lambda: pairwise_correlations(history))
+        batched = best_of(lambda: batched_correlations(analyzer, inputs))
+        print(f"{n_points:>7} {legacy:>12.2f} {batched:>10.2f} {legacy / batched:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,34 @@
-"""Analytics module for processing and analyzing user completion data."""
+"""Analytics module for processing and analyzing user completion data.
 
-from .event_processor import EventProcessor
-from .metrics_calculator import MetricsCalculator
-from .trend_analyzer import TrendAnalyzer
-from .insights_engine import InsightsEngine
-from .analytics_service import AnalyticsService
+The public names are imported on first access: the analytics stack pulls in
+NumPy and SciPy, which blueprints should not pay for when they are imported.
+"""
 
-__all__ = ['EventProcessor', 'MetricsCalculator', 'TrendAnalyzer', 'InsightsEngine', 'AnalyticsService']
\ No newline at end of file
+import importlib
+
+_EXPORTS = {
+    'EventProcessor': '.event_processor',
+    'MetricsCalculator': '.metrics_calculator',
+    'TrendAnalyzer': '.trend_analyzer',
+    'InsightsEngine': '.insights_engine',
+    'AnalyticsService': '.analytics_service',
+    'get_analytics_pool': '.registry',
+    'get_event_analytics_pool': '.registry',
+    'get_analytics_service': '.registry',
+    'lazy_analytics_service': '.registry'
+}
+
+__all__ = ['EventProcessor', 'MetricsCalculator', 'TrendAnalyzer', 'InsightsEngine', 'AnalyticsService', 'get_analytics_pool', 'get_event_analytics_pool', 'get_analytics_service', 'lazy_analytics_service']
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
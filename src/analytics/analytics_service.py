@@ -1,9 +1,13 @@
 """Main analytics service that integrates all analytics components."""
 
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Sequence, Union
 from datetime import datetime
+import hashlib
 import logging
+import threading
 
+from src.models.action_plan import WebhookPayload
+from src.utils.cache import get_cache
 from .event_processor import EventProcessor
 from .metrics_calculator import MetricsCalculator
 from .trend_analyzer import TrendAnalyzer
@@ -11,67 +15,183 @@ from .insights_engine import InsightsEngine
 
 logger = logging.getLogger(__name__)
 
+# Rendered GET responses, keyed by account version so new events never see stale entries
+RESPONSE_CACHE_NAMESPACE = "analytics-responses"
+
+# Sections process_event can return; FULL_SECTIONS is the default response
+SECTIONS = ('summary', 'metrics', 'quick_recommendations', 'trends', 'insights', 'recommendations', 'alerts')
+FULL_SECTIONS = ('summary', 'metrics', 'trends', 'insights', 'recommendations', 'alerts')
+
+
+class AnalyticsRun:
+    """
+    The analytics stages of one event, each computed on first use:
+
+        analytics_data -> metrics -> history -> trends -> insights
+
+    A response only pulls the stages its sections need. Stages are locked
+    individually, so one thread can read the cheap sections while another
+    finishes the rest of the same run without recomputing anything.
+    """
+
+    _STAGES = ('analytics_data', 'metrics', 'history', 'trends', 'insights')
+
+    def __init__(
+        self,
+        service: 'AnalyticsService',
+        event_payload: Union[WebhookPayload, Dict[str, Any]],
+        stages: Optional[Dict[str, Any]] = None
+    ):
+        self.service = service
+        self.event = WebhookPayload.of(event_payload)
+        self.account_id = self.event.account_id
+        # Stages already computed elsewhere (e.g. by the request before handing off to a worker)
+        self._results: Dict[str, Any] = dict(stages or {})
+        self._locks = {stage: threading.Lock() for stage in self._STAGES}
+
+    def completed_stages(self) -> Dict[str, Any]:
+        """Results computed so far, to continue the run in another process."""
+        return dict(self._results)
+
+    def stage(self, name: str) -> Any:
+        with self._locks[name]:
+            if name not in self._results:
+                self._results[name] = getattr(self, f'_compute_{name}')()
+            return self._results[name]
+
+    def _compute_analytics_data(self):
+        return self.service.event_processor.process_completion_event(self.event)
+
+    def _compute_metrics(self):
+        # Also records the snapshot in the account's history
+        return self.service.metrics_calculator.calculate_metrics(self.stage('analytics_data'))
+
+    def _compute_history(self):
+        # The metrics stage records the current snapshot, so the window ends with it
+        self.stage('metrics')
+        return self.service.metrics_calculator.get_historical_metrics(self.account_id, days=30)
+
+    def _compute_trends(self):
+        # Pillar trends come from the running accumulators when the 30-day
+        # window holds the whole retained history
+        history = self.stage('history')
+        accumulators = self.service.metrics_calculator.get_trend_accumulators(self.account_id, window=len(history))
+        return self.service.trend_analyzer.analyze_trends(history, accumulators)
+
+    def _compute_insights(self):
+        # Extract health scores if available (would come from health score calculation)
+        health_scores = self.service._extract_health_scores(self.event)
+        return self.service.insights_engine.generate_insights(self.stage('metrics'), self.stage('trends'), health_scores)
+
+    def section(self, name: str) -> Any:
+        service = self.service
+        if name == 'summary':
+            return self.stage('analytics_data')['summary']
+        if name == 'metrics':
+            return {
+                'current': service._format_current_metrics(self.stage('metrics')),
+                'historical_summary': service._summarize_historical_metrics(self.stage('history'))
+            }
+        if name == 'quick_recommendations':
+            return service.insights_engine.quick_recommendations(self.stage('metrics'))
+        if name == 'trends':
+            return service._format_trends(self.stage('trends'))
+        if name == 'insights':
+            return service._format_insights(self.stage('insights'))
+        if name in ('recommendations', 'alerts'):
+            return self.stage('insights')[name]
+        raise ValueError(f"Unknown analytics section: {name}")
+
+    def response(self, sections: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """The process_event response with only `sections` (FULL_SECTIONS when omitted)."""
+        sections = FULL_SECTIONS if sections is None else sections
+        unknown = [name for name in sections if name not in SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown analytics sections: {', '.join(unknown)}")
+
+        # Every event must reach the history, whatever the caller reads
+        self.stage('metrics')
+        response = {
+            'account_id': self.account_id,
+            'action_plan_id': self.event.action_plan_unique_id,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        for name in sections:
+            response[name] = self.section(name)
+        return response
+
 
 class AnalyticsService:
     """Unified analytics service for processing completion events."""
     
+    # Days of history behind the pillar view
+    PILLAR_WINDOW_DAYS = 30
+    
     def __init__(self):
         self.event_processor = EventProcessor()
         self.metrics_calculator = MetricsCalculator()
         self.trend_analyzer = TrendAnalyzer()
         self.insights_engine = InsightsEngine()
+        self.response_cache = get_cache(RESPONSE_CACHE_NAMESPACE, backend="shared", max_entries=4096)
+    
+    def analytics_version(self, account_id: int) -> int:
+        """Version of the account's analytics state; changes whenever an event is processed."""
+        return self.metrics_calculator.history_store.version(account_id)
+    
+    def _response_state(self, account_id: int, days: Optional[int]) -> str:
+        """
+        The account's analytics version and, for a view over the last `days`,
+        its oldest snapshot in the window: without new events the version stays
+        the same while snapshots age out of the window.
+        """
+        version = self.analytics_version(account_id)
+        if days is None:
+            return str(version)
+        return f"{version}@{self.metrics_calculator.get_window_start(account_id, days) or ''}"
+    
+    def response_etag(self, account_id: int, name: str, params: str = '', days: Optional[int] = None) -> str:
+        """ETag of a GET view of the account; changes with the analytics version and the view's window."""
+        state = self._response_state(account_id, days)
+        digest = hashlib.sha1(f"{name}:{params}:{state}".encode()).hexdigest()[:12]
+        return f"{account_id}-{self.analytics_version(account_id)}-{digest}"
+    
+    def response_key(self, account_id: int, name: str, params: str = '', days: Optional[int] = None) -> str:
+        """Response cache key of a GET view at the account's current analytics version and window."""
+        return f"{account_id}:{self._response_state(account_id, days)}:{name}:{params}"
     
-    def process_event(self, event_payload: Dict[str, Any]) -> Dict[str, Any]:
+    def _cached_response(
+        self, account_id: int, name: str, params: str, days: int, render: Callable[[], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Render once per (account, version, window, view, params); all workers share the result."""
+        return self.response_cache.get_or_set(self.response_key(account_id, name, params, days), render)
+    
+    def start_run(
+        self, event_payload: Union[WebhookPayload, Dict[str, Any]], stages: Optional[Dict[str, Any]] = None
+    ) -> 'AnalyticsRun':
+        """Lazily evaluated analytics for one event, optionally resuming from `stages`; see AnalyticsRun."""
+        return AnalyticsRun(self, event_payload, stages)
+    
+    def process_event(
+        self,
+        event_payload: Union[WebhookPayload, Dict[str, Any]],
+        sections: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
         """
         Process a completion event and generate comprehensive analytics.
         
         Args:
-            event_payload: Event webhook payload
+            event_payload: Event webhook payload, raw or parsed
+            sections: Response sections to compute (see SECTIONS); all of
+                FULL_SECTIONS when omitted. Only the stages they need run.
             
         Returns:
             Complete analytics response including metrics, trends, and insights
         """
         try:
-            logger.info(f"Processing analytics event for account {event_payload.get('accountId')}")
-            
-            # Step 1: Process the raw event
-            analytics_data = self.event_processor.process_completion_event(event_payload)
-            
-            # Step 2: Calculate metrics
-            metrics = self.metrics_calculator.calculate_metrics(analytics_data)
-            
-            # Step 3: Get historical data for trend analysis
-            account_id = event_payload.get('accountId')
-            historical_metrics = self.metrics_calculator.get_historical_metrics(account_id, days=30)
-            historical_metrics.append(metrics)  # Include current metrics
-            
-            # Step 4: Analyze trends
-            trends = self.trend_analyzer.analyze_trends(historical_metrics)
-            
-            # Step 5: Generate insights
-            # Extract health scores if available (would come from health score calculation)
-            health_scores = self._extract_health_scores(event_payload)
-            # Add summary data to metrics for insights generation
-            metrics['summary'] = analytics_data['summary']
-            insights = self.insights_engine.generate_insights(metrics, trends, health_scores)
-            
-            # Compile complete response
-            response = {
-                'account_id': account_id,
-                'action_plan_id': event_payload.get('actionPlanUniqueId'),
-                'timestamp': datetime.utcnow().isoformat(),
-                'summary': analytics_data['summary'],
-                'metrics': {
-                    'current': self._format_current_metrics(metrics),
-                    'historical_summary': self._summarize_historical_metrics(historical_metrics)
-                },
-                'trends': self._format_trends(trends),
-                'insights': self._format_insights(insights),
-                'recommendations': insights['recommendations'],
-                'alerts': insights['alerts']
-            }
-            
-            logger.info(f"Analytics processing complete for account {account_id}")
+            run = self.start_run(event_payload)
+            logger.info(f"Processing analytics event for account {run.account_id}")
+            response = run.response(sections)
+            logger.info(f"Analytics processing complete for account {response['account_id']}")
             return response
             
         except Exception as e:
@@ -89,6 +209,11 @@ class AnalyticsService:
         Returns:
             Analytics summary
         """
+        return self._cached_response(
+            account_id, 'summary', str(days), days, lambda: self._render_analytics_summary(account_id, days)
+        )
+    
+    def _render_analytics_summary(self, account_id: int, days: int) -> Dict[str, Any]:
         try:
             # Get historical metrics
             historical_metrics = self.metrics_calculator.get_historical_metrics(account_id, days)
@@ -122,8 +247,13 @@ class AnalyticsService:
     
     def get_pillar_analytics(self, account_id: int, pillar: str) -> Dict[str, Any]:
         """Get detailed analytics for a specific pillar."""
+        return self._cached_response(
+            account_id, 'pillar', pillar, self.PILLAR_WINDOW_DAYS, lambda: self._render_pillar_analytics(account_id, pillar)
+        )
+    
+    def _render_pillar_analytics(self, account_id: int, pillar: str) -> Dict[str, Any]:
         try:
-            historical_metrics = self.metrics_calculator.get_historical_metrics(account_id, days=30)
+            historical_metrics = self.metrics_calculator.get_historical_metrics(account_id, days=self.PILLAR_WINDOW_DAYS)
             
             if not historical_metrics:
                 return {'status': 'no_data'}
@@ -137,7 +267,8 @@ class AnalyticsService:
                     pillar_history.append(pillar_data)
             
             # Analyze pillar trends
-            trends = self.trend_analyzer.analyze_trends(historical_metrics)
+            accumulators = self.metrics_calculator.get_trend_accumulators(account_id, window=len(historical_metrics))
+            trends = self.trend_analyzer.analyze_trends(historical_metrics, accumulators)
             pillar_trend = trends.get('pillar_trends', {}).get(pillar, {})
             
             return {
@@ -152,7 +283,38 @@ class AnalyticsService:
             logger.error(f"Error getting pillar analytics: {e}", exc_info=True)
             raise
     
-    def _extract_health_scores(self, event_payload: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    def get_population_analytics(self, account_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Distribution of the pillar metrics and habit-formation index across all accounts.
+        
+        Args:
+            account_id: Also place this account's latest snapshot within the population
+            
+        Returns:
+            Population quantiles, plus the account's percentile ranks if requested
+        """
+        population = self.metrics_calculator.population
+        if account_id is None:
+            return {'population': population.summary()}
+        
+        latest = self.metrics_calculator.history_store.range(account_id, limit=1)
+        if not latest:
+            return {'status': 'no_data'}
+        return {
+            'population': population.summary(),
+            'account_id': account_id,
+            'timestamp': latest[0]['timestamp'],
+            'percentiles': population.percentile_ranks(latest[0])
+        }
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Current sizes of the analytics caches, for sizing containers."""
+        return {
+            'event_processor': self.event_processor.stats(),
+            'metrics_history': self.metrics_calculator.history_store.stats()
+        }
+    
+    def _extract_health_scores(self, event_payload: WebhookPayload) -> Optional[Dict[str, float]]:
         """Extract health scores from event payload if available."""
         # This would integrate with the health score calculation
         # For now, return None as health scores come from a separate process
@@ -1,8 +1,14 @@
 """Process incoming completion events and extract analytics data."""
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 from datetime import datetime
+from collections import deque
 import logging
+import threading
+
+from src.config import Config
+from src.models.action_plan import WebhookPayload
+from src.models.routine_stats import PillarCompletionStats, RoutineCompletion
 
 logger = logging.getLogger(__name__)
 
@@ -10,107 +16,78 @@ logger = logging.getLogger(__name__)
 class EventProcessor:
     """Process completion events from webhooks and extract analytics data."""
     
-    def __init__(self):
-        self.processed_events = []
+    def __init__(self, max_recent_events: Optional[int] = None):
+        self.processed_events = deque(maxlen=max_recent_events or Config.ANALYTICS_RECENT_EVENTS)
+        self._lock = threading.Lock()
     
-    def process_completion_event(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    def process_completion_event(self, payload: Union[WebhookPayload, Dict[str, Any]]) -> Dict[str, Any]:
         """
         Process a completion event payload and extract analytics data.
         
         Args:
-            payload: The webhook payload containing completion statistics
+            payload: The webhook payload containing completion statistics,
+                raw or already parsed
             
         Returns:
             Processed analytics data
         """
-        logger.info(f"Processing completion event for account {payload.get('accountId')}")
+        event = WebhookPayload.of(payload)
+        logger.info(f"Processing completion event for account {event.account_id}")
         
         analytics_data = {
-            'account_id': payload.get('accountId'),
-            'action_plan_id': payload.get('actionPlanUniqueId'),
-            'start_date': payload.get('startDate'),
-            'period_days': payload.get('periodInDays'),
+            'account_id': event.account_id,
+            'action_plan_id': event.action_plan_unique_id,
+            'start_date': event.start_date,
+            'period_days': event.period_in_days,
             'timestamp': datetime.utcnow().isoformat(),
-            'pillar_analytics': self._process_pillar_stats(payload.get('pillarCompletionStats', [])),
-            'change_events': self._process_change_log(payload.get('changeLog', [])),
+            'pillar_analytics': self._process_pillar_stats(event.pillar_completion_stats),
+            'change_events': self._process_change_log(event.change_log),
             'summary': {}
         }
         
         # Calculate summary statistics
         analytics_data['summary'] = self._calculate_summary(analytics_data['pillar_analytics'])
         
-        self.processed_events.append(analytics_data)
+        with self._lock:
+            self.processed_events.append(analytics_data)
         return analytics_data
     
-    def _process_pillar_stats(self, pillar_stats: List[Dict]) -> Dict[str, Any]:
-        """Process pillar completion statistics."""
+    def _process_pillar_stats(self, pillars: List[PillarCompletionStats]) -> Dict[str, Any]:
+        """Process pillar completion statistics; the totals come precomputed with the payload."""
         pillar_analytics = {}
         
-        for pillar in pillar_stats:
-            pillar_enum = pillar.get('pillarEnum')
-            routines = pillar.get('routineCompletionStats', [])
-            
-            pillar_data = {
-                'total_routines': len(routines),
-                'routines_with_data': 0,
-                'total_completions': 0,
-                'completion_by_period': {'week': {}, 'month': {}},
-                'routine_details': []
+        for pillar in pillars:
+            pillar_analytics[pillar.pillar_enum] = {
+                'total_routines': len(pillar.routine_completions),
+                'routines_with_data': pillar.routines_with_data,
+                'total_completions': pillar.total_completions,
+                'completion_by_period': {unit: dict(periods) for unit, periods in pillar.completion_by_period.items()},
+                'routine_details': [self._process_routine_stats(routine) for routine in pillar.routine_completions],
+                'engagement_rate': pillar.engagement_rate
             }
-            
-            for routine in routines:
-                routine_info = self._process_routine_stats(routine)
-                if routine_info['has_completion_data']:
-                    pillar_data['routines_with_data'] += 1
-                pillar_data['total_completions'] += routine_info['total_completions']
-                pillar_data['routine_details'].append(routine_info)
-                
-                # Aggregate completion by period
-                for stat in routine_info['completion_stats']:
-                    period_unit = stat['period_unit'].lower()
-                    period_no = stat['period_sequence']
-                    
-                    if period_no not in pillar_data['completion_by_period'][period_unit]:
-                        pillar_data['completion_by_period'][period_unit][period_no] = 0
-                    
-                    pillar_data['completion_by_period'][period_unit][period_no] += stat['completion_rate']
-            
-            # Calculate engagement rate
-            if pillar_data['total_routines'] > 0:
-                pillar_data['engagement_rate'] = pillar_data['routines_with_data'] / pillar_data['total_routines']
-            else:
-                pillar_data['engagement_rate'] = 0
-            
-            pillar_analytics[pillar_enum] = pillar_data
         
         return pillar_analytics
     
-    def _process_routine_stats(self, routine: Dict) -> Dict[str, Any]:
+    def _process_routine_stats(self, routine: RoutineCompletion) -> Dict[str, Any]:
         """Process individual routine completion statistics."""
-        completion_stats = routine.get('completionStatistics', [])
-        
-        routine_info = {
-            'routine_id': routine.get('routineUniqueId'),
-            'display_name': routine.get('displayName'),
-            'schedule_category': routine.get('scheduleCategory'),
-            'has_completion_data': len(completion_stats) > 0,
-            'total_completions': 0,
-            'completion_stats': []
+        return {
+            'routine_id': routine.routine_unique_id,
+            'display_name': routine.display_name,
+            'schedule_category': routine.schedule_category,
+            'has_completion_data': routine.has_completion_data,
+            'total_completions': routine.total_completions,
+            'completion_stats': [
+                {
+                    'completion_rate': stat.completion_rate,
+                    'period_unit': stat.completion_rate_period_unit,
+                    'period_sequence': stat.period_sequence_no,
+                    'completion_unit': stat.completion_unit,
+                    'target_total': stat.completion_target_total,
+                    'completed_total': stat.completed_value_total
+                }
+                for stat in routine.completion_statistics
+            ]
         }
-        
-        for stat in completion_stats:
-            stat_info = {
-                'completion_rate': stat.get('completionRate', 0),
-                'period_unit': stat.get('completionRatePeriodUnit', ''),
-                'period_sequence': stat.get('periodSequenceNo', 0),
-                'completion_unit': stat.get('completionUnit', ''),
-                'target_total': stat.get('completionTargetTotal', 0),
-                'completed_total': stat.get('completedValueTotal', 0)
-            }
-            routine_info['completion_stats'].append(stat_info)
-            routine_info['total_completions'] += stat_info['completion_rate']
-        
-        return routine_info
     
     def _process_change_log(self, change_log: List[Dict]) -> List[Dict[str, Any]]:
         """Process change log events."""
@@ -187,4 +164,10 @@ class EventProcessor:
     
     def get_recent_events(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent processed events."""
-        return self.processed_events[-limit:]
\ No newline at end of file
+        with self._lock:
+            return list(self.processed_events)[-limit:] if limit > 0 else []
+
+    def stats(self) -> Dict[str, Any]:
+        """Size of the recent-events ring buffer."""
+        with self._lock:
+            return {'recent_events': len(self.processed_events), 'max_recent_events': self.processed_events.maxlen}
\ No newline at end of file
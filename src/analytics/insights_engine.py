@@ -254,16 +254,8 @@ class InsightsEngine:
     
     def _generate_prioritized_recommendations(self, metrics: Dict[str, Any], trends: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate prioritized recommendations."""
-        recommendations = []
-        
         # Add system-generated recommendations
-        for rec in metrics['performance_indicators'].get('recommendations', []):
-            recommendations.append({
-                'priority': rec['priority'],
-                'category': rec['type'],
-                'recommendation': rec['message'],
-                'expected_impact': 'medium'
-            })
+        recommendations = self._system_recommendations(metrics)
         
         # Add trend-based recommendations
         predictions = trends.get('predictions', {})
@@ -304,6 +296,25 @@ class InsightsEngine:
         
         return recommendations[:5]  # Top 5 recommendations
     
+    def quick_recommendations(self, metrics: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Prioritized recommendations that need no trend data, from the metrics alone."""
+        recommendations = self._system_recommendations(metrics)
+        priority_order = {'high': 0, 'medium': 1, 'low': 2}
+        recommendations.sort(key=lambda x: priority_order.get(x['priority'], 3))
+        return recommendations[:5]
+    
+    def _system_recommendations(self, metrics: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Recommendations generated by MetricsCalculator, in insight format."""
+        return [
+            {
+                'priority': rec['priority'],
+                'category': rec['type'],
+                'recommendation': rec['message'],
+                'expected_impact': 'medium'
+            }
+            for rec in metrics['performance_indicators'].get('recommendations', [])
+        ]
+    
     def _identify_achievements(self, metrics: Dict[str, Any], trends: Dict[str, Any]) -> List[Dict[str, str]]:
         """Identify user achievements."""
         achievements = []
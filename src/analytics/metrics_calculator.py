@@ -5,14 +5,23 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 import logging
 
+from .metrics_store import MetricsHistoryStore, default_history_store
+from .online_stats import TrendAccumulators
+from .population import PopulationStats, default_population_stats
+
 logger = logging.getLogger(__name__)
 
 
 class MetricsCalculator:
     """Calculate analytics metrics from processed completion data."""
     
-    def __init__(self):
-        self.metrics_cache = {}
+    def __init__(
+        self,
+        history_store: Optional[MetricsHistoryStore] = None,
+        population: Optional[PopulationStats] = None
+    ):
+        self.history_store = history_store or default_history_store()
+        self.population = population or default_population_stats()
     
     def calculate_metrics(self, analytics_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -30,11 +39,18 @@ class MetricsCalculator:
             'pillar_metrics': self._calculate_pillar_metrics(analytics_data['pillar_analytics']),
             'routine_metrics': self._calculate_routine_metrics(analytics_data['pillar_analytics']),
             'engagement_metrics': self._calculate_engagement_metrics(analytics_data),
-            'performance_indicators': self._calculate_performance_indicators(analytics_data)
+            'performance_indicators': self._calculate_performance_indicators(analytics_data),
+            # Stored with the snapshot: summaries and insights read it back from history
+            'summary': analytics_data['summary']
         }
         
-        # Cache metrics for trend analysis
-        self._cache_metrics(metrics)
+        # Record metrics for trend analysis
+        self.history_store.append(metrics)
+        try:
+            self.population.add(metrics)
+        except Exception as e:
+            # Population percentiles are best effort; never fail the event over them
+            logger.warning(f"Failed to update population sketches: {e}")
         
         return metrics
     
@@ -340,26 +356,32 @@ class MetricsCalculator:
         
         return recommendations
     
-    def _cache_metrics(self, metrics: Dict[str, Any]):
-        """Cache metrics for historical analysis."""
-        account_id = metrics['account_id']
-        
-        if account_id not in self.metrics_cache:
-            self.metrics_cache[account_id] = []
-        
-        self.metrics_cache[account_id].append(metrics)
-        
-        # Keep only last 30 entries
-        self.metrics_cache[account_id] = self.metrics_cache[account_id][-30:]
-    
     def get_historical_metrics(self, account_id: int, days: int = 7) -> List[Dict[str, Any]]:
         """Get historical metrics for an account."""
-        if account_id not in self.metrics_cache:
-            return []
-        
-        cutoff = datetime.utcnow() - timedelta(days=days)
-        
-        return [
-            m for m in self.metrics_cache[account_id]
-            if datetime.fromisoformat(m['timestamp']) > cutoff
-        ]
\ No newline at end of file
+        return self.history_store.range(account_id, since=self._cutoff(days))
+    
+    def get_window_start(self, account_id: int, days: int) -> Optional[str]:
+        """
+        Timestamp of the oldest snapshot get_historical_metrics(account_id, days)
+        would return; it changes when a snapshot ages out of the window.
+        """
+        return self.history_store.oldest_timestamp(account_id, since=self._cutoff(days))
+    
+    @staticmethod
+    def _cutoff(days: int) -> str:
+        return (datetime.utcnow() - timedelta(days=days)).isoformat()
+    
+    def get_trend_accumulators(self, account_id: int, window: Optional[int] = None) -> Optional[TrendAccumulators]:
+        """
+        Running pillar trends over the account's stored history, updated on every snapshot.
+
+        Args:
+            account_id: Account to read
+            window: Number of stored snapshots the caller's history covers. The
+                accumulators span the whole retained history, so None is returned
+                when the window is shorter and the trends have to be computed
+                from the windowed history instead.
+        """
+        if window is not None and window < self.history_store.count(account_id):
+            return None
+        return self.history_store.trend_accumulators(account_id)
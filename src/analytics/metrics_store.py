@@ -0,0 +1,335 @@
+"""Metrics history shared by all workers, used for trend analysis."""
+
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+from src.config import Config
+
+from .online_stats import TrendAccumulators
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsHistoryStore(ABC):
+    """Per-account metrics snapshots, ordered by their ISO timestamp."""
+
+    # Whether other processes (gunicorn workers, pool workers) see the same history
+    shared = False
+
+    @abstractmethod
+    def append(self, metrics: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def range(
+        self,
+        account_id: Any,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Snapshots for an account, oldest first.
+
+        Args:
+            account_id: Account to read
+            since: Only snapshots strictly after this ISO timestamp
+            until: Only snapshots at or before this ISO timestamp
+            limit: Keep only the newest `limit` snapshots of the range
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def count(self, account_id: Any) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def oldest_timestamp(self, account_id: Any, since: Optional[str] = None) -> Optional[str]:
+        """Timestamp of the account's oldest snapshot strictly after `since`; None if there is none."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def version(self, account_id: Any) -> int:
+        """Incremented by every append for the account; 0 if it was never written to."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def trend_accumulators(self, account_id: Any) -> Optional[TrendAccumulators]:
+        """
+        Running pillar trends over the account's stored snapshots, kept up to
+        date by `append`; None if the account has no history.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Size of the history, for capacity planning."""
+        raise NotImplementedError
+
+
+class InMemoryMetricsHistoryStore(MetricsHistoryStore):
+    """
+    Process-local history; used when no shared store is wanted (e.g. tests, scripts).
+
+    Each account keeps its newest `retention` snapshots. Accounts are evicted
+    least-recently-used first once the snapshots exceed `max_bytes` in total,
+    measured as their JSON size.
+    """
+
+    def __init__(self, retention: int = 30, max_bytes: Optional[int] = None):
+        self.retention = retention
+        self.max_bytes = max_bytes
+        self._history = OrderedDict()  # account -> deque of (size, metrics)
+        self._accumulators: Dict[str, TrendAccumulators] = {}
+        # Kept when an account is evicted, so versions never go back
+        self._versions: Dict[str, int] = {}
+        self._bytes = 0
+        self.evicted_accounts = 0
+        self._lock = threading.Lock()
+
+    def append(self, metrics):
+        encoded = json.dumps(metrics)
+        entry = (len(encoded), json.loads(encoded))
+        account_id = str(metrics['account_id'])
+        with self._lock:
+            history = self._history.get(account_id)
+            if history is None:
+                history = self._history[account_id] = deque()
+            self._history.move_to_end(account_id)
+            history.append(entry)
+            self._bytes += entry[0]
+            self._versions[account_id] = self._versions.get(account_id, 0) + 1
+            accumulators = self._accumulators.setdefault(account_id, TrendAccumulators())
+            accumulators.add(entry[1])
+            while len(history) > self.retention:
+                size, expired = history.popleft()
+                self._bytes -= size
+                accumulators.remove(expired)
+            if self.max_bytes is not None:
+                # Never evict the account just written to
+                while self._bytes > self.max_bytes and len(self._history) > 1:
+                    evicted_id, evicted = self._history.popitem(last=False)
+                    self._bytes -= sum(size for size, _ in evicted)
+                    self._accumulators.pop(evicted_id, None)
+                    self.evicted_accounts += 1
+
+    def range(self, account_id, since=None, until=None, limit=None):
+        with self._lock:
+            history = self._history.get(str(account_id))
+            if history is None:
+                return []
+            self._history.move_to_end(str(account_id))
+            snapshots = [metrics for _, metrics in history]
+        selected = [
+            m for m in snapshots
+            if (since is None or m['timestamp'] > since) and (until is None or m['timestamp'] <= until)
+        ]
+        selected.sort(key=lambda m: m['timestamp'])
+        if limit is not None:
+            selected = selected[-limit:] if limit > 0 else []
+        return copy.deepcopy(selected)
+
+    def count(self, account_id):
+        with self._lock:
+            return len(self._history.get(str(account_id), ()))
+
+    def oldest_timestamp(self, account_id, since=None):
+        with self._lock:
+            timestamps = [
+                metrics['timestamp'] for _, metrics in self._history.get(str(account_id), ())
+                if since is None or metrics['timestamp'] > since
+            ]
+        return min(timestamps) if timestamps else None
+
+    def version(self, account_id):
+        with self._lock:
+            return self._versions.get(str(account_id), 0)
+
+    def trend_accumulators(self, account_id):
+        with self._lock:
+            accumulators = self._accumulators.get(str(account_id))
+            return None if accumulators is None else TrendAccumulators(accumulators.to_state())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'accounts': len(self._history),
+                'snapshots': sum(len(history) for history in self._history.values()),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'evicted_accounts': self.evicted_accounts
+            }
+
+
+class SQLiteMetricsHistoryStore(MetricsHistoryStore):
+    """
+    History in a SQLite file, so every gunicorn worker sees the same snapshots.
+
+    Nothing per account is held in process: snapshots and trend accumulators
+    are read from the file on demand, so ANALYTICS_MEMORY_BUDGET_MB does not
+    apply here. Disk use is bounded by `retention` snapshots per account.
+    """
+
+    shared = True
+    _local = threading.local()
+
+    def __init__(self, path: str, retention: int = 30):
+        self.path = path
+        self.retention = retention
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS metrics_history ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " account_id TEXT NOT NULL,"
+                " timestamp TEXT NOT NULL,"
+                " metrics TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_metrics_history_account"
+                " ON metrics_history (account_id, timestamp)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS trend_accumulators ("
+                " account_id TEXT PRIMARY KEY,"
+                " state TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS account_versions ("
+                " account_id TEXT PRIMARY KEY,"
+                " version INTEGER NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get(self.path)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            connections[self.path] = conn
+        return conn
+
+    def append(self, metrics):
+        account_id = str(metrics['account_id'])
+        conn = self._connect()
+        # IMMEDIATE so concurrent workers cannot interleave their accumulator updates
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO metrics_history (account_id, timestamp, metrics) VALUES (?, ?, ?)",
+                (account_id, metrics['timestamp'], json.dumps(metrics))
+            )
+            # Bounded retention: keep the newest `retention` snapshots per account
+            expired = conn.execute(
+                "SELECT id, metrics FROM metrics_history WHERE account_id = ?"
+                " ORDER BY timestamp DESC, id DESC LIMIT -1 OFFSET ?",
+                (account_id, self.retention)
+            ).fetchall()
+            conn.executemany("DELETE FROM metrics_history WHERE id = ?", [(row[0],) for row in expired])
+
+            row = conn.execute(
+                "SELECT state FROM trend_accumulators WHERE account_id = ?", (account_id,)
+            ).fetchone()
+            if row is None:
+                # First write since the table was added: start from the retained history
+                accumulators = TrendAccumulators.from_snapshots(self._snapshots(conn, account_id))
+            else:
+                accumulators = TrendAccumulators(json.loads(row[0]))
+                accumulators.add(metrics)
+                for _, expired_metrics in sorted(expired):
+                    accumulators.remove(json.loads(expired_metrics))
+            conn.execute(
+                "INSERT INTO trend_accumulators (account_id, state) VALUES (?, ?)"
+                " ON CONFLICT(account_id) DO UPDATE SET state = excluded.state",
+                (account_id, json.dumps(accumulators.to_state()))
+            )
+            conn.execute(
+                "INSERT INTO account_versions (account_id, version) VALUES (?, 1)"
+                " ON CONFLICT(account_id) DO UPDATE SET version = version + 1",
+                (account_id,)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _snapshots(self, conn: sqlite3.Connection, account_id: str) -> List[Dict[str, Any]]:
+        rows = conn.execute(
+            "SELECT metrics FROM metrics_history WHERE account_id = ? ORDER BY timestamp, id",
+            (account_id,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def range(self, account_id, since=None, until=None, limit=None):
+        query = "SELECT metrics FROM metrics_history WHERE account_id = ?"
+        params: List[Any] = [str(account_id)]
+        if since is not None:
+            query += " AND timestamp > ?"
+            params.append(since)
+        if until is not None:
+            query += " AND timestamp <= ?"
+            params.append(until)
+        query += " ORDER BY timestamp DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        rows = self._connect().execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def count(self, account_id):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM metrics_history WHERE account_id = ?", (str(account_id),)
+        ).fetchone()[0]
+
+    def oldest_timestamp(self, account_id, since=None):
+        return self._connect().execute(
+            "SELECT MIN(timestamp) FROM metrics_history WHERE account_id = ? AND timestamp > ?",
+            (str(account_id), since or '')
+        ).fetchone()[0]
+
+    def version(self, account_id):
+        row = self._connect().execute(
+            "SELECT version FROM account_versions WHERE account_id = ?", (str(account_id),)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def trend_accumulators(self, account_id):
+        row = self._connect().execute(
+            "SELECT state FROM trend_accumulators WHERE account_id = ?", (str(account_id),)
+        ).fetchone()
+        return None if row is None else TrendAccumulators(json.loads(row[0]))
+
+    def stats(self):
+        accounts, snapshots, size = self._connect().execute(
+            "SELECT COUNT(DISTINCT account_id), COUNT(*), COALESCE(SUM(LENGTH(metrics)), 0) FROM metrics_history"
+        ).fetchone()
+        return {
+            'backend': 'sqlite',
+            'accounts': accounts,
+            'snapshots': snapshots,
+            'bytes': size
+        }
+
+
+def default_history_store() -> MetricsHistoryStore:
+    """Shared SQLite history at Config.ANALYTICS_DB_PATH, or in-memory if it cannot be opened."""
+    try:
+        return SQLiteMetricsHistoryStore(Config.ANALYTICS_DB_PATH, Config.METRICS_HISTORY_RETENTION)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Falling back to in-memory metrics history: {e}")
+        return InMemoryMetricsHistoryStore(
+            Config.METRICS_HISTORY_RETENTION, Config.ANALYTICS_MEMORY_BUDGET_MB * 1024 * 1024
+        )
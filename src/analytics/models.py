@@ -1,11 +1,47 @@
 """Analytics data models"""
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from enum import Enum
 
 
+def _slotted(cls):
+    """
+    Rebuild a dataclass with __slots__ for its fields, like dataclass(slots=True)
+    on Python 3.10+. Instances get no __dict__, which saves memory per object
+    and speeds up attribute access.
+    """
+    cls_dict = dict(cls.__dict__)
+    field_names = tuple(f.name for f in fields(cls))
+    cls_dict['__slots__'] = field_names
+    for name in field_names:
+        # Defaults live on in the generated __init__
+        cls_dict.pop(name, None)
+    cls_dict.pop('__dict__', None)
+    cls_dict.pop('__weakref__', None)
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
+
+
+def _cached(cache: str):
+    """Property computed on first access and kept in the `cache` field."""
+    def decorator(compute):
+        def getter(self):
+            value = getattr(self, cache)
+            if value is None:
+                value = compute(self)
+                setattr(self, cache, value)
+            return value
+        return property(getter, doc=compute.__doc__)
+    return decorator
+
+
+def _derived():
+    """Field holding a derived value; not an __init__ argument and ignored by ==/repr."""
+    # A factory rather than a default: __init__ only assigns init=False fields that have one
+    return field(default_factory=lambda: None, init=False, repr=False, compare=False)
+
+
 class CompletionUnit(Enum):
     REPETITIONS = "REPETITIONS"
     MINUTES = "MINUTES"
@@ -28,6 +64,7 @@ class Pillar(Enum):
     ENVIRONMENT = "ENVIRONMENT"
 
 
+@_slotted
 @dataclass
 class CompletionStatistic:
     """Individual completion statistic from webhook"""
@@ -46,6 +83,7 @@ class CompletionStatistic:
         return (self.completed_value_total / self.completion_target_total) * 100
 
 
+@_slotted
 @dataclass
 class PillarCompletion:
     """Pillar completion statistics"""
@@ -62,16 +100,24 @@ class PillarCompletion:
         return (self.completed_routines / self.total_routines) * 100
 
 
+@_slotted
 @dataclass
 class RoutineCompletion:
-    """Routine completion data"""
+    """
+    Routine completion data
+    
+    Derived values are computed on first access and then kept, so
+    completion_stats must not be changed after they have been read.
+    """
     routine_id: str
     routine_name: str
     pillar: Pillar
     completion_stats: List[CompletionStatistic] = field(default_factory=list)
     schedule_changes: List[Dict] = field(default_factory=list)
+    _average_completion_rate: Optional[float] = _derived()
+    _trend: Optional[str] = _derived()
     
-    @property
+    @_cached('_average_completion_rate')
     def average_completion_rate(self) -> float:
         """Calculate average completion rate across all periods"""
         if not self.completion_stats:
@@ -79,7 +125,7 @@ class RoutineCompletion:
         total = sum(stat.completion_percentage for stat in self.completion_stats)
         return total / len(self.completion_stats)
     
-    @property
+    @_cached('_trend')
     def trend(self) -> str:
         """Determine completion trend (improving/declining/stable)"""
         if len(self.completion_stats) < 2:
@@ -101,39 +147,55 @@ class RoutineCompletion:
             return "stable"
 
 
+# Average completion rates below / at or above which a routine counts as struggling / successful
+STRUGGLING_THRESHOLD = 50.0
+SUCCESSFUL_THRESHOLD = 80.0
+
+
+@_slotted
 @dataclass
 class UserAnalytics:
-    """Complete user analytics snapshot"""
+    """
+    Complete user analytics snapshot
+    
+    The routine groupings and pillar rankings are computed on first access
+    and then kept; the snapshot is not meant to be changed after that.
+    """
     user_id: str
     timestamp: datetime
     pillar_completions: Dict[str, PillarCompletion]
     routine_completions: Dict[str, RoutineCompletion]
     overall_completion_rate: float
     engagement_score: float
+    _routine_groups: Optional[Tuple[List[RoutineCompletion], List[RoutineCompletion]]] = _derived()
+    _pillar_rankings: Optional[List[Tuple[str, float]]] = _derived()
+    
+    @_cached('_routine_groups')
+    def _grouped_routines(self) -> Tuple[List[RoutineCompletion], List[RoutineCompletion]]:
+        struggling, successful = [], []
+        for routine in self.routine_completions.values():
+            rate = routine.average_completion_rate
+            if rate < STRUGGLING_THRESHOLD:
+                struggling.append(routine)
+            elif rate >= SUCCESSFUL_THRESHOLD:
+                successful.append(routine)
+        return struggling, successful
     
     @property
     def struggling_routines(self) -> List[RoutineCompletion]:
         """Identify routines with low completion rates"""
-        threshold = 50.0  # 50% completion threshold
-        return [
-            routine for routine in self.routine_completions.values()
-            if routine.average_completion_rate < threshold
-        ]
+        return self._grouped_routines[0]
     
     @property
     def successful_routines(self) -> List[RoutineCompletion]:
         """Identify routines with high completion rates"""
-        threshold = 80.0  # 80% completion threshold
-        return [
-            routine for routine in self.routine_completions.values()
-            if routine.average_completion_rate >= threshold
-        ]
+        return self._grouped_routines[1]
     
-    @property
-    def pillar_rankings(self) -> List[tuple[str, float]]:
+    @_cached('_pillar_rankings')
+    def pillar_rankings(self) -> List[Tuple[str, float]]:
         """Rank pillars by success rate"""
         rankings = [
             (pillar, data.success_rate) 
             for pillar, data in self.pillar_completions.items()
         ]
-        return sorted(rankings, key=lambda x: x[1], reverse=True)
\ No newline at end of file
+        return sorted(rankings, key=lambda x: x[1], reverse=True)
@@ -0,0 +1,156 @@
+"""Online trend statistics, updated in O(1) per metrics snapshot."""
+
+import math
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from .trend_analyzer import regression_from_moments, trend_summary
+
+# Pillar series the pillar trends are computed from
+PILLAR_FIELDS = ('completion_score', 'engagement_rate')
+
+# Below this fraction of the sum of squares, downdating noise is treated as zero variance
+_RELATIVE_EPSILON = 1e-12
+
+
+class RunningTrend:
+    """
+    Streaming equivalent of one SeriesMatrix column.
+
+    Keeps a Welford mean and variance of the values, the co-moment of the
+    values against their rank (0, 1, 2, ...) for the regression, and the last
+    three values for momentum. The oldest value can be removed again, so the
+    statistics can follow a sliding window.
+    """
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        state = state or {}
+        self.n = state.get('n', 0)
+        self.mean = state.get('mean', 0.0)
+        self.m2 = state.get('m2', 0.0)
+        self.co_moment = state.get('co_moment', 0.0)
+        self.recent = deque(state.get('recent', []), maxlen=3)
+
+    def add(self, value: float) -> None:
+        # The new value gets rank n; the ranks before it have mean (n - 1) / 2
+        rank_deviation = (self.n + 1) / 2 if self.n else 0.0
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        self.co_moment += rank_deviation * (value - self.mean)
+        self.recent.append(value)
+
+    def remove_oldest(self, value: float) -> None:
+        """Remove the value at rank 0; every remaining value moves down one rank."""
+        if self.n <= 1:
+            self.n, self.mean, self.m2, self.co_moment = 0, 0.0, 0.0, 0.0
+            self.recent.clear()
+            return
+        n = self.n - 1
+        mean = (self.n * self.mean - value) / n
+        # Inverse of `add` for rank 0 joining ranks 1..n-1, whose mean rank is n / 2
+        self.co_moment += (self.n / 2) * (value - self.mean)
+        self.m2 = max(0.0, self.m2 - (value - mean) * (value - self.mean))
+        self.n, self.mean = n, mean
+        while len(self.recent) > n:
+            self.recent.popleft()
+
+    def _is_constant(self) -> bool:
+        return self.m2 <= _RELATIVE_EPSILON * (self.m2 + self.n * self.mean * self.mean)
+
+    def regression(self) -> Tuple[float, float, float, float]:
+        """(slope, intercept, r_value, p_value), as from scipy.stats.linregress."""
+        n = self.n
+        if n < 2:
+            return math.nan, math.nan, math.nan, math.nan
+        constant = self._is_constant()
+        slope, intercept, r_value, p_value = regression_from_moments(
+            n,
+            (n - 1) / 2,
+            self.mean,
+            (n * n - 1) / 12,
+            0.0 if constant else self.m2 / n,
+            0.0 if constant else self.co_moment / n
+        )
+        return float(slope), float(intercept), float(r_value), float(p_value)
+
+    def trend(self) -> Dict[str, Any]:
+        """Same structure as SeriesMatrix.trend."""
+        slope, _, r_value, p_value = self.regression()
+        return trend_summary(self.n, slope, r_value, p_value)
+
+    def volatility(self) -> float:
+        """Coefficient of variation in percent, as SeriesMatrix.volatility."""
+        if self.n < 2 or self.mean == 0:
+            return 0.0
+        variance = 0.0 if self._is_constant() else self.m2 / self.n
+        return math.sqrt(variance) / self.mean * 100
+
+    def momentum(self) -> float:
+        """Latest change relative to the previous change, as SeriesMatrix.momentum."""
+        if self.n < 3:
+            return 0.0
+        before, previous, last = self.recent
+        previous_change = previous - before
+        if previous_change == 0:
+            return 0.0
+        return (last - previous) / abs(previous_change)
+
+    def last(self) -> float:
+        return self.recent[-1] if self.recent else 0.0
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'n': self.n,
+            'mean': self.mean,
+            'm2': self.m2,
+            'co_moment': self.co_moment,
+            'recent': list(self.recent)
+        }
+
+
+class TrendAccumulators:
+    """Running trends of every pillar series of one account, over its stored snapshots."""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        self.pillars: Dict[str, Dict[str, RunningTrend]] = {
+            pillar: {field: RunningTrend(series.get(field)) for field in PILLAR_FIELDS}
+            for pillar, series in (state or {}).items()
+        }
+
+    @classmethod
+    def from_snapshots(cls, snapshots: List[Dict[str, Any]]) -> 'TrendAccumulators':
+        accumulators = cls()
+        for metrics in snapshots:
+            accumulators.add(metrics)
+        return accumulators
+
+    def add(self, metrics: Dict[str, Any]) -> None:
+        """Account for a new (newest) snapshot."""
+        for pillar, data in metrics.get('pillar_metrics', {}).items():
+            series = self.pillars.get(pillar)
+            if series is None:
+                series = self.pillars[pillar] = {field: RunningTrend() for field in PILLAR_FIELDS}
+            for field in PILLAR_FIELDS:
+                series[field].add(data.get(field, 0))
+
+    def remove(self, metrics: Dict[str, Any]) -> None:
+        """Forget the oldest snapshot, once it has left the history window."""
+        for pillar, data in metrics.get('pillar_metrics', {}).items():
+            series = self.pillars.get(pillar)
+            if series is None:
+                continue
+            for field in PILLAR_FIELDS:
+                series[field].remove_oldest(data.get(field, 0))
+            if series[PILLAR_FIELDS[0]].n == 0:
+                del self.pillars[pillar]
+
+    def series(self, pillar: str, field: str) -> RunningTrend:
+        return self.pillars[pillar][field]
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            pillar: {field: trend.to_state() for field, trend in series.items()}
+            for pillar, series in self.pillars.items()
+        }
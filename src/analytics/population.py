@@ -0,0 +1,281 @@
+"""Cross-account distributions of the headline metrics, kept in quantile sketches."""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Optional
+
+from src.config import Config
+
+from .online_stats import PILLAR_FIELDS
+from .sketches import KLLSketch
+
+logger = logging.getLogger(__name__)
+
+# Quantiles reported for every metric
+POPULATION_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+def population_values(metrics: Dict[str, Any]) -> Dict[str, float]:
+    """Sketched values of one metrics snapshot, keyed 'PILLAR.field' and 'habit_formation_index'."""
+    values = {
+        f"{pillar}.{field}": float(data.get(field, 0))
+        for pillar, data in metrics.get('pillar_metrics', {}).items()
+        for field in PILLAR_FIELDS
+    }
+    habit_index = metrics.get('performance_indicators', {}).get('habit_formation_index')
+    if habit_index is not None:
+        values['habit_formation_index'] = float(habit_index)
+    return values
+
+
+def _build_sketches(latest_values: Iterable[Dict[str, float]], k: int) -> Dict[str, KLLSketch]:
+    """One sketch per metric over the given per-account values."""
+    sketches: Dict[str, KLLSketch] = {}
+    for values in latest_values:
+        for name, value in values.items():
+            sketch = sketches.get(name)
+            if sketch is None:
+                sketch = sketches[name] = KLLSketch(k)
+            sketch.update(value)
+    return sketches
+
+
+def _describe(sketch: KLLSketch) -> Dict[str, Any]:
+    quantiles = sketch.quantiles(list(POPULATION_QUANTILES))
+    description = {'count': sketch.n, 'min': sketch.min, 'max': sketch.max}
+    for q, value in zip(POPULATION_QUANTILES, quantiles):
+        description[f"p{int(q * 100)}"] = value
+    return description
+
+
+def _group(per_metric: Dict[str, Any]) -> Dict[str, Any]:
+    """{'pillars': {pillar: {field: ...}}, 'habit_formation_index': ...} from flat metric keys."""
+    grouped: Dict[str, Any] = {'pillars': {}}
+    for name in sorted(per_metric):
+        if '.' in name:
+            pillar, field = name.split('.', 1)
+            grouped['pillars'].setdefault(pillar, {})[field] = per_metric[name]
+        else:
+            grouped[name] = per_metric[name]
+    return grouped
+
+
+class PopulationStats(ABC):
+    """
+    Distribution of the metrics across accounts, one value per account.
+
+    Each account's latest snapshot replaces its previous one, so an account
+    counts once however many events it sends. Sketches are KLL, one per
+    metric, which keeps the cost of a percentile query bounded; KLL cannot
+    remove values, so they are rebuilt from the latest values after changes.
+    """
+
+    def __init__(self, k: int = 200):
+        self.k = k
+
+    @abstractmethod
+    def add(self, metrics: Dict[str, Any]) -> None:
+        """Make `metrics` the account's latest snapshot."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def sketches(self) -> Dict[str, KLLSketch]:
+        """Current sketch of every metric seen so far."""
+        raise NotImplementedError
+
+    def summary(self) -> Dict[str, Any]:
+        """Count, min, max and POPULATION_QUANTILES of every metric."""
+        return _group({name: _describe(sketch) for name, sketch in self.sketches().items()})
+
+    def percentile_ranks(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Percentile (0-100) of each of the snapshot's values within the population."""
+        sketches = self.sketches()
+        ranks = {}
+        for name, value in population_values(metrics).items():
+            sketch = sketches.get(name)
+            rank = sketch.rank(value) if sketch is not None else None
+            ranks[name] = None if rank is None else round(rank * 100, 1)
+        return _group(ranks)
+
+
+class InMemoryPopulationStats(PopulationStats):
+    """Process-local sketches; used when no shared store is wanted (e.g. tests, scripts)."""
+
+    def __init__(self, k: int = 200):
+        super().__init__(k)
+        self._latest: Dict[str, Dict[str, float]] = {}
+        # Built from _latest on the first read after a change
+        self._sketches: Optional[Dict[str, KLLSketch]] = None
+        self._lock = threading.Lock()
+
+    def add(self, metrics):
+        values = population_values(metrics)
+        with self._lock:
+            self._latest[str(metrics['account_id'])] = values
+            self._sketches = None
+
+    def sketches(self):
+        with self._lock:
+            if self._sketches is None:
+                self._sketches = _build_sketches(self._latest.values(), self.k)
+            return {name: KLLSketch.from_state(sketch.to_state()) for name, sketch in self._sketches.items()}
+
+
+class SQLitePopulationStats(PopulationStats):
+    """
+    Sketches in a SQLite table, so every worker contributes to the same population.
+
+    Every account's latest values are kept in `population_latest`. Updates are
+    buffered per process and written every `flush_every` snapshots or
+    `flush_seconds` seconds, whichever comes first; reads flush this process's
+    pending updates. The shared sketches are rebuilt from `population_latest`
+    when it has changed, at most once every `rebuild_seconds` (by default
+    `flush_seconds`) across workers.
+    """
+
+    _local = threading.local()
+
+    def __init__(
+        self,
+        path: str,
+        k: int = 200,
+        flush_every: int = 32,
+        flush_seconds: float = 5.0,
+        rebuild_seconds: Optional[float] = None
+    ):
+        super().__init__(k)
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.rebuild_seconds = flush_seconds if rebuild_seconds is None else rebuild_seconds
+        self._pending: Dict[str, Dict[str, float]] = {}  # account -> latest values
+        self._pending_count = 0
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS population_sketches ("
+                " metric TEXT PRIMARY KEY,"
+                " state TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS population_latest ("
+                " account_id TEXT PRIMARY KEY,"
+                " metric_values TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS population_meta ("
+                " key TEXT PRIMARY KEY,"
+                " value REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get(self.path)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            connections[self.path] = conn
+        return conn
+
+    def add(self, metrics):
+        values = population_values(metrics)
+        with self._lock:
+            self._pending[str(metrics['account_id'])] = values
+            self._pending_count += 1
+            flush_now = self._pending_count >= self.flush_every
+            if not flush_now and self._timer is None:
+                # Bounds how stale the shared sketches get when this worker goes quiet
+                self._timer = threading.Timer(self.flush_seconds, self._flush_quietly)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self.flush()
+
+    def _flush_quietly(self) -> None:
+        try:
+            self.flush()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Population sketch flush failed: {e}")
+
+    def flush(self) -> None:
+        """Write this process's pending updates and rebuild the shared sketches if they are due."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._pending_count = 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending and not self._rebuild_due(self._connect(), time.time()):
+            return
+
+        conn = self._connect()
+        try:
+            # IMMEDIATE so two workers cannot rebuild from different snapshots of the table
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            conn.executemany(
+                "INSERT INTO population_latest (account_id, metric_values, updated_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(account_id) DO UPDATE SET"
+                " metric_values = excluded.metric_values, updated_at = excluded.updated_at",
+                [(account_id, json.dumps(values), now) for account_id, values in pending.items()]
+            )
+            if self._rebuild_due(conn, now):
+                self._rebuild(conn, now)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            # Keep the updates for the next flush rather than dropping them; newer ones win
+            with self._lock:
+                self._pending = {**pending, **self._pending}
+            raise
+
+    def _rebuild_due(self, conn: sqlite3.Connection, now: float) -> bool:
+        changed_at, built_at = conn.execute(
+            "SELECT (SELECT MAX(updated_at) FROM population_latest),"
+            " (SELECT value FROM population_meta WHERE key = 'built_at')"
+        ).fetchone()
+        if changed_at is None:
+            return False
+        return built_at is None or (changed_at > built_at and now - built_at >= self.rebuild_seconds)
+
+    def _rebuild(self, conn: sqlite3.Connection, now: float) -> None:
+        rows = conn.execute("SELECT metric_values FROM population_latest")
+        sketches = _build_sketches((json.loads(row[0]) for row in rows), self.k)
+        conn.execute("DELETE FROM population_sketches")
+        conn.executemany(
+            "INSERT INTO population_sketches (metric, state, updated_at) VALUES (?, ?, ?)",
+            [(name, json.dumps(sketch.to_state()), now) for name, sketch in sketches.items()]
+        )
+        conn.execute(
+            "INSERT INTO population_meta (key, value) VALUES ('built_at', ?)"
+            " ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (now,)
+        )
+
+    def sketches(self):
+        self.flush()
+        rows = self._connect().execute("SELECT metric, state FROM population_sketches").fetchall()
+        return {name: KLLSketch.from_state(json.loads(state)) for name, state in rows}
+
+
+def default_population_stats() -> PopulationStats:
+    """Shared SQLite sketches at Config.ANALYTICS_DB_PATH, or in-memory if it cannot be opened."""
+    try:
+        return SQLitePopulationStats(Config.ANALYTICS_DB_PATH, Config.POPULATION_SKETCH_K)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Falling back to in-memory population sketches: {e}")
+        return InMemoryPopulationStats(Config.POPULATION_SKETCH_K)
@@ -21,12 +21,13 @@ class AnalyticsProcessor:
         self.completion_threshold_high = 80.0
         self.trend_window = 3  # Number of periods to analyze for trends
     
-    def process_webhook_data(self, webhook_data: Dict) -> UserAnalytics:
+    def process_webhook_data(self, webhook_data: Dict, timestamp: Optional[datetime] = None) -> UserAnalytics:
         """
         Process raw webhook data into structured analytics
         
         Args:
             webhook_data: Raw webhook payload
+            timestamp: When the webhook was received; now if omitted (replays pass the original time)
             
         Returns:
             UserAnalytics object with processed data
@@ -53,7 +54,7 @@ class AnalyticsProcessor:
         
         return UserAnalytics(
             user_id=user_id,
-            timestamp=datetime.utcnow(),
+            timestamp=timestamp or datetime.utcnow(),
             pillar_completions=pillar_completions,
             routine_completions=routine_completions,
             overall_completion_rate=overall_completion,
@@ -0,0 +1,112 @@
+"""Process-wide AnalyticsService and analytics worker pool shared by all blueprints."""
+
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Optional
+
+from src.config import Config
+from src.utils.worker_pool import BoundedWorkerPool
+
+if TYPE_CHECKING:
+    from .analytics_service import AnalyticsService
+
+logger = logging.getLogger(__name__)
+
+_service: Optional['AnalyticsService'] = None
+_service_lock = threading.Lock()
+_pool: Optional[BoundedWorkerPool] = None
+_pool_lock = threading.Lock()
+_event_pool: Optional[BoundedWorkerPool] = None
+_event_pool_lock = threading.Lock()
+
+# /api/analytics/summary's default window, and the one /api/analytics/insights reads
+PRIMED_SUMMARY_DAYS = (7, 1)
+
+
+def get_analytics_service() -> 'AnalyticsService':
+    """Return the shared AnalyticsService, creating it on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                # Imported here: the analytics stack loads NumPy and SciPy
+                from .analytics_service import AnalyticsService
+                _service = AnalyticsService()
+    return _service
+
+
+class _LazyAnalyticsService:
+    """Forwards to the shared AnalyticsService, which is only built on first use."""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_analytics_service(), name)
+
+
+_lazy_service = _LazyAnalyticsService()
+
+
+def lazy_analytics_service() -> 'AnalyticsService':
+    """
+    Stand-in for get_analytics_service() at module level (e.g. in blueprints),
+    so importing the module does not load the analytics stack.
+    """
+    return _lazy_service
+
+
+def reset_analytics_service() -> None:
+    """Drop the shared instance so the next call builds a fresh one (used by tests)."""
+    global _service
+    with _service_lock:
+        _service = None
+
+
+def get_analytics_pool() -> BoundedWorkerPool:
+    """Worker processes for full analytics runs, started on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BoundedWorkerPool(
+                    max_workers=Config.ANALYTICS_POOL_WORKERS,
+                    max_queue=Config.ANALYTICS_POOL_QUEUE,
+                    use_processes=Config.ANALYTICS_POOL_PROCESSES,
+                    name="analytics"
+                )
+    return _pool
+
+
+def get_event_analytics_pool() -> BoundedWorkerPool:
+    """
+    Threads recording the analytics of /event requests, started on first use.
+    Threads, not processes: the run returns the response sections and records
+    the snapshot through this process's AnalyticsService.
+    """
+    global _event_pool
+    if _event_pool is None:
+        with _event_pool_lock:
+            if _event_pool is None:
+                _event_pool = BoundedWorkerPool(
+                    max_workers=Config.EVENT_ANALYTICS_WORKERS,
+                    max_queue=Config.EVENT_ANALYTICS_QUEUE,
+                    use_processes=False,
+                    name="event-analytics"
+                )
+    return _event_pool
+
+
+def prime_analytics_views(account_id: int) -> int:
+    """
+    Render the default GET views of an account into the shared response cache
+    in a pool worker, so the first request after an event finds them ready.
+
+    Returns:
+        int: The number of views rendered (0 if they were already cached)
+    """
+    service = get_analytics_service()
+    rendered = 0
+    for days in PRIMED_SUMMARY_DAYS:
+        if service.response_cache.get(service.response_key(account_id, 'summary', str(days), days)) is None:
+            service.get_analytics_summary(account_id, days)
+            rendered += 1
+    logger.info(f"Primed {rendered} analytics views for account {account_id}")
+    return rendered
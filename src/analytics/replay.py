@@ -0,0 +1,172 @@
+"""
+Replay the stored raw webhooks through AnalyticsProcessor, rebuilding every
+user's snapshots and rollups, e.g. after a scoring change.
+
+Run from the repository root:
+
+    python -m src.analytics.replay --storage-path analytics_data --workers 4
+
+Users are sharded across worker processes and each user's webhooks, fresh
+or compacted (see webhook_archive), are replayed in the order they were
+received. A user's history is replaced in one transaction that also
+records a checkpoint, so an interrupted replay resumes with the users it
+had not finished; --restart replays everyone.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.analytics.processor import AnalyticsProcessor
+from src.analytics.storage import AnalyticsStorage, SnapshotStore
+from src.analytics.webhook_archive import count_webhooks, iter_webhooks, users_with_webhooks
+
+logger = logging.getLogger(__name__)
+
+# Per worker process: SnapshotStore by database path, and the processor
+_worker_state: Dict[str, Any] = {}
+
+
+def users_by_size(storage_path: Path) -> List[str]:
+    """Users with stored raw webhooks, those with the most webhooks first (balances the shards)."""
+    counts = {user_id: count_webhooks(storage_path, user_id) for user_id in users_with_webhooks(storage_path)}
+    return sorted(counts, key=lambda user_id: (-counts[user_id], user_id))
+
+
+def _checkpoint_key(checkpoint: str, user_id: str) -> str:
+    return f"{checkpoint}:{user_id}"
+
+
+def replay_user(storage_path: str, db_path: str, user_id: str, checkpoint: str) -> int:
+    """
+    Rebuild one user's snapshots from their raw webhooks; runs in a worker process.
+
+    Returns:
+        Number of webhooks replayed
+    """
+    store = _worker_state.get(db_path)
+    if store is None:
+        store = _worker_state[db_path] = SnapshotStore(db_path)
+    processor = _worker_state.get('processor')
+    if processor is None:
+        processor = _worker_state['processor'] = AnalyticsProcessor()
+
+    rows = []
+    since = until = None
+    for received_at, precise, webhook_data in iter_webhooks(Path(storage_path), user_id):
+        # Second-resolution names cover the snapshots written any time within that second
+        covers = received_at if precise else received_at.replace(microsecond=999999)
+        since = since or received_at.isoformat()
+        until = covers.isoformat() if until is None else max(until, covers.isoformat())
+        analytics = processor.process_webhook_data(webhook_data, received_at)
+        rows.append((analytics.timestamp.isoformat(), AnalyticsStorage.analytics_to_dict(analytics)))
+
+    if not rows:
+        return 0
+    # Snapshots older than the retained webhooks, or newer than the last one read
+    # (written while replaying), are kept
+    store.replace_history(user_id, since, until, rows, marker=_checkpoint_key(checkpoint, user_id))
+    return len(rows)
+
+
+def replay(
+    storage_path: str = "analytics_data",
+    db_path: Optional[str] = None,
+    workers: int = 4,
+    checkpoint: str = "replay",
+    restart: bool = False,
+    users: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """
+    Replay the raw webhooks of `users` (default: everyone with stored webhooks).
+
+    Args:
+        storage_path: AnalyticsStorage directory holding <user_id>/webhooks
+        db_path: Snapshot database; <storage_path>/analytics.db by default
+        workers: Worker processes; 1 replays in this process
+        checkpoint: Name of the checkpoint; users it records as done are skipped
+        restart: Forget the checkpoint first and replay every user
+
+    Returns:
+        Counts of users replayed, skipped and failed, webhooks replayed, and elapsed seconds
+    """
+    db_path = str(db_path or Path(storage_path) / "analytics.db")
+    store = SnapshotStore(db_path)
+    prefix = _checkpoint_key(checkpoint, "")
+    if restart:
+        store.delete_meta(prefix)
+    done = {key[len(prefix):] for key in store.meta(prefix)}
+
+    candidates = list(users) if users is not None else users_by_size(Path(storage_path))
+    pending = [user_id for user_id in candidates if user_id not in done]
+    result = {
+        'users': len(pending),
+        'skipped': len(candidates) - len(pending),
+        'replayed': 0,
+        'webhooks': 0,
+        'failed': []
+    }
+    logger.info(f"Replaying {len(pending)} users ({result['skipped']} already done) with {workers} workers")
+    started = time.time()
+
+    def record(count):
+        result['replayed'] += 1
+        result['webhooks'] += count
+        if result['replayed'] % 100 == 0:
+            logger.info(f"Replayed {result['replayed']}/{len(pending)} users, {result['webhooks']} webhooks")
+
+    if workers <= 1:
+        for user_id in pending:
+            try:
+                record(replay_user(storage_path, db_path, user_id, checkpoint))
+            except Exception as e:
+                logger.error(f"Replay failed for user {user_id}: {e}")
+                result['failed'].append(user_id)
+    else:
+        # spawn: workers must not inherit the parent's SQLite connections
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {
+                pool.submit(replay_user, storage_path, db_path, user_id, checkpoint): user_id
+                for user_id in pending
+            }
+            for future in as_completed(futures):
+                user_id = futures[future]
+                try:
+                    record(future.result())
+                except Exception as e:
+                    logger.error(f"Replay failed for user {user_id}: {e}")
+                    result['failed'].append(user_id)
+
+    result['seconds'] = round(time.time() - started, 3)
+    logger.info(
+        f"Replayed {result['replayed']} users and {result['webhooks']} webhooks in {result['seconds']}s,"
+        f" {len(result['failed'])} failed"
+    )
+    return result
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--storage-path", default="analytics_data", help="AnalyticsStorage directory")
+    parser.add_argument("--db-path", help="snapshot database (default: <storage-path>/analytics.db)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--checkpoint", default="replay", help="checkpoint name to resume from")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and replay every user")
+    parser.add_argument("--user", action="append", dest="users", help="replay only this user (repeatable)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    result = replay(args.storage_path, args.db_path, args.workers, args.checkpoint, args.restart, args.users)
+    print(json.dumps(result, indent=2))
+    return 1 if result['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
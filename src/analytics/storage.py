@@ -1,26 +1,506 @@
 """Analytics storage service for persisting and retrieving analytics data"""
 
+import base64
+import binascii
 import json
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
 from src.analytics.models import UserAnalytics
 from src.analytics.processor import AnalyticsProcessor
 from src.analytics.insights import InsightsGenerator
+from src.analytics.webhook_archive import RAW_WEBHOOK_TIME_FORMAT, iter_webhooks
 
 logger = logging.getLogger(__name__)
 
 
+class _WriteRequest:
+    __slots__ = ('rows', 'done', 'error')
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.done = False
+        self.error = None
+
+
+ROLLUP_GRANULARITIES = ('all', 'week', 'month', 'quarter')
+
+
+def _bucket_starts(timestamp: str) -> Dict[str, str]:
+    """Start date of the calendar buckets a snapshot timestamp falls into"""
+    day = datetime.fromisoformat(timestamp).date()
+    return {
+        'all': '',
+        'week': (day - timedelta(days=day.weekday())).isoformat(),
+        'month': day.replace(day=1).isoformat(),
+        'quarter': date(day.year, 3 * ((day.month - 1) // 3) + 1, 1).isoformat()
+    }
+
+
+class SnapshotStore:
+    """
+    Append-only analytics snapshots in SQLite, indexed by (user_id, timestamp).
+
+    Concurrent writers are group-committed: whichever caller finds no commit
+    in progress writes every pending row in one transaction (one fsync), and
+    the others return once the transaction holding their rows is durable.
+
+    Each row also carries its rank and running totals (in timestamp order)
+    of completion rate and engagement score, so sums over any time window
+    are two index lookups. Per-user and per-calendar-bucket rollups are
+    updated in the same transaction.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._pending: List[_WriteRequest] = []
+        self._flushing = False
+        self._cond = threading.Condition()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analytics_snapshots ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " user_id TEXT NOT NULL,"
+                " timestamp TEXT NOT NULL,"
+                " snapshot TEXT NOT NULL,"
+                " completion_rate REAL NOT NULL DEFAULT 0,"
+                " engagement_score REAL NOT NULL DEFAULT 0,"
+                " seq INTEGER NOT NULL DEFAULT 0,"
+                " cum_completion_rate REAL NOT NULL DEFAULT 0,"
+                " cum_engagement_score REAL NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analytics_rollups ("
+                " user_id TEXT NOT NULL,"
+                " granularity TEXT NOT NULL,"
+                " bucket_start TEXT NOT NULL,"
+                " count INTEGER NOT NULL,"
+                " sum_completion_rate REAL NOT NULL,"
+                " sumsq_completion_rate REAL NOT NULL,"
+                " sum_engagement_score REAL NOT NULL,"
+                " sumsq_engagement_score REAL NOT NULL,"
+                " first_timestamp TEXT NOT NULL,"
+                " first_completion_rate REAL NOT NULL,"
+                " last_timestamp TEXT NOT NULL,"
+                " last_completion_rate REAL NOT NULL,"
+                " PRIMARY KEY (user_id, granularity, bucket_start))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS storage_meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._migrate(conn)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analytics_snapshots_user"
+                " ON analytics_snapshots (user_id, timestamp)"
+            )
+            self._enforce_unique_seq(conn)
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Add the running-total columns to tables created before they existed"""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(analytics_snapshots)")}
+        if 'seq' in columns:
+            return
+        for column in ('completion_rate', 'engagement_score', 'seq', 'cum_completion_rate', 'cum_engagement_score'):
+            column_type = 'INTEGER' if column == 'seq' else 'REAL'
+            conn.execute(f"ALTER TABLE analytics_snapshots ADD COLUMN {column} {column_type} NOT NULL DEFAULT 0")
+        rows = conn.execute("SELECT id, snapshot FROM analytics_snapshots").fetchall()
+        for row_id, snapshot in rows:
+            data = json.loads(snapshot)
+            conn.execute(
+                "UPDATE analytics_snapshots SET completion_rate = ?, engagement_score = ? WHERE id = ?",
+                (float(data.get('overall_completion_rate') or 0), float(data.get('engagement_score') or 0), row_id)
+            )
+        for (user_id,) in conn.execute("SELECT DISTINCT user_id FROM analytics_snapshots").fetchall():
+            self._resequence(conn, user_id)
+        # Rollups are rebuilt from scratch, so drop any partial ones
+        conn.execute("DELETE FROM analytics_rollups")
+        encoded = [
+            (user_id, timestamp, None, rate, engagement)
+            for user_id, timestamp, rate, engagement in conn.execute(
+                "SELECT user_id, timestamp, completion_rate, engagement_score FROM analytics_snapshots"
+            ).fetchall()
+        ]
+        self._update_rollups(conn, encoded)
+
+    def _enforce_unique_seq(self, conn: sqlite3.Connection) -> None:
+        """Replace the plain (user_id, seq) index by a UNIQUE one, renumbering any duplicates first"""
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(analytics_snapshots)")}
+        if 'idx_analytics_snapshots_user_seq' in indexes:
+            return
+        # Appends racing across workers could give two rows of a user the same seq and wrong totals
+        for (user_id,) in conn.execute("SELECT DISTINCT user_id FROM analytics_snapshots").fetchall():
+            self._resequence(conn, user_id)
+        conn.execute("DROP INDEX IF EXISTS idx_analytics_snapshots_seq")
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_analytics_snapshots_user_seq"
+            " ON analytics_snapshots (user_id, seq)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get(self.path)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            connections[self.path] = conn
+        return conn
+
+    def append(self, user_id: str, timestamp: str, snapshot: Dict) -> None:
+        self.append_many([(user_id, timestamp, snapshot)])
+
+    def append_many(self, rows: List[Tuple[str, str, Dict]]) -> None:
+        """Durably append (user_id, timestamp, snapshot) rows; returns once committed."""
+        request = _WriteRequest([self._encode(u, t, snap) for u, t, snap in rows])
+        with self._cond:
+            self._pending.append(request)
+            while self._flushing and not request.done:
+                self._cond.wait()
+            if not request.done:
+                self._flushing = True
+                batch, self._pending = self._pending, []
+
+        if not request.done:
+            error = None
+            try:
+                conn = self._connect()
+                # Lock before reading each user's last seq and running totals, so
+                # another worker cannot append in between
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._insert(conn, [row for pending in batch for row in pending.rows])
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            except Exception as e:
+                error = e
+            with self._cond:
+                for pending in batch:
+                    pending.done = True
+                    pending.error = error
+                self._flushing = False
+                self._cond.notify_all()
+
+        if request.error is not None:
+            raise request.error
+
+    @staticmethod
+    def _encode(user_id, timestamp: str, snapshot: Dict) -> Tuple:
+        return (
+            str(user_id), timestamp, json.dumps(snapshot),
+            float(snapshot.get('overall_completion_rate') or 0),
+            float(snapshot.get('engagement_score') or 0)
+        )
+
+    def _insert(self, conn: sqlite3.Connection, rows: List[Tuple]) -> None:
+        """Insert encoded rows, maintaining running totals and rollups (caller commits)"""
+        resequence = set()
+        for user_id, timestamp, snapshot, rate, engagement in rows:
+            last = conn.execute(
+                "SELECT timestamp, seq, cum_completion_rate, cum_engagement_score FROM analytics_snapshots"
+                " WHERE user_id = ? ORDER BY seq DESC LIMIT 1",
+                (user_id,)
+            ).fetchone()
+            if last is None:
+                seq, cum_rate, cum_engagement = 1, rate, engagement
+            else:
+                seq, cum_rate, cum_engagement = last[1] + 1, last[2] + rate, last[3] + engagement
+                if timestamp < last[0]:
+                    resequence.add(user_id)
+            conn.execute(
+                "INSERT INTO analytics_snapshots (user_id, timestamp, snapshot, completion_rate, engagement_score,"
+                " seq, cum_completion_rate, cum_engagement_score) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (user_id, timestamp, snapshot, rate, engagement, seq, cum_rate, cum_engagement)
+            )
+        self._update_rollups(conn, rows)
+        # Rows that arrived out of timestamp order invalidate the running totals after them
+        for user_id in resequence:
+            self._resequence(conn, user_id)
+
+    @staticmethod
+    def _update_rollups(conn: sqlite3.Connection, rows: List[Tuple]) -> None:
+        conn.executemany(
+            "INSERT INTO analytics_rollups VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (user_id, granularity, bucket_start) DO UPDATE SET"
+            " count = count + 1,"
+            " sum_completion_rate = sum_completion_rate + excluded.sum_completion_rate,"
+            " sumsq_completion_rate = sumsq_completion_rate + excluded.sumsq_completion_rate,"
+            " sum_engagement_score = sum_engagement_score + excluded.sum_engagement_score,"
+            " sumsq_engagement_score = sumsq_engagement_score + excluded.sumsq_engagement_score,"
+            " first_completion_rate = CASE WHEN excluded.first_timestamp < first_timestamp"
+            "   THEN excluded.first_completion_rate ELSE first_completion_rate END,"
+            " first_timestamp = MIN(first_timestamp, excluded.first_timestamp),"
+            " last_completion_rate = CASE WHEN excluded.last_timestamp >= last_timestamp"
+            "   THEN excluded.last_completion_rate ELSE last_completion_rate END,"
+            " last_timestamp = MAX(last_timestamp, excluded.last_timestamp)",
+            [
+                (user_id, granularity, bucket_start, rate, rate * rate, engagement, engagement * engagement,
+                 timestamp, rate, timestamp, rate)
+                for user_id, timestamp, _, rate, engagement in rows
+                for granularity, bucket_start in _bucket_starts(timestamp).items()
+            ]
+        )
+
+    @staticmethod
+    def _resequence(conn: sqlite3.Connection, user_id: str) -> None:
+        # Move the user's rows out of the way first, so renumbering never collides in the unique index
+        conn.execute("UPDATE analytics_snapshots SET seq = -id WHERE user_id = ?", (user_id,))
+        updates = []
+        cum_rate = cum_engagement = 0.0
+        rows = conn.execute(
+            "SELECT id, completion_rate, engagement_score FROM analytics_snapshots"
+            " WHERE user_id = ? ORDER BY timestamp, id",
+            (user_id,)
+        ).fetchall()
+        for seq, (row_id, rate, engagement) in enumerate(rows, start=1):
+            cum_rate += rate
+            cum_engagement += engagement
+            updates.append((seq, cum_rate, cum_engagement, row_id))
+        conn.executemany(
+            "UPDATE analytics_snapshots SET seq = ?, cum_completion_rate = ?, cum_engagement_score = ? WHERE id = ?",
+            updates
+        )
+
+    def window_totals(self, user_id: str, since: str) -> Optional[Dict]:
+        """
+        Count and sums of the snapshots at or after `since`, plus the sum of
+        completion rates over the older half of them, using running totals.
+        Returns None if the window is empty.
+        """
+        conn = self._connect()
+        first = conn.execute(
+            "SELECT seq, cum_completion_rate - completion_rate, cum_engagement_score - engagement_score, timestamp"
+            " FROM analytics_snapshots WHERE user_id = ? AND timestamp >= ? ORDER BY timestamp, id LIMIT 1",
+            (str(user_id), since)
+        ).fetchone()
+        if first is None:
+            return None
+        last = conn.execute(
+            "SELECT seq, cum_completion_rate, cum_engagement_score, timestamp"
+            " FROM analytics_snapshots WHERE user_id = ? ORDER BY seq DESC LIMIT 1",
+            (str(user_id),)
+        ).fetchone()
+        first_seq, base_rate, base_engagement, first_timestamp = first
+        count = last[0] - first_seq + 1
+        half = count // 2
+        first_half_rate = 0.0
+        if half:
+            first_half_rate = conn.execute(
+                "SELECT cum_completion_rate FROM analytics_snapshots WHERE user_id = ? AND seq = ?",
+                (str(user_id), first_seq + half - 1)
+            ).fetchone()[0] - base_rate
+        return {
+            'count': count,
+            'sum_completion_rate': last[1] - base_rate,
+            'sum_engagement_score': last[2] - base_engagement,
+            'first_half_count': half,
+            'first_half_completion_rate': first_half_rate,
+            'first_timestamp': first_timestamp,
+            'last_timestamp': last[3]
+        }
+
+    def rollups(self, user_id: str, granularity: str = 'week', limit: Optional[int] = None) -> List[Dict]:
+        """Per-bucket rollups for a user, newest bucket first"""
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError(f"Unknown rollup granularity: {granularity}")
+        query = (
+            "SELECT bucket_start, count, sum_completion_rate, sumsq_completion_rate, sum_engagement_score,"
+            " sumsq_engagement_score, first_timestamp, first_completion_rate, last_timestamp, last_completion_rate"
+            " FROM analytics_rollups WHERE user_id = ? AND granularity = ? ORDER BY bucket_start DESC"
+        )
+        params: List = [str(user_id), granularity]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [
+            {
+                'bucket_start': row[0] or None,
+                'count': row[1],
+                'sum_completion_rate': row[2],
+                'sumsq_completion_rate': row[3],
+                'sum_engagement_score': row[4],
+                'sumsq_engagement_score': row[5],
+                'first_timestamp': row[6],
+                'first_completion_rate': row[7],
+                'last_timestamp': row[8],
+                'last_completion_rate': row[9]
+            }
+            for row in self._connect().execute(query, params)
+        ]
+
+    def range(
+        self,
+        user_id: str,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Snapshots with since <= timestamp <= until, oldest first."""
+        query = "SELECT snapshot FROM analytics_snapshots WHERE user_id = ?"
+        params: List = [str(user_id)]
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND timestamp <= ?"
+            params.append(until)
+        query += " ORDER BY timestamp, id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [json.loads(row[0]) for row in self._connect().execute(query, params)]
+
+    def page(
+        self,
+        user_id: str,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        after: Optional[Tuple[str, int]] = None,
+        limit: int = 100
+    ) -> Tuple[List[Dict], Optional[Tuple[str, int]]]:
+        """
+        Up to `limit` snapshots with since <= timestamp <= until that come after
+        the (timestamp, id) key `after`, oldest first. Seeks on the index, so
+        every page costs the same however deep into the history it is.
+
+        Returns:
+            The snapshots, and the key to continue from (None on the last page)
+        """
+        query = "SELECT timestamp, id, snapshot FROM analytics_snapshots WHERE user_id = ?"
+        params: List = [str(user_id)]
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND timestamp <= ?"
+            params.append(until)
+        if after is not None:
+            query += " AND (timestamp > ? OR (timestamp = ? AND id > ?))"
+            params.extend([after[0], after[0], after[1]])
+        query += " ORDER BY timestamp, id LIMIT ?"
+        params.append(limit + 1)
+        rows = self._connect().execute(query, params).fetchall()
+        next_key = (rows[limit - 1][0], rows[limit - 1][1]) if len(rows) > limit else None
+        return [json.loads(row[2]) for row in rows[:limit]], next_key
+
+    def iter_range(
+        self,
+        user_id: str,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict]:
+        """Snapshots like `range`, read `batch_size` at a time so no read stays open between batches."""
+        after = None
+        while True:
+            snapshots, after = self.page(user_id, since, until, after, batch_size)
+            yield from snapshots
+            if after is None:
+                return
+
+    def replace_history(
+        self,
+        user_id: str,
+        since: str,
+        until: str,
+        rows: List[Tuple[str, Dict]],
+        marker: Optional[str] = None
+    ) -> None:
+        """
+        Replace the user's snapshots with since <= timestamp <= until by
+        (timestamp, snapshot) rows, and rebuild the user's running totals and
+        rollups. Snapshots outside the range are kept. `marker`, if given, is
+        recorded in the same transaction.
+        """
+        user_id = str(user_id)
+        encoded = [self._encode(user_id, timestamp, snapshot) for timestamp, snapshot in rows]
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM analytics_snapshots WHERE user_id = ? AND timestamp >= ? AND timestamp <= ?",
+                (user_id, since, until)
+            )
+            # Placeholder seqs, unique until _resequence numbers the user's rows
+            conn.executemany(
+                "INSERT INTO analytics_snapshots (user_id, timestamp, snapshot, completion_rate, engagement_score, seq)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [row + (-position,) for position, row in enumerate(encoded, start=1)]
+            )
+            self._resequence(conn, user_id)
+            conn.execute("DELETE FROM analytics_rollups WHERE user_id = ?", (user_id,))
+            self._update_rollups(conn, [
+                (user_id, timestamp, None, rate, engagement)
+                for timestamp, rate, engagement in conn.execute(
+                    "SELECT timestamp, completion_rate, engagement_score FROM analytics_snapshots WHERE user_id = ?",
+                    (user_id,)
+                ).fetchall()
+            ])
+            if marker is not None:
+                conn.execute(
+                    "INSERT INTO storage_meta (key, value) VALUES (?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (marker, until)
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def meta(self, prefix: str) -> Dict[str, str]:
+        """storage_meta entries whose key starts with `prefix`"""
+        rows = self._connect().execute(
+            "SELECT key, value FROM storage_meta WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+        ).fetchall()
+        return dict(rows)
+
+    def delete_meta(self, prefix: str) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM storage_meta WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def append_once(self, marker: str, rows_factory: Callable[[], List[Tuple[str, str, Dict]]]) -> int:
+        """
+        Append the rows returned by `rows_factory` unless `marker` is already
+        recorded. Check and insert share one transaction, so concurrent workers
+        import at most once. Returns the number of rows appended.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM storage_meta WHERE key = ?", (marker,)).fetchone():
+                conn.rollback()
+                return 0
+            rows = rows_factory()
+            self._insert(conn, [self._encode(u, t, snap) for u, t, snap in rows])
+            conn.execute(
+                "INSERT INTO storage_meta (key, value) VALUES (?, ?)", (marker, datetime.utcnow().isoformat())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return len(rows)
+
+
 class AnalyticsStorage:
     """Store and retrieve analytics data"""
     
-    def __init__(self, storage_path: str = "analytics_data"):
+    def __init__(self, storage_path: str = "analytics_data", db_path: Optional[str] = None):
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(exist_ok=True)
+        self.snapshots = SnapshotStore(db_path or self.storage_path / "analytics.db")
         self.processor = AnalyticsProcessor()
         self.insights_generator = InsightsGenerator()
+        self._import_legacy_snapshots()
     
     def process_and_store_webhook(self, webhook_data: Dict) -> Dict[str, any]:
         """
@@ -42,11 +522,11 @@ class AnalyticsStorage:
             # Store analytics
             self._store_analytics(analytics)
             
-            # Store raw webhook for future reprocessing
-            self._store_raw_webhook(webhook_data)
+            # Store raw webhook for future reprocessing (see src.analytics.replay)
+            self._store_raw_webhook(webhook_data, analytics.timestamp)
             
             return {
-                "analytics": self._analytics_to_dict(analytics),
+                "analytics": self.analytics_to_dict(analytics),
                 "insights": insights,
                 "timestamp": analytics.timestamp.isoformat()
             }
@@ -70,26 +550,54 @@ class AnalyticsStorage:
         Returns:
             List of analytics snapshots
         """
-        history = []
         cutoff_date = datetime.utcnow() - timedelta(days=days)
+        return self.snapshots.range(user_id, since=cutoff_date.isoformat())
+    
+    def get_user_analytics_page(
+        self,
+        user_id: str,
+        days: int = 30,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Dict[str, any]], Optional[str]]:
+        """
+        One page of a user's analytics history, oldest first
         
-        user_dir = self.storage_path / user_id
-        if not user_dir.exists():
-            return history
-        
-        for file_path in sorted(user_dir.glob("analytics_*.json")):
-            try:
-                with open(file_path, 'r') as f:
-                    data = json.load(f)
-                    
-                timestamp = datetime.fromisoformat(data['timestamp'])
-                if timestamp >= cutoff_date:
-                    history.append(data)
-                    
-            except Exception as e:
-                logger.warning(f"Error reading analytics file {file_path}: {e}")
-        
-        return history
+        Args:
+            user_id: User identifier
+            days: Number of days of history to page through
+            cursor: `next_cursor` of the previous page; None for the first page
+            limit: Maximum number of snapshots in the page
+            
+        Returns:
+            The snapshots, and the cursor of the next page (None on the last page)
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        after = self._decode_cursor(cursor) if cursor else None
+        snapshots, next_key = self.snapshots.page(user_id, since=cutoff_date.isoformat(), after=after, limit=limit)
+        return snapshots, self._encode_cursor(next_key) if next_key else None
+    
+    def iter_user_analytics_history(self, user_id: str, days: int = 30) -> Iterator[Dict[str, any]]:
+        """Like get_user_analytics_history, but yields snapshots as they are read from storage"""
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        return self.snapshots.iter_range(user_id, since=cutoff_date.isoformat())
+    
+    @staticmethod
+    def _encode_cursor(key: Tuple[str, int]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[str, int]:
+        try:
+            timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+        if not isinstance(timestamp, str) or not isinstance(row_id, int):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return timestamp, row_id
     
     def get_aggregated_analytics(
         self, 
@@ -112,25 +620,27 @@ class AnalyticsStorage:
             "quarter": 90
         }.get(period, 7)
         
-        history = self.get_user_analytics_history(user_id, days)
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        totals = self.snapshots.window_totals(user_id, cutoff_date.isoformat())
         
-        if not history:
+        if not totals:
             return {"error": "No data available"}
         
         # Aggregate metrics
-        total_snapshots = len(history)
-        avg_completion = sum(h['analytics']['overall_completion_rate'] for h in history) / total_snapshots
-        avg_engagement = sum(h['analytics']['engagement_score'] for h in history) / total_snapshots
+        total_snapshots = totals['count']
+        avg_completion = totals['sum_completion_rate'] / total_snapshots
+        avg_engagement = totals['sum_engagement_score'] / total_snapshots
         
-        # Trend analysis
+        # Trend analysis: older half vs newer half of the snapshots
         if total_snapshots > 1:
-            first_half = history[:total_snapshots//2]
-            second_half = history[total_snapshots//2:]
-            
-            first_avg = sum(h['analytics']['overall_completion_rate'] for h in first_half) / len(first_half)
-            second_avg = sum(h['analytics']['overall_completion_rate'] for h in second_half) / len(second_half)
+            first_count = totals['first_half_count']
+            first_sum = totals['first_half_completion_rate']
+            first_avg = first_sum / first_count
+            second_avg = (totals['sum_completion_rate'] - first_sum) / (total_snapshots - first_count)
             
-            trend = "improving" if second_avg > first_avg else "declining"
+            # Running-total differences carry rounding error; equal halves count as not improving
+            tolerance = 1e-9 * max(1.0, abs(first_avg))
+            trend = "improving" if second_avg - first_avg > tolerance else "declining"
         else:
             trend = "insufficient_data"
         
@@ -141,35 +651,94 @@ class AnalyticsStorage:
             "average_engagement_score": round(avg_engagement, 1),
             "trend": trend,
             "date_range": {
-                "start": history[0]['timestamp'],
-                "end": history[-1]['timestamp']
+                "start": totals['first_timestamp'],
+                "end": totals['last_timestamp']
             }
         }
     
-    def _store_analytics(self, analytics: UserAnalytics):
-        """Store analytics data to disk"""
-        user_dir = self.storage_path / analytics.user_id
-        user_dir.mkdir(exist_ok=True)
+    def get_rollups(self, user_id: str, granularity: str = "week", limit: int = 12) -> List[Dict[str, any]]:
+        """
+        Calendar-bucket summaries for a user, newest first
+        
+        Args:
+            user_id: User identifier
+            granularity: 'week', 'month', 'quarter' or 'all'
+            limit: Maximum number of buckets
+            
+        Returns:
+            Count, mean and standard deviation per bucket, plus first and last values
+        """
+        summaries = []
+        for rollup in self.snapshots.rollups(user_id, granularity, limit):
+            count = rollup['count']
+            mean_rate = rollup['sum_completion_rate'] / count
+            variance = max(rollup['sumsq_completion_rate'] / count - mean_rate ** 2, 0.0)
+            summaries.append({
+                "bucket_start": rollup['bucket_start'],
+                "snapshots": count,
+                "average_completion_rate": round(mean_rate, 1),
+                "completion_rate_stddev": round(variance ** 0.5, 1),
+                "average_engagement_score": round(rollup['sum_engagement_score'] / count, 1),
+                "first": {"timestamp": rollup['first_timestamp'], "completion_rate": rollup['first_completion_rate']},
+                "last": {"timestamp": rollup['last_timestamp'], "completion_rate": rollup['last_completion_rate']}
+            })
+        return summaries
+    
+    def get_raw_webhooks(
+        self,
+        user_id: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[Dict[str, any]]:
+        """
+        Raw webhooks received between `since` and `until`, oldest first,
+        whether still in their own files or compacted into daily bundles
         
-        timestamp = analytics.timestamp.strftime("%Y%m%d_%H%M%S")
-        file_path = user_dir / f"analytics_{timestamp}.json"
+        Returns:
+            Dicts with the receipt time and the webhook payload
+        """
+        return [
+            {"received_at": received_at.isoformat(), "webhook": payload}
+            for received_at, _, payload in iter_webhooks(self.storage_path, user_id, since, until)
+        ]
+    
+    def _store_analytics(self, analytics: UserAnalytics):
+        """Append an analytics snapshot to the store"""
+        self.snapshots.append(
+            analytics.user_id, analytics.timestamp.isoformat(), self.analytics_to_dict(analytics)
+        )
+    
+    def _import_legacy_snapshots(self):
+        """One-time import of the analytics_<timestamp>.json files written by earlier versions"""
+        def read_legacy_files():
+            rows = []
+            for file_path in sorted(self.storage_path.glob("*/analytics_*.json")):
+                try:
+                    with open(file_path, 'r') as f:
+                        data = json.load(f)
+                    rows.append((data['user_id'], data['timestamp'], data))
+                except Exception as e:
+                    logger.warning(f"Skipping legacy analytics file {file_path}: {e}")
+            return rows
         
-        with open(file_path, 'w') as f:
-            json.dump(self._analytics_to_dict(analytics), f, indent=2)
+        imported = self.snapshots.append_once("legacy_files_imported", read_legacy_files)
+        if imported:
+            logger.info(f"Imported {imported} legacy analytics snapshots")
     
-    def _store_raw_webhook(self, webhook_data: Dict):
-        """Store raw webhook data for future reprocessing"""
+    def _store_raw_webhook(self, webhook_data: Dict, received_at: datetime):
+        """Store raw webhook data for future reprocessing, named after the snapshot's timestamp"""
         user_id = webhook_data.get('userId', 'unknown')
         user_dir = self.storage_path / user_id / "webhooks"
         user_dir.mkdir(parents=True, exist_ok=True)
         
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        file_path = user_dir / f"webhook_{timestamp}.json"
+        # Microseconds, so webhooks received within the same second do not overwrite each other
+        file_path = user_dir / f"webhook_{received_at.strftime(RAW_WEBHOOK_TIME_FORMAT)}.json"
         
         with open(file_path, 'w') as f:
             json.dump(webhook_data, f, indent=2)
     
-    def _analytics_to_dict(self, analytics: UserAnalytics) -> Dict[str, any]:
+    @staticmethod
+    def analytics_to_dict(analytics: UserAnalytics) -> Dict[str, any]:
         """Convert analytics object to dictionary"""
         return {
             "user_id": analytics.user_id,
@@ -4,24 +4,279 @@ from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from collections import defaultdict
 import numpy as np
-from scipy import stats
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Same guard scipy.stats.linregress uses against division by zero when |r| == 1
+_TINY = 1.0e-20
+
+
+def _t_sf(t, df):
+    """Survival function of Student's t distribution."""
+    # scipy.stats takes about a second to import, so it is loaded with the first regression
+    from scipy import stats
+    return stats.t.sf(t, df)
+
+
+def regression_from_moments(
+    n: np.ndarray,
+    x_mean: np.ndarray,
+    y_mean: np.ndarray,
+    ssxm: np.ndarray,
+    ssym: np.ndarray,
+    ssxym: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    scipy.stats.linregress results from per-series moments, element-wise.
+
+    Args:
+        n: number of points
+        x_mean, y_mean: means of x and y
+        ssxm, ssym, ssxym: population variances of x and y and their covariance
+
+    Returns:
+        (slope, intercept, r_value, p_value); series with fewer than two
+        points get NaN, constant series get r = 0 and p = 1
+    """
+    n = np.asarray(n, dtype=float)
+    ssym = np.asarray(ssym, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.asarray(ssxym / ssxm, dtype=float)
+        intercept = np.asarray(y_mean - slope * x_mean, dtype=float)
+        r_value = np.clip(np.where(ssym == 0.0, 0.0, ssxym / np.sqrt(ssxm * ssym)), -1.0, 1.0)
+
+        df = n - 2
+        t = r_value * np.sqrt(df / ((1.0 - r_value + _TINY) * (1.0 + r_value + _TINY)))
+        p_value = 2 * _t_sf(np.abs(t), np.maximum(df, 1))
+        # Two points always fit exactly: p is 1 if they are equal, else 0
+        p_value = np.where(n == 2, np.where(ssym == 0.0, 1.0, 0.0), p_value)
+
+    invalid = n < 2
+    return tuple(np.where(invalid, np.nan, result) for result in (slope, intercept, r_value, p_value))
+
+
+def batched_linregress(values: np.ndarray, present: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Column-wise least squares, equivalent to calling scipy.stats.linregress(x, y)
+    on every column, where y is the column's present values and x their rank
+    (0, 1, 2, ...). Constant columns get r = 0 and p = 1.
+
+    Args:
+        values: time x column matrix (entries outside `present` are ignored)
+        present: boolean mask of the same shape
+
+    Returns:
+        (slope, intercept, r_value, p_value) arrays, one entry per column;
+        columns with fewer than two present values get NaN
+    """
+    n = present.sum(axis=0).astype(float)
+    x = np.cumsum(present, axis=0) - 1.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = np.where(present, x, 0.0).sum(axis=0) / n
+        y_mean = np.where(present, values, 0.0).sum(axis=0) / n
+        dx = np.where(present, x - x_mean, 0.0)
+        dy = np.where(present, values - y_mean, 0.0)
+        ssxm = (dx * dx).sum(axis=0) / n
+        ssym = (dy * dy).sum(axis=0) / n
+        ssxym = (dx * dy).sum(axis=0) / n
+    return regression_from_moments(n, x_mean, y_mean, ssxm, ssym, ssxym)
+
+
+def trend_summary(count: int, slope: float, r_value: float, p_value: float) -> Dict[str, Any]:
+    """The trend dict reported for one series (see TrendAnalyzer._calculate_trend)."""
+    if count < 2:
+        return {'direction': 'insufficient_data', 'slope': 0, 'strength': 0}
+
+    slope = float(slope)
+    if abs(slope) < 0.01:
+        direction = 'stable'
+    elif slope > 0:
+        direction = 'increasing'
+    else:
+        direction = 'decreasing'
+
+    return {
+        'direction': direction,
+        'slope': round(slope, 4),
+        'strength': abs(float(r_value)),
+        'p_value': float(p_value)
+    }
+
+
+class SeriesMatrix:
+    """
+    Several series aligned on one time axis, with their regressions computed
+    in one batched pass. A column's series is its present values in time
+    order; snapshots where it is missing are skipped, as if it had been
+    collected into its own list.
+    """
+
+    def __init__(self, rows: List[Dict[str, float]]):
+        first_keys = list(rows[0]) if rows else []
+        if all(list(row) == first_keys for row in rows):
+            # Common case: every snapshot has the same columns in the same order
+            self.columns = first_keys
+            self.values = np.array([list(row.values()) for row in rows], dtype=float).reshape(len(rows), len(first_keys))
+            self.present = np.ones(self.values.shape, dtype=bool)
+        else:
+            self.columns = []
+            index = {}
+            times, positions, entries = [], [], []
+            for t, row in enumerate(rows):
+                for column, value in row.items():
+                    position = index.get(column)
+                    if position is None:
+                        position = index[column] = len(self.columns)
+                        self.columns.append(column)
+                    times.append(t)
+                    positions.append(position)
+                    entries.append(value)
+
+            # Fill both matrices with one scatter each rather than per-element writes
+            self.values = np.full((len(rows), len(self.columns)), np.nan)
+            self.present = np.zeros(self.values.shape, dtype=bool)
+            self.values[times, positions] = entries
+            self.present[times, positions] = True
+
+        self.counts = self.present.sum(axis=0)
+        self.slope, self.intercept, self.r_value, self.p_value = batched_linregress(self.values, self.present)
+
+        # Last three present values per column, for momentum and forecasts
+        rank = np.cumsum(self.present, axis=0) - 1
+        self._last = [
+            np.where(self.present & (rank == self.counts - k), self.values, 0.0).sum(axis=0)
+            for k in (1, 2, 3)
+        ]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.columns
+
+    def index(self, column: str) -> int:
+        return self.columns.index(column)
+
+    def series(self, i: int) -> np.ndarray:
+        return self.values[self.present[:, i], i]
+
+    def last(self, i: int) -> float:
+        return float(self._last[0][i])
+
+    def trend(self, i: int) -> Dict[str, Any]:
+        """Same structure as TrendAnalyzer._calculate_trend for column i."""
+        return trend_summary(self.counts[i], self.slope[i], self.r_value[i], self.p_value[i])
+
+    def volatility(self) -> np.ndarray:
+        """Coefficient of variation (population std / mean) in percent; 0 with <2 values or zero mean."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(self.present, self.values, 0.0).sum(axis=0) / self.counts
+            deviation = np.where(self.present, self.values - mean, 0.0)
+            std = np.sqrt((deviation * deviation).sum(axis=0) / self.counts)
+            volatility = std / mean * 100
+        return np.where((self.counts < 2) | (mean == 0), 0.0, volatility)
+
+    def correlation(self, min_periods: int = 3) -> np.ndarray:
+        """
+        Pearson correlation between every pair of columns, over the snapshots
+        where both are present. Pairs with fewer than `min_periods` shared
+        values, or where either side is constant, are NaN.
+        """
+        k = len(self.columns)
+        if self.present.all():
+            # Common case: one np.corrcoef over the non-constant columns
+            matrix = np.full((k, k), np.nan)
+            if len(self.values) >= min_periods:
+                varying = np.flatnonzero(self.values.std(axis=0) > 0)
+                if len(varying):
+                    matrix[np.ix_(varying, varying)] = np.corrcoef(self.values[:, varying], rowvar=False)
+            return matrix
+
+        # Pairwise-complete sums from one matrix product each; [i, j] is over rows where both are present
+        mask = self.present.astype(float)
+        values = np.where(self.present, self.values, 0.0)
+        n = mask.T @ mask
+        sums = values.T @ mask
+        squares = (values * values).T @ mask
+        products = values.T @ values
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = squares - sums * sums / n
+            cov = products - sums * sums.T / n
+            matrix = cov / np.sqrt(var * var.T)
+        # Relative tolerance: the sums above do not cancel exactly for constant series
+        constant = var <= 1e-12 * squares
+        invalid = (n < min_periods) | constant | constant.T
+        return np.where(invalid, np.nan, np.clip(matrix, -1.0, 1.0))
+
+    def momentum(self) -> np.ndarray:
+        """Latest change relative to the previous change; 0 with <3 values or no previous change."""
+        last, previous, before = self._last
+        recent_change = last - previous
+        previous_change = previous - before
+        with np.errstate(invalid='ignore', divide='ignore'):
+            momentum = recent_change / np.abs(previous_change)
+        return np.where((self.counts < 3) | (previous_change == 0), 0.0, momentum)
+
+
+class _TrendInputs:
+    """
+    Every series analyze_trends needs, extracted from the snapshots once.
+    With online accumulators, pillar trends are read from them instead.
+    """
+
+    def __init__(self, metrics: List[Dict[str, Any]], accumulators: Optional[Any] = None):
+        self.metrics = metrics
+        self.accumulators = accumulators
+        self.completion = SeriesMatrix([
+            {pillar: data['completion_score'] for pillar, data in m['pillar_metrics'].items()} for m in metrics
+        ])
+        self.engagement = None if accumulators is not None else SeriesMatrix([
+            {pillar: data['engagement_rate'] for pillar, data in m['pillar_metrics'].items()} for m in metrics
+        ])
+        self.consistency = SeriesMatrix([
+            {pillar: data.get('consistency_score', 0) for pillar, data in m['pillar_metrics'].items()} for m in metrics
+        ])
+        self.routines = SeriesMatrix([
+            {f"{r['routine_id']}_{r['routine_name']}": r['adherence_rate'] for r in m['routine_metrics']} for m in metrics
+        ])
+        self.overall = SeriesMatrix([
+            {
+                'engagement_score': m['engagement_metrics']['engagement_score'],
+                'habit_formation_index': m['performance_indicators']['habit_formation_index']
+            }
+            for m in metrics
+        ])
+        self._pillar_trends = None
+
+    def pillar_trends(self, analyzer: 'TrendAnalyzer') -> Dict[str, Any]:
+        if self._pillar_trends is None:
+            self._pillar_trends = analyzer._analyze_pillar_trends(self)
+        return self._pillar_trends
+
+    def pillar_counts(self) -> Dict[str, int]:
+        """Number of values behind each pillar's trends."""
+        if self.accumulators is not None:
+            return {
+                pillar: series['completion_score'].n
+                for pillar, series in self.accumulators.pillars.items()
+            }
+        return dict(zip(self.completion.columns, self.completion.counts.tolist()))
+
 
 class TrendAnalyzer:
     """Analyze trends and patterns in user completion data."""
     
-    def __init__(self):
-        self.trend_cache = defaultdict(list)
-    
-    def analyze_trends(self, historical_metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze_trends(
+        self,
+        historical_metrics: List[Dict[str, Any]],
+        accumulators: Optional[Any] = None
+    ) -> Dict[str, Any]:
         """
         Analyze trends from historical metrics data.
         
         Args:
             historical_metrics: List of historical metrics from MetricsCalculator
+            accumulators: Optional online_stats.TrendAccumulators of the account,
+                over the same snapshots as historical_metrics; pillar trends are
+                read from them instead of recomputed
             
         Returns:
             Trend analysis results
@@ -29,79 +284,83 @@ class TrendAnalyzer:
         if len(historical_metrics) < 2:
             return self._empty_trends()
         
+        inputs = _TrendInputs(historical_metrics, accumulators)
+        
         trends = {
             'period_analyzed': {
                 'start': historical_metrics[0]['timestamp'],
                 'end': historical_metrics[-1]['timestamp'],
                 'days': self._calculate_days_between(historical_metrics[0]['timestamp'], historical_metrics[-1]['timestamp'])
             },
-            'pillar_trends': self._analyze_pillar_trends(historical_metrics),
-            'routine_trends': self._analyze_routine_trends(historical_metrics),
-            'engagement_trends': self._analyze_engagement_trends(historical_metrics),
-            'pattern_analysis': self._analyze_patterns(historical_metrics),
-            'predictions': self._generate_predictions(historical_metrics)
+            'pillar_trends': inputs.pillar_trends(self),
+            'routine_trends': self._analyze_routine_trends(inputs),
+            'engagement_trends': self._analyze_engagement_trends(inputs),
+            'pattern_analysis': self._analyze_patterns(inputs),
+            'predictions': self._generate_predictions(inputs)
         }
         
         return trends
     
-    def _analyze_pillar_trends(self, metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_pillar_trends(self, inputs: _TrendInputs) -> Dict[str, Any]:
         """Analyze trends for each pillar."""
+        if inputs.accumulators is not None:
+            return self._pillar_trends_from_accumulators(inputs.accumulators)
+
         pillar_trends = {}
+        completion, engagement = inputs.completion, inputs.engagement
+        volatility = completion.volatility()
+        momentum = completion.momentum()
         
-        # Extract time series for each pillar
-        pillar_series = defaultdict(lambda: {'completion_scores': [], 'engagement_rates': [], 'timestamps': []})
-        
-        for metric in metrics:
-            timestamp = datetime.fromisoformat(metric['timestamp'])
-            
-            for pillar, data in metric['pillar_metrics'].items():
-                pillar_series[pillar]['completion_scores'].append(data['completion_score'])
-                pillar_series[pillar]['engagement_rates'].append(data['engagement_rate'])
-                pillar_series[pillar]['timestamps'].append(timestamp)
-        
-        # Analyze each pillar
-        for pillar, series in pillar_series.items():
+        for i, pillar in enumerate(completion.columns):
+            completion_trend = completion.trend(i)
             pillar_trends[pillar] = {
-                'completion_trend': self._calculate_trend(series['completion_scores']),
-                'engagement_trend': self._calculate_trend(series['engagement_rates']),
-                'volatility': self._calculate_volatility(series['completion_scores']),
-                'momentum': self._calculate_momentum(series['completion_scores']),
-                'forecast': self._forecast_next_period(series['completion_scores'])
+                'completion_trend': completion_trend,
+                'engagement_trend': engagement.trend(engagement.index(pillar)),
+                'volatility': float(volatility[i]),
+                'momentum': float(momentum[i]),
+                'forecast': self._forecast_from_trend(completion.last(i), completion_trend)
             }
         
         return pillar_trends
     
-    def _analyze_routine_trends(self, metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _pillar_trends_from_accumulators(self, accumulators: Any) -> Dict[str, Any]:
+        """Same as _analyze_pillar_trends, read in O(1) per pillar from running statistics."""
+        pillar_trends = {}
+        for pillar, series in accumulators.pillars.items():
+            completion = series['completion_score']
+            completion_trend = completion.trend()
+            pillar_trends[pillar] = {
+                'completion_trend': completion_trend,
+                'engagement_trend': series['engagement_rate'].trend(),
+                'volatility': completion.volatility(),
+                'momentum': completion.momentum(),
+                'forecast': self._forecast_from_trend(completion.last(), completion_trend)
+            }
+        return pillar_trends
+    
+    def _analyze_routine_trends(self, inputs: _TrendInputs) -> Dict[str, Any]:
         """Analyze trends for individual routines."""
-        routine_performance = defaultdict(lambda: {'adherence_rates': [], 'timestamps': []})
-        
-        for metric in metrics:
-            timestamp = datetime.fromisoformat(metric['timestamp'])
-            
-            for routine in metric['routine_metrics']:
-                key = f"{routine['routine_id']}_{routine['routine_name']}"
-                routine_performance[key]['adherence_rates'].append(routine['adherence_rate'])
-                routine_performance[key]['timestamps'].append(timestamp)
+        routines = inputs.routines
         
         # Identify top improving and declining routines
         improvements = []
         declines = []
         
-        for routine_key, data in routine_performance.items():
-            if len(data['adherence_rates']) >= 2:
-                trend = self._calculate_trend(data['adherence_rates'])
+        for i, routine_key in enumerate(routines.columns):
+            if routines.counts[i] >= 2:
+                trend = routines.trend(i)
                 
                 if trend['direction'] == 'increasing' and trend['strength'] > 0.1:
                     improvements.append({
                         'routine': routine_key.split('_', 1)[1],
                         'improvement_rate': trend['slope'],
-                        'current_adherence': data['adherence_rates'][-1]
+                        'current_adherence': routines.last(i)
                     })
                 elif trend['direction'] == 'decreasing' and abs(trend['strength']) > 0.1:
                     declines.append({
                         'routine': routine_key.split('_', 1)[1],
                         'decline_rate': abs(trend['slope']),
-                        'current_adherence': data['adherence_rates'][-1]
+                        'current_adherence': routines.last(i)
                     })
         
         # Sort by rate of change
@@ -111,25 +370,20 @@ class TrendAnalyzer:
         return {
             'top_improving': improvements[:5],
             'top_declining': declines[:5],
-            'total_routines_analyzed': len(routine_performance)
+            'total_routines_analyzed': len(routines.columns)
         }
     
-    def _analyze_engagement_trends(self, metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_engagement_trends(self, inputs: _TrendInputs) -> Dict[str, Any]:
         """Analyze overall engagement trends."""
-        engagement_scores = []
-        completion_velocities = []
-        habit_indices = []
-        timestamps = []
-        
-        for metric in metrics:
-            engagement_scores.append(metric['engagement_metrics']['engagement_score'])
-            completion_velocities.append(metric['performance_indicators']['completion_velocity'])
-            habit_indices.append(metric['performance_indicators']['habit_formation_index'])
-            timestamps.append(datetime.fromisoformat(metric['timestamp']))
+        overall = inputs.overall
+        engagement_index = overall.index('engagement_score')
+        habit_index = overall.index('habit_formation_index')
+        engagement_scores = overall.series(engagement_index)
+        completion_velocities = [m['performance_indicators']['completion_velocity'] for m in inputs.metrics]
         
         # Calculate trends
-        engagement_trend = self._calculate_trend(engagement_scores)
-        habit_trend = self._calculate_trend(habit_indices)
+        engagement_trend = overall.trend(engagement_index)
+        habit_trend = overall.trend(habit_index)
         
         # Analyze velocity changes
         velocity_distribution = {
@@ -141,25 +395,26 @@ class TrendAnalyzer:
         return {
             'overall_engagement': {
                 'trend': engagement_trend,
-                'current_score': engagement_scores[-1] if engagement_scores else 0,
-                'average_score': np.mean(engagement_scores) if engagement_scores else 0,
-                'peak_score': max(engagement_scores) if engagement_scores else 0
+                'current_score': overall.last(engagement_index),
+                'average_score': float(np.mean(engagement_scores)),
+                'peak_score': float(np.max(engagement_scores))
             },
             'habit_formation': {
                 'trend': habit_trend,
-                'current_index': habit_indices[-1] if habit_indices else 0,
+                'current_index': overall.last(habit_index),
                 'improvement_rate': habit_trend['slope'] if habit_trend else 0
             },
             'velocity_analysis': velocity_distribution
         }
     
-    def _analyze_patterns(self, metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_patterns(self, inputs: _TrendInputs) -> Dict[str, Any]:
         """Analyze patterns in user behavior."""
+        metrics = inputs.metrics
         patterns = {
             'weekly_patterns': self._analyze_weekly_patterns(metrics),
-            'pillar_correlations': self._analyze_pillar_correlations(metrics),
+            'pillar_correlations': self._analyze_pillar_correlations(inputs),
             'engagement_clusters': self._identify_engagement_clusters(metrics),
-            'consistency_patterns': self._analyze_consistency_patterns(metrics)
+            'consistency_patterns': self._analyze_consistency_patterns(inputs)
         }
         
         return patterns
@@ -200,31 +455,38 @@ class TrendAnalyzer:
             'worst_day': {'day': worst_day[0], 'average_completions': worst_day[1]}
         }
     
-    def _analyze_pillar_correlations(self, metrics: List[Dict[str, Any]]) -> Dict[str, float]:
+    def _analyze_pillar_correlations(self, inputs: _TrendInputs) -> Dict[str, float]:
         """Analyze correlations between pillar performances."""
-        # Extract time series for each pillar
-        pillar_scores = defaultdict(list)
-        
-        for metric in metrics:
-            for pillar, data in metric['pillar_metrics'].items():
-                pillar_scores[pillar].append(data['completion_score'])
-        
-        # Calculate correlations
-        correlations = {}
-        pillars = list(pillar_scores.keys())
-        
-        for i in range(len(pillars)):
-            for j in range(i + 1, len(pillars)):
-                pillar1, pillar2 = pillars[i], pillars[j]
-                
-                if len(pillar_scores[pillar1]) >= 3 and len(pillar_scores[pillar2]) >= 3:
-                    # Check if arrays have variance (not constant)
-                    if np.std(pillar_scores[pillar1]) > 0 and np.std(pillar_scores[pillar2]) > 0:
-                        correlation, _ = stats.pearsonr(pillar_scores[pillar1], pillar_scores[pillar2])
-                        correlations[f"{pillar1}_vs_{pillar2}"] = round(correlation, 3)
-        
-        return correlations
-    
+        pillars = inputs.completion.columns
+        matrix = inputs.completion.correlation()
+        rows, cols = np.triu_indices(len(pillars), k=1)
+        return {
+            f"{pillars[i]}_vs_{pillars[j]}": round(float(matrix[i, j]), 3)
+            for i, j in zip(rows, cols)
+            if not np.isnan(matrix[i, j])
+        }
+
+    def pillar_correlation_matrix(self, historical_metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Correlations between pillar completion scores as a full matrix.
+
+        Returns:
+            {'pillars': [...], 'matrix': [[...]]}, rows and columns in pillar
+            order; pairs without enough data or with a constant pillar are None
+        """
+        completion = SeriesMatrix([
+            {pillar: data['completion_score'] for pillar, data in m['pillar_metrics'].items()}
+            for m in historical_metrics
+        ])
+        matrix = completion.correlation()
+        return {
+            'pillars': list(completion.columns),
+            'matrix': [
+                [None if np.isnan(value) else round(float(value), 3) for value in row]
+                for row in matrix
+            ]
+        }
+
     def _identify_engagement_clusters(self, metrics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Identify clusters of high/low engagement periods."""
         engagement_scores = [m['engagement_metrics']['engagement_score'] for m in metrics]
@@ -270,55 +532,49 @@ class TrendAnalyzer:
         
         return clusters
     
-    def _analyze_consistency_patterns(self, metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_consistency_patterns(self, inputs: _TrendInputs) -> Dict[str, Any]:
         """Analyze consistency patterns across pillars."""
-        consistency_scores = defaultdict(list)
-        
-        for metric in metrics:
-            for pillar, data in metric['pillar_metrics'].items():
-                consistency_scores[pillar].append(data.get('consistency_score', 0))
-        
-        # Calculate consistency trends
+        consistency = inputs.consistency
         consistency_analysis = {}
         
-        for pillar, scores in consistency_scores.items():
-            if len(scores) >= 2:
-                trend = self._calculate_trend(scores)
+        for i, pillar in enumerate(consistency.columns):
+            if consistency.counts[i] >= 2:
+                trend = consistency.trend(i)
                 consistency_analysis[pillar] = {
-                    'current_consistency': scores[-1] if scores else 0,
-                    'average_consistency': np.mean(scores),
+                    'current_consistency': consistency.last(i),
+                    'average_consistency': float(np.mean(consistency.series(i))),
                     'trend': trend['direction'],
                     'is_improving': trend['direction'] == 'increasing'
                 }
         
         return consistency_analysis
     
-    def _generate_predictions(self, metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _generate_predictions(self, inputs: _TrendInputs) -> Dict[str, Any]:
         """Generate predictions based on historical trends."""
-        if len(metrics) < 3:
+        if len(inputs.metrics) < 3:
             return {'status': 'insufficient_data'}
         
         predictions = {
-            'next_week_engagement': self._predict_next_engagement(metrics),
-            'pillar_forecasts': self._predict_pillar_performance(metrics),
-            'risk_analysis': self._analyze_risks(metrics),
-            'opportunity_analysis': self._analyze_opportunities(metrics)
+            'next_week_engagement': self._predict_next_engagement(inputs),
+            'pillar_forecasts': self._predict_pillar_performance(inputs),
+            'risk_analysis': self._analyze_risks(inputs),
+            'opportunity_analysis': self._analyze_opportunities(inputs)
         }
         
         return predictions
     
-    def _predict_next_engagement(self, metrics: List[Dict[str, Any]]) -> Dict[str, float]:
+    def _predict_next_engagement(self, inputs: _TrendInputs) -> Dict[str, float]:
         """Predict next week's engagement score."""
-        engagement_scores = [m['engagement_metrics']['engagement_score'] for m in metrics]
+        overall = inputs.overall
+        i = overall.index('engagement_score')
+        n = int(overall.counts[i])
         
-        if len(engagement_scores) < 3:
-            return {'predicted_score': engagement_scores[-1] if engagement_scores else 50}
+        if n < 3:
+            return {'predicted_score': overall.last(i) if n else 50}
         
         # Simple linear regression prediction
-        x = np.arange(len(engagement_scores))
-        slope, intercept, _, _, _ = stats.linregress(x, engagement_scores)
-        
-        next_score = slope * len(engagement_scores) + intercept
+        slope = float(overall.slope[i])
+        next_score = slope * n + float(overall.intercept[i])
         
         # Bound prediction between 0 and 100
         next_score = max(0, min(100, next_score))
@@ -329,20 +585,14 @@ class TrendAnalyzer:
             'trend_strength': abs(slope)
         }
     
-    def _predict_pillar_performance(self, metrics: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    def _predict_pillar_performance(self, inputs: _TrendInputs) -> Dict[str, Dict[str, float]]:
         """Predict performance for each pillar."""
         pillar_predictions = {}
+        pillar_trends = inputs.pillar_trends(self)
         
-        # Extract pillar scores
-        pillar_scores = defaultdict(list)
-        for metric in metrics:
-            for pillar, data in metric['pillar_metrics'].items():
-                pillar_scores[pillar].append(data['completion_score'])
-        
-        # Predict for each pillar
-        for pillar, scores in pillar_scores.items():
-            if len(scores) >= 3:
-                forecast = self._forecast_next_period(scores)
+        for pillar, count in inputs.pillar_counts().items():
+            if count >= 3:
+                forecast = pillar_trends[pillar]['forecast']
                 pillar_predictions[pillar] = {
                     'predicted_score': forecast['value'],
                     'trend': forecast['trend'],
@@ -351,8 +601,9 @@ class TrendAnalyzer:
         
         return pillar_predictions
     
-    def _analyze_risks(self, metrics: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    def _analyze_risks(self, inputs: _TrendInputs) -> List[Dict[str, str]]:
         """Analyze risks based on trends."""
+        metrics = inputs.metrics
         risks = []
         
         # Check for declining engagement
@@ -375,7 +626,7 @@ class TrendAnalyzer:
                 })
         
         # Check for high volatility
-        for pillar, trends in self._analyze_pillar_trends(metrics).items():
+        for pillar, trends in inputs.pillar_trends(self).items():
             if trends['volatility'] > 30:
                 risks.append({
                     'type': 'high_volatility',
@@ -385,14 +636,14 @@ class TrendAnalyzer:
         
         return risks
     
-    def _analyze_opportunities(self, metrics: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    def _analyze_opportunities(self, inputs: _TrendInputs) -> List[Dict[str, str]]:
         """Identify opportunities for improvement."""
         opportunities = []
         
-        latest_metric = metrics[-1]
+        latest_metric = inputs.metrics[-1]
         
         # Check for pillars with momentum
-        pillar_trends = self._analyze_pillar_trends(metrics)
+        pillar_trends = inputs.pillar_trends(self)
         for pillar, trends in pillar_trends.items():
             if trends['momentum'] > 0.5 and trends['completion_trend']['direction'] == 'increasing':
                 opportunities.append({
@@ -414,61 +665,16 @@ class TrendAnalyzer:
     
     def _calculate_trend(self, values: List[float]) -> Dict[str, Any]:
         """Calculate trend from a series of values."""
-        if len(values) < 2:
-            return {'direction': 'insufficient_data', 'slope': 0, 'strength': 0}
-        
-        x = np.arange(len(values))
-        slope, intercept, r_value, p_value, std_err = stats.linregress(x, values)
-        
-        # Determine direction
-        if abs(slope) < 0.01:
-            direction = 'stable'
-        elif slope > 0:
-            direction = 'increasing'
-        else:
-            direction = 'decreasing'
-        
-        return {
-            'direction': direction,
-            'slope': round(slope, 4),
-            'strength': abs(r_value),
-            'p_value': p_value
-        }
-    
-    def _calculate_volatility(self, values: List[float]) -> float:
-        """Calculate volatility as coefficient of variation."""
-        if len(values) < 2:
-            return 0
-        
-        mean_val = np.mean(values)
-        if mean_val == 0:
-            return 0
-        
-        std_val = np.std(values)
-        return (std_val / mean_val) * 100
-    
-    def _calculate_momentum(self, values: List[float]) -> float:
-        """Calculate momentum as rate of change."""
-        if len(values) < 3:
-            return 0
-        
-        recent_change = values[-1] - values[-2]
-        previous_change = values[-2] - values[-3]
-        
-        if previous_change == 0:
-            return 0
-        
-        return recent_change / abs(previous_change)
+        return SeriesMatrix([{'value': value} for value in values]).trend(0) if values else \
+            {'direction': 'insufficient_data', 'slope': 0, 'strength': 0}
     
-    def _forecast_next_period(self, values: List[float]) -> Dict[str, Any]:
-        """Simple forecast for next period."""
-        if len(values) < 2:
-            return {'value': values[-1] if values else 50, 'trend': 'stable', 'confidence': 'low'}
-        
-        trend = self._calculate_trend(values)
+    def _forecast_from_trend(self, last_value: float, trend: Dict[str, Any]) -> Dict[str, Any]:
+        """Simple forecast for next period from the latest value and its trend."""
+        if trend['direction'] == 'insufficient_data':
+            return {'value': last_value, 'trend': 'stable', 'confidence': 'low'}
         
         # Simple linear extrapolation
-        next_value = values[-1] + trend['slope']
+        next_value = last_value + trend['slope']
         
         # Bound between 0 and 100
         next_value = max(0, min(100, next_value))
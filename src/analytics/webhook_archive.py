@@ -0,0 +1,306 @@
+"""
+Raw webhook archive: fresh per-delivery files plus compacted daily bundles.
+
+AnalyticsStorage writes every delivery to
+<storage_path>/<user_id>/webhooks/webhook_<received_at>.json. The compactor
+rolls the files of finished days into webhooks_<YYYYMMDD>.ndjson.gz, one
+gzip member per webhook (so the bundle is also plain gzip'd NDJSON), with an
+index webhooks_<YYYYMMDD>.idx.json of each record's name, offset and length.
+A single webhook can then be read without decompressing the rest of its day.
+
+The index is written before the compacted files are deleted and is the only
+record of what a bundle holds, so an interrupted compaction leaves either
+the files or an indexed copy of them; readers prefer the bundle when both
+exist. Run from the repository root, e.g. daily:
+
+    python -m src.analytics.webhook_archive --storage-path analytics_data
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# File names of fresh webhooks; files written before microseconds were added use the legacy format
+RAW_WEBHOOK_TIME_FORMAT = "%Y%m%d_%H%M%S_%f"
+_LEGACY_TIME_FORMAT = "%Y%m%d_%H%M%S"
+_DAY_FORMAT = "%Y%m%d"
+
+
+def parse_received_at(file_name: str) -> Optional[Tuple[datetime, bool]]:
+    """(received_at, has_microseconds) from a raw webhook file name, or None if it is not one."""
+    if not (file_name.startswith("webhook_") and file_name.endswith(".json")):
+        return None
+    stamp = file_name[len("webhook_"):-len(".json")]
+    for time_format, precise in ((RAW_WEBHOOK_TIME_FORMAT, True), (_LEGACY_TIME_FORMAT, False)):
+        try:
+            return datetime.strptime(stamp, time_format), precise
+        except ValueError:
+            continue
+    return None
+
+
+def webhook_dir(storage_path: Path, user_id: str) -> Path:
+    return Path(storage_path) / user_id / "webhooks"
+
+
+def _bundle_paths(directory: Path, day: date) -> Tuple[Path, Path]:
+    stem = f"webhooks_{day.strftime(_DAY_FORMAT)}"
+    return directory / f"{stem}.ndjson.gz", directory / f"{stem}.idx.json"
+
+
+def _bundle_day(file_name: str) -> Optional[date]:
+    if not (file_name.startswith("webhooks_") and file_name.endswith(".idx.json")):
+        return None
+    try:
+        return datetime.strptime(file_name[len("webhooks_"):-len(".idx.json")], _DAY_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def _read_index(index_path: Path) -> List[List[Any]]:
+    """[name, offset, length] of every record of a bundle; empty if it has no index yet."""
+    try:
+        with open(index_path, 'r') as f:
+            return json.load(f)['records']
+    except FileNotFoundError:
+        return []
+
+
+def _read_record(bundle_path: Path, offset: int, length: int) -> Dict[str, Any]:
+    with open(bundle_path, 'rb') as f:
+        f.seek(offset)
+        return json.loads(gzip.decompress(f.read(length)))['webhook']
+
+
+def _write_atomically(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class _Entry:
+    __slots__ = ('received_at', 'precise', 'name', 'path', 'day', 'offset', 'length')
+
+    def __init__(self, received_at, precise, name, path=None, day=None, offset=None, length=None):
+        self.received_at = received_at
+        self.precise = precise
+        self.name = name
+        self.path = path
+        self.day = day
+        self.offset = offset
+        self.length = length
+
+
+def _entries(directory: Path) -> List[_Entry]:
+    """Every webhook of the directory, bundled or fresh, oldest first."""
+    # List the fresh files before reading the indexes: a file compacted in between is then in an index
+    fresh = []
+    bundle_days = []
+    for path in directory.iterdir() if directory.is_dir() else ():
+        parsed = parse_received_at(path.name)
+        if parsed is not None:
+            fresh.append(_Entry(parsed[0], parsed[1], path.name, path=path))
+        elif _bundle_day(path.name) is not None:
+            bundle_days.append(_bundle_day(path.name))
+
+    entries = {}
+    for day in bundle_days:
+        for name, offset, length in _read_index(_bundle_paths(directory, day)[1]):
+            received_at, precise = parse_received_at(name)
+            entries[name] = _Entry(received_at, precise, name, day=day, offset=offset, length=length)
+    for entry in fresh:
+        entries.setdefault(entry.name, entry)
+    return sorted(entries.values(), key=lambda entry: (entry.received_at, entry.name))
+
+
+def _load(directory: Path, entry: _Entry) -> Optional[Dict[str, Any]]:
+    if entry.path is not None:
+        try:
+            with open(entry.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            # Compacted since it was listed; its day's index now holds it
+            day = entry.received_at.date()
+            for name, offset, length in _read_index(_bundle_paths(directory, day)[1]):
+                if name == entry.name:
+                    return _read_record(_bundle_paths(directory, day)[0], offset, length)
+            logger.warning(f"Webhook {entry.path} disappeared while reading")
+            return None
+    return _read_record(_bundle_paths(directory, entry.day)[0], entry.offset, entry.length)
+
+
+def iter_webhooks(
+    storage_path: Path,
+    user_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Iterator[Tuple[datetime, bool, Dict[str, Any]]]:
+    """
+    The user's raw webhooks with since <= received_at <= until, oldest first,
+    as (received_at, has_microseconds, payload). Reads compacted bundles and
+    fresh files alike, one webhook at a time.
+    """
+    directory = webhook_dir(storage_path, user_id)
+    for entry in _entries(directory):
+        if (since is not None and entry.received_at < since) or (until is not None and entry.received_at > until):
+            continue
+        try:
+            payload = _load(directory, entry)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable webhook {entry.name} of user {user_id}: {e}")
+            continue
+        if payload is not None:
+            yield entry.received_at, entry.precise, payload
+
+
+def count_webhooks(storage_path: Path, user_id: str) -> int:
+    return len(_entries(webhook_dir(storage_path, user_id)))
+
+
+def users_with_webhooks(storage_path: Path) -> List[str]:
+    return sorted(path.parent.name for path in Path(storage_path).glob("*/webhooks") if path.is_dir())
+
+
+def compact_user(directory: Path, before: date) -> int:
+    """
+    Move the fresh files received before `before` into their daily bundles.
+
+    Returns:
+        Number of files compacted
+    """
+    by_day: Dict[date, List[Path]] = {}
+    for path in directory.iterdir():
+        parsed = parse_received_at(path.name)
+        if parsed is not None and parsed[0].date() < before:
+            by_day.setdefault(parsed[0].date(), []).append(path)
+
+    compacted = 0
+    for day, paths in sorted(by_day.items()):
+        bundle_path, index_path = _bundle_paths(directory, day)
+        records = _read_index(index_path)
+        end = records[-1][1] + records[-1][2] if records else 0
+        size = bundle_path.stat().st_size if bundle_path.exists() else 0
+        if size < end:
+            # The bundle lost indexed bytes: keep the records it still holds and
+            # rebuild the rest of the index from the fresh files that are left
+            kept = [record for record in records if record[1] + record[2] <= size]
+            logger.warning(
+                f"Bundle {bundle_path} is missing {len(records) - len(kept)} indexed webhooks; rebuilding its index"
+            )
+            records = kept
+            end = records[-1][1] + records[-1][2] if records else 0
+        indexed = {record[0] for record in records}
+        # Bytes past the indexed records are from an interrupted compaction
+        with open(bundle_path, 'ab') as bundle:
+            bundle.truncate(end)
+            for path in sorted(paths, key=lambda p: p.name):
+                if path.name in indexed:
+                    continue
+                try:
+                    with open(path, 'r') as f:
+                        webhook = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Leaving unreadable webhook {path} uncompacted: {e}")
+                    paths.remove(path)
+                    continue
+                line = json.dumps({'name': path.name, 'webhook': webhook}, separators=(',', ':')) + "\n"
+                member = gzip.compress(line.encode(), mtime=0)
+                bundle.write(member)
+                records.append([path.name, end, len(member)])
+                end += len(member)
+            bundle.flush()
+            os.fsync(bundle.fileno())
+        _write_atomically(index_path, json.dumps({'records': records}).encode())
+        for path in paths:
+            path.unlink()
+            compacted += 1
+    return compacted
+
+
+def expire_user(directory: Path, before: date) -> int:
+    """Delete the bundles and fresh files received before `before`; returns the number of webhooks deleted."""
+    deleted = 0
+    for path in list(directory.iterdir()):
+        parsed = parse_received_at(path.name)
+        if parsed is not None and parsed[0].date() < before:
+            path.unlink()
+            deleted += 1
+            continue
+        day = _bundle_day(path.name)
+        if day is not None and day < before:
+            bundle_path, index_path = _bundle_paths(directory, day)
+            deleted += len(_read_index(index_path))
+            # Index last: a crash in between leaves an unindexed bundle, which compaction truncates
+            if bundle_path.exists():
+                bundle_path.unlink()
+            index_path.unlink()
+    return deleted
+
+
+def compact(
+    storage_path: str = "analytics_data",
+    compact_after_days: int = 1,
+    retention_days: int = 0,
+    today: Optional[date] = None
+) -> Dict[str, int]:
+    """
+    Compact and expire every user's raw webhooks.
+
+    Args:
+        storage_path: AnalyticsStorage directory holding <user_id>/webhooks
+        compact_after_days: Bundle the files of days at least this old (today is never compacted)
+        retention_days: Delete webhooks older than this many days; 0 keeps them forever
+        today: Reference date, for tests
+
+    Returns:
+        Users processed, files compacted and webhooks deleted
+    """
+    today = today or datetime.utcnow().date()
+    compact_before = today - timedelta(days=max(compact_after_days, 1) - 1)
+    result = {'users': 0, 'compacted': 0, 'expired': 0}
+    for user_id in users_with_webhooks(Path(storage_path)):
+        directory = webhook_dir(Path(storage_path), user_id)
+        try:
+            if retention_days > 0:
+                result['expired'] += expire_user(directory, today - timedelta(days=retention_days))
+            result['compacted'] += compact_user(directory, compact_before)
+        except OSError as e:
+            logger.error(f"Compacting webhooks of user {user_id} failed: {e}")
+            continue
+        result['users'] += 1
+    logger.info(
+        f"Compacted {result['compacted']} webhook files and expired {result['expired']} webhooks"
+        f" across {result['users']} users"
+    )
+    return result
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compact and expire stored raw webhooks")
+    parser.add_argument("--storage-path", default="analytics_data", help="AnalyticsStorage directory")
+    parser.add_argument("--compact-after-days", type=int, default=Config.WEBHOOK_COMPACT_AFTER_DAYS)
+    parser.add_argument(
+        "--retention-days", type=int, default=Config.WEBHOOK_RETENTION_DAYS, help="0 keeps webhooks forever"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    print(json.dumps(compact(args.storage_path, args.compact_after_days, args.retention_days), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""Conditional GET support (ETag / If-None-Match) for JSON views."""
+
+from typing import Any, Callable, Tuple
+
+from flask import Response, jsonify, request
+
+
+def conditional_json(etag: str, render: Callable[[], Tuple[Any, int]]) -> Response:
+    """
+    Answer 304 Not Modified when the client already holds `etag`; otherwise
+    jsonify the (body, status) from `render` and tag successful responses.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        body, status = render()
+        response = jsonify(body)
+        response.status_code = status
+        if status != 200:
+            return response
+    response.set_etag(etag)
+    # Clients may keep the response but must revalidate it on every poll
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
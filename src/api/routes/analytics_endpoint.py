@@ -3,24 +3,33 @@
 import json
 import logging
 from flask import Blueprint, jsonify, request
+from pydantic import ValidationError
 
-from src.analytics import AnalyticsService
+from src.analytics import lazy_analytics_service
+from src.api.middleware.conditional import conditional_json
+from src.models.action_plan import WebhookPayload
+from src.utils.batch import parse_batch, run_batch
+from src.utils.cache import cache_stats
 
 analytics_endpoint_bp = Blueprint('analytics_endpoint', __name__)
 logger = logging.getLogger(__name__)
 
-# Initialize analytics service
-analytics_service = AnalyticsService()
+# Analytics service shared by all blueprints in this process
+analytics_service = lazy_analytics_service()
 
 
-@analytics_endpoint_bp.route('/api/analytics/event', methods=['POST'])
-def process_analytics_event():
-    """Process completion event and return analytics insights"""
+def analytics_event_response(data):
+    """
+    Process one completion event (the JSON body of POST /api/analytics/event).
+
+    Returns:
+        tuple: (response body dict, HTTP status)
+    """
     try:
-        data = request.get_json()
-        
         if not data:
-            return jsonify({"error": "No data provided"}), 400
+            return {"error": "No data provided"}, 400
+        if not isinstance(data, dict):
+            return {"error": "Event must be a JSON object"}, 400
         
         # Extract eventPayload if wrapped
         if 'eventPayload' in data:
@@ -28,7 +37,7 @@ def process_analytics_event():
                 try:
                     payload = json.loads(data['eventPayload'])
                 except json.JSONDecodeError:
-                    return jsonify({"error": "Invalid JSON in eventPayload"}), 400
+                    return {"error": "Invalid JSON in eventPayload"}, 400
             else:
                 payload = data['eventPayload']
         else:
@@ -40,13 +49,19 @@ def process_analytics_event():
         missing_fields = [field for field in required_fields if field not in payload]
         
         if missing_fields:
-            return jsonify({
+            return {
                 "error": f"Missing required fields: {', '.join(missing_fields)}"
-            }), 400
+            }, 400
+        
+        try:
+            event_payload = WebhookPayload.of(payload)
+        except ValidationError as e:
+            return {"error": f"Invalid eventPayload: {e}"}, 400
         
         # Process analytics
-        logger.info(f"Processing analytics for account {payload.get('accountId')}")
-        analytics_result = analytics_service.process_event(payload)
+        logger.info(f"Processing analytics for account {event_payload.account_id}")
+        analytics_run = analytics_service.start_run(event_payload)
+        analytics_result = analytics_run.response()
         
         # Create response with key insights
         response = {
@@ -67,7 +82,7 @@ def process_analytics_event():
         }
         
         # Add pillar-specific insights
-        for pillar, metrics in analytics_result['metrics']['pillar_metrics'].items():
+        for pillar, metrics in analytics_run.stage('metrics')['pillar_metrics'].items():
             response['pillar_performance'][pillar] = {
                 "completion_score": metrics['completion_score'],
                 "engagement_rate": metrics['engagement_rate'],
@@ -75,12 +90,29 @@ def process_analytics_event():
                 "trend": metrics.get('weekly_trend', 'stable')
             }
         
-        logger.info(f"Analytics successfully processed for account {payload.get('accountId')}")
-        return jsonify(response), 200
+        logger.info(f"Analytics successfully processed for account {event_payload.account_id}")
+        return response, 200
         
     except Exception as e:
         logger.error(f"Error processing analytics: {e}", exc_info=True)
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
+
+
+@analytics_endpoint_bp.route('/api/analytics/event', methods=['POST'])
+def process_analytics_event():
+    """Process completion event and return analytics insights"""
+    response, status = analytics_event_response(request.get_json(silent=True))
+    return jsonify(response), status
+
+
+@analytics_endpoint_bp.route('/api/analytics/events/batch', methods=['POST'])
+def process_analytics_events_batch():
+    """Process an array of completion events, returning one result per event in order"""
+    events, error = parse_batch(request.get_json(silent=True))
+    if error:
+        return jsonify({"error": error}), 400
+    logger.info(f"Processing analytics batch of {len(events)} events")
+    return jsonify(run_batch(analytics_event_response, events)), 200
 
 
 @analytics_endpoint_bp.route('/api/analytics/summary/<int:account_id>', methods=['GET'])
@@ -89,16 +121,48 @@ def get_account_summary(account_id):
     try:
         days = request.args.get('days', 7, type=int)
         
-        summary = analytics_service.get_analytics_summary(account_id, days)
+        def render():
+            summary = analytics_service.get_analytics_summary(account_id, days)
+            
+            if summary.get('status') == 'no_data':
+                return {
+                    "error": "No analytics data found",
+                    "account_id": account_id
+                }, 404
+            
+            return summary, 200
+        
+        # Dashboards poll this; unchanged accounts get a 304
+        return conditional_json(analytics_service.response_etag(account_id, 'summary', str(days), days), render)
         
-        if summary.get('status') == 'no_data':
+    except Exception as e:
+        logger.error(f"Error retrieving analytics summary: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+
+@analytics_endpoint_bp.route('/api/analytics/population', methods=['GET'])
+def get_population():
+    """Cross-account percentiles, optionally with where one account sits among them"""
+    try:
+        account_id = request.args.get('account_id', type=int)
+        result = analytics_service.get_population_analytics(account_id)
+        
+        if result.get('status') == 'no_data':
             return jsonify({
                 "error": "No analytics data found",
                 "account_id": account_id
             }), 404
         
-        return jsonify(summary), 200
+        return jsonify(result), 200
         
     except Exception as e:
-        logger.error(f"Error retrieving analytics summary: {e}", exc_info=True)
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        logger.error(f"Error retrieving population analytics: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+
+@analytics_endpoint_bp.route('/api/analytics/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Sizes and hit rates of the in-process and shared caches of this worker"""
+    stats = analytics_service.cache_stats()
+    stats['caches'] = cache_stats()
+    return jsonify(stats), 200
@@ -1,15 +1,17 @@
 """Analytics API routes"""
 
+import json
 import logging
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 
 from src.analytics.storage import AnalyticsStorage
+from src.config import Config
 
 analytics_bp = Blueprint('analytics', __name__)
 logger = logging.getLogger(__name__)
 
 # Initialize storage
-analytics_storage = AnalyticsStorage()
+analytics_storage = AnalyticsStorage(db_path=Config.ANALYTICS_DB_PATH)
 
 
 @analytics_bp.route('/analytics/process', methods=['POST'])
@@ -35,16 +37,33 @@ def process_analytics():
 
 @analytics_bp.route('/analytics/user/<user_id>', methods=['GET'])
 def get_user_analytics(user_id):
-    """Get analytics history for a user"""
+    """
+    Get analytics history for a user, one page at a time (follow `next_cursor`),
+    or all of it as NDJSON with ?format=ndjson
+    """
     try:
         days = request.args.get('days', 30, type=int)
-        history = analytics_storage.get_user_analytics_history(user_id, days)
+        
+        if request.args.get('format') == 'ndjson':
+            return Response(_ndjson_lines(user_id, days), mimetype='application/x-ndjson')
+        
+        limit = request.args.get('limit', Config.ANALYTICS_HISTORY_PAGE_SIZE, type=int)
+        if not 1 <= limit <= Config.ANALYTICS_HISTORY_MAX_PAGE_SIZE:
+            return jsonify({"error": f"limit must be between 1 and {Config.ANALYTICS_HISTORY_MAX_PAGE_SIZE}"}), 400
+        
+        try:
+            history, next_cursor = analytics_storage.get_user_analytics_page(
+                user_id, days, request.args.get('cursor'), limit
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         return jsonify({
             "user_id": user_id,
             "days": days,
             "snapshots": len(history),
-            "history": history
+            "history": history,
+            "next_cursor": next_cursor
         }), 200
         
     except Exception as e:
@@ -52,6 +71,17 @@ def get_user_analytics(user_id):
         return jsonify({"error": str(e)}), 500
 
 
+def _ndjson_lines(user_id: str, days: int):
+    """One JSON line per snapshot, read from storage in batches as the client consumes them"""
+    try:
+        for snapshot in analytics_storage.iter_user_analytics_history(user_id, days):
+            yield json.dumps(snapshot) + "\n"
+    except Exception as e:
+        # Headers are already sent; a last error line tells the client the export is incomplete
+        logger.error(f"Error streaming analytics for user {user_id}: {e}")
+        yield json.dumps({"error": str(e)}) + "\n"
+
+
 @analytics_bp.route('/analytics/user/<user_id>/aggregate', methods=['GET'])
 def get_aggregated_analytics(user_id):
     """Get aggregated analytics for a user"""
@@ -69,6 +99,26 @@ def get_aggregated_analytics(user_id):
         return jsonify({"error": str(e)}), 500
 
 
+@analytics_bp.route('/analytics/user/<user_id>/rollups', methods=['GET'])
+def get_analytics_rollups(user_id):
+    """Get per-week, -month or -quarter rollups for a user"""
+    try:
+        granularity = request.args.get('granularity', 'week')
+        if granularity not in ['week', 'month', 'quarter', 'all']:
+            return jsonify({"error": "Invalid granularity. Use week, month, quarter or all"}), 400
+        limit = request.args.get('limit', 12, type=int)
+        
+        return jsonify({
+            "user_id": user_id,
+            "granularity": granularity,
+            "buckets": analytics_storage.get_rollups(user_id, granularity, limit)
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error retrieving analytics rollups: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @analytics_bp.route('/analytics/insights/<user_id>', methods=['GET'])
 def get_latest_insights(user_id):
     """Get latest insights for a user"""
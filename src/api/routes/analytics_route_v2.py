@@ -4,13 +4,17 @@ import logging
 from flask import Blueprint, jsonify, request
 from datetime import datetime
 
-from src.analytics import AnalyticsService
+from src.analytics import lazy_analytics_service
+from src.api.middleware.conditional import conditional_json
 
 analytics_bp_v2 = Blueprint('analytics_v2', __name__)
 logger = logging.getLogger(__name__)
 
-# Initialize analytics service
-analytics_service = AnalyticsService()
+# Analytics service shared by all blueprints in this process
+analytics_service = lazy_analytics_service()
+
+# Days of history behind /api/analytics/insights
+INSIGHTS_DAYS = 1
 
 
 @analytics_bp_v2.route('/api/analytics/process-event', methods=['POST'])
@@ -54,10 +58,11 @@ def get_analytics_summary(account_id):
         if days < 1 or days > 365:
             return jsonify({"error": "Days must be between 1 and 365"}), 400
         
-        # Get analytics summary
-        summary = analytics_service.get_analytics_summary(account_id, days)
-        
-        return jsonify(summary), 200
+        # Get analytics summary; unchanged accounts get a 304
+        return conditional_json(
+            analytics_service.response_etag(account_id, 'summary', str(days), days),
+            lambda: (analytics_service.get_analytics_summary(account_id, days), 200)
+        )
         
     except Exception as e:
         logger.error(f"Error retrieving analytics summary: {e}", exc_info=True)
@@ -79,10 +84,11 @@ def get_pillar_analytics(account_id, pillar):
                 "error": f"Invalid pillar. Must be one of: {', '.join(valid_pillars)}"
             }), 400
         
-        # Get pillar analytics
-        pillar_data = analytics_service.get_pillar_analytics(account_id, pillar)
-        
-        return jsonify(pillar_data), 200
+        # Get pillar analytics; unchanged accounts get a 304
+        return conditional_json(
+            analytics_service.response_etag(account_id, 'pillar', pillar, analytics_service.PILLAR_WINDOW_DAYS),
+            lambda: (analytics_service.get_pillar_analytics(account_id, pillar), 200)
+        )
         
     except Exception as e:
         logger.error(f"Error retrieving pillar analytics: {e}", exc_info=True)
@@ -93,26 +99,30 @@ def get_pillar_analytics(account_id, pillar):
 def get_latest_insights(account_id):
     """Get latest insights and recommendations for an account"""
     try:
-        # Get analytics summary which includes insights
-        summary = analytics_service.get_analytics_summary(account_id, days=1)
-        
-        if summary.get('status') == 'no_data':
-            return jsonify({
-                "error": "No recent analytics data available",
-                "account_id": account_id
-            }), 404
-        
-        # Extract insights
-        insights = {
-            "account_id": account_id,
-            "timestamp": datetime.utcnow().isoformat(),
-            "executive_summary": summary.get('executive_summary'),
-            "recommendations": summary.get('top_recommendations', []),
-            "achievements": summary.get('achievements', []),
-            "key_trends": summary.get('key_trends', [])
-        }
-        
-        return jsonify(insights), 200
+        def render():
+            # Get analytics summary which includes insights
+            summary = analytics_service.get_analytics_summary(account_id, days=INSIGHTS_DAYS)
+            
+            if summary.get('status') == 'no_data':
+                return {
+                    "error": "No recent analytics data available",
+                    "account_id": account_id
+                }, 404
+            
+            # Extract insights
+            insights = {
+                "account_id": account_id,
+                "timestamp": datetime.utcnow().isoformat(),
+                "executive_summary": summary.get('executive_summary'),
+                "recommendations": summary.get('top_recommendations', []),
+                "achievements": summary.get('achievements', []),
+                "key_trends": summary.get('key_trends', [])
+            }
+            
+            return insights, 200
+        
+        # Unchanged accounts get a 304
+        return conditional_json(analytics_service.response_etag(account_id, 'insights', days=INSIGHTS_DAYS), render)
         
     except Exception as e:
         logger.error(f"Error retrieving insights: {e}", exc_info=True)
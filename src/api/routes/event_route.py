@@ -1,43 +1,94 @@
 """Event route handler"""
 
+import hashlib
 import json
 import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from flask import Blueprint, jsonify, request, current_app
-from concurrent.futures import ThreadPoolExecutor
+from pydantic import ValidationError
 
 from src.services.action_plan.action_plan_service import ActionPlanService
 from src.services.health.health_score_service import HealthScoreService
-from src.analytics import AnalyticsService
+from src.analytics import get_analytics_pool, get_event_analytics_pool, lazy_analytics_service
+from src.analytics.registry import prime_analytics_views
+from src.models.action_plan import WebhookPayload
+from src.config import Config
+from src.utils.batch import parse_batch, run_batch
+from src.utils.cache import get_cache
+from src.utils.singleflight import SingleFlight
 from src.utils.strapi_api import strapi_get_health_scores, strapi_get_old_action_plan
 
 event_bp = Blueprint('event', __name__)
 logger = logging.getLogger(__name__)
 
-# Initialize analytics service
-analytics_service = AnalyticsService()
-executor = ThreadPoolExecutor(max_workers=2)
+# Analytics service shared by all blueprints in this process
+analytics_service = lazy_analytics_service()
 
+# All /event reads from analytics; these need no history or trend analysis
+EVENT_ANALYTICS_SECTIONS = ('summary', 'metrics', 'quick_recommendations')
 
-def process_analytics_async(payload):
-    """Process analytics asynchronously"""
+PROCESSED_EVENTS_NAMESPACE = "processed-events"
+
+def process_event_analytics(event_payload):
+    """
+    Compute the cheap analytics sections for the response (which records the
+    snapshot), then have the worker pool render the account's GET views from
+    the new history, off the request path.
+    """
     try:
-        analytics_result = analytics_service.process_event(payload)
-        logger.info(f"Analytics processed for account {payload.get('accountId')}")
-        return analytics_result
+        analytics_run = analytics_service.start_run(event_payload)
+        analytics_result = analytics_run.response(EVENT_ANALYTICS_SECTIONS)
     except Exception as e:
         logger.error(f"Error in analytics processing: {e}", exc_info=True)
         return None
 
+    # Pool workers only see the history and the response cache when both are shared
+    if Config.ENABLE_CACHING and analytics_service.metrics_calculator.history_store.shared:
+        try:
+            if get_analytics_pool().submit(prime_analytics_views, analytics_run.account_id):
+                logger.info("Analytics view priming submitted")
+        except Exception as e:
+            logger.error(f"Failed to submit analytics view priming: {e}")
+    return analytics_result
+
+
+def start_event_analytics(event_payload):
+    """
+    Start process_event_analytics on the bounded event analytics pool (separate
+    from the batch executor, since batch items wait on it). Returns its future,
+    or None if the pool's queue was full and the run was shed.
+    """
+    try:
+        return get_event_analytics_pool().submit(process_event_analytics, event_payload)
+    except Exception as e:
+        logger.error(f"Failed to submit analytics processing: {e}")
+        return None
+
+
+def event_analytics_result(analytics_future):
+    """
+    The analytics for the response, waiting at most Config.EVENT_ANALYTICS_TIMEOUT
+    so a slow or locked analytics database cannot stall the webhook. On timeout
+    the run still finishes (and records the snapshot) in the background.
+    """
+    if analytics_future is None:
+        return None
+    try:
+        return analytics_future.result(timeout=Config.EVENT_ANALYTICS_TIMEOUT)
+    except FutureTimeoutError:
+        logger.warning("Analytics processing timed out, responding without analytics insights")
+        return None
+
 
 def process_event_data(event_data):
     """
     Process the entire event data by:
       1. Extracting eventPayload (which may be a dict or a JSON‐encoded string).
       2. Parsing it if necessary.
-      3. Computing routine insights.
+      3. Parsing it into the WebhookPayload every service reads from.
 
     Returns:
-        tuple: (insights_dict, payload_dict) or (None, None) on JSON parse error.
+        tuple: (payload_dict, WebhookPayload) or (None, None) on an invalid payload.
     """
     raw_payload = event_data.get("eventPayload")
 
@@ -53,32 +104,89 @@ def process_event_data(event_data):
         logger.error(f"Unexpected type for eventPayload: {type(raw_payload).__name__}")
         return None, None
 
-    insights = HealthScoreService.get_insights(payload)
-    return insights, payload
+    try:
+        return payload, WebhookPayload.of(payload)
+    except ValidationError as e:
+        logger.error(f"Invalid eventPayload: {e}")
+        return None, None
 
 
-@event_bp.route('/event', methods=['POST'])
-def event():
-    """Handle event webhooks"""
-    host = request.host
-    logger.info(f"Received event webhook on host: {host}")
+def event_fingerprint(event_type, payload, host):
+    """
+    Key identifying a delivery of an event: its type, account and action plan,
+    and a hash of the payload with keys sorted (so key order and whitespace
+    do not matter). The host is included since it selects the Strapi environment.
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    digest = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    return f"{host}:{event_type}:{payload.get('accountId')}:{payload.get('actionPlanUniqueId')}:{digest}"
+
+
+def _processed_events():
+    """Results of recently processed events, shared by all workers on the host."""
+    return get_cache(
+        PROCESSED_EVENTS_NAMESPACE, backend="shared",
+        ttl=Config.EVENT_IDEMPOTENCY_TTL, max_entries=Config.EVENT_IDEMPOTENCY_MAX_ENTRIES
+    )
+
+
+# Concurrent deliveries of the same event in this worker share one run
+_event_flight = SingleFlight()
 
-    data = request.get_json()
+
+def handle_event(data, host, debug=False):
+    """
+    Process one event (the JSON body of POST /event).
+
+    A retried delivery of an event that was already processed successfully
+    within Config.EVENT_IDEMPOTENCY_TTL gets the stored result back instead
+    of rerunning the pipeline (and, for RENEW_ACTION_PLAN, posting another plan).
+
+    Returns:
+        tuple: (response body dict, HTTP status)
+    """
     if not data:
-        return jsonify({"error": "No JSON payload provided"}), 400
+        return {"error": "No JSON payload provided"}, 400
+    if not isinstance(data, dict):
+        return {"error": "Event must be a JSON object"}, 400
 
-    insights, payload = process_event_data(data)
+    payload, event_payload = process_event_data(data)
     if payload is None:
-        return jsonify({"error": "Invalid eventPayload JSON"}), 400
+        return {"error": "Invalid eventPayload JSON"}, 400
+
+    fingerprint = event_fingerprint(data.get('eventEnum'), payload, host)
+    stored = _processed_events().get(fingerprint)
+    if stored is not None:
+        logger.info(f"Duplicate event for account {event_payload.account_id}, returning the stored result")
+        return stored, 200
+
+    def run():
+        result, status = _run_event(data, payload, event_payload, host, debug)
+        # Failures (including Strapi errors reported in the body) are retried for real
+        if status == 200 and 'error' not in result:
+            _processed_events().set(fingerprint, result)
+        return result, status
+
+    return _event_flight.do(fingerprint, run)
 
+
+def _run_event(data, payload, event_payload, host, debug):
+    """The event pipeline: health score update, analytics and the action plan operation."""
     # Log pretty-printed payload for debugging
-    if current_app.debug:
+    if debug:
         pretty_payload = json.dumps(payload, indent=4)
         logger.debug(f'Pretty payload: {pretty_payload}')
 
     # Extract key information
-    action_plan_id = payload.get('actionPlanUniqueId', 0)
-    account_id = payload.get('accountId', 0)
+    action_plan_id = event_payload.action_plan_unique_id or 0
+    account_id = event_payload.account_id or 0
+
+    event_type = data.get('eventEnum')
+    if not event_type:
+        return {"error": "Missing eventEnum in payload"}, 400
+
+    # Cheap analytics for this response, in parallel with the Strapi work
+    analytics_future = start_event_analytics(event_payload)
 
     # Get initial health scores and action plan
     initial_health_scores = strapi_get_health_scores(account_id, host)
@@ -88,47 +196,52 @@ def event():
     final_scores = HealthScoreService.calculate_first_month_update(
         account_id=account_id,
         action_plan=action_plan,
-        pretty_payload=payload,
+        pretty_payload=event_payload,
         initial_health_scores=initial_health_scores
     )
     logger.info(f"Final Health Scores per Pillar: {final_scores}")
 
-    # Process analytics asynchronously
-    try:
-        analytics_future = executor.submit(process_analytics_async, payload)
-        logger.info("Analytics processing submitted")
-    except Exception as e:
-        logger.error(f"Failed to submit analytics processing: {e}")
-        analytics_future = None
-
     # Handle different event types
-    event_type = data.get('eventEnum')
-    if not event_type:
-        return jsonify({"error": "Missing eventEnum in payload"}), 400
-
     if event_type == 'RECALCULATE_ACTION_PLAN':
-        result = ActionPlanService.recalculate_action_plan(payload, host)
+        result = ActionPlanService.recalculate_action_plan(event_payload, host)
         logger.info('RECALCULATE_ACTION_PLAN processed')
     elif event_type == 'RENEW_ACTION_PLAN':
         logger.info('RENEW_ACTION_PLAN processing')
-        result = ActionPlanService.renew_action_plan(payload, host)
+        result = ActionPlanService.renew_action_plan(event_payload, host)
     else:
         result = {"error": f"Unhandled event type: {event_type}"}
 
-    # Try to get analytics result (non-blocking)
-    if analytics_future:
-        try:
-            analytics_result = analytics_future.result(timeout=1)  # 1 second timeout
-            if analytics_result:
-                logger.info(f"Analytics insights: Engagement={analytics_result['metrics']['current']['engagement_score']:.1f}%, "
-                          f"Active pillars={analytics_result['summary']['active_pillars']}/{analytics_result['summary']['total_pillars']}")
-                
-                # Add top insights to result
-                result['analytics_insights'] = {
-                    'engagement_score': analytics_result['metrics']['current']['engagement_score'],
-                    'recommendation': analytics_result['recommendations'][0]['recommendation'] if analytics_result['recommendations'] else None
-                }
-        except Exception as e:
-            logger.warning(f"Analytics processing timeout or error: {e}")
+    analytics_result = event_analytics_result(analytics_future)
+    if analytics_result:
+        logger.info(f"Analytics insights: Engagement={analytics_result['metrics']['current']['engagement_score']:.1f}%, "
+                    f"Active pillars={analytics_result['summary']['active_pillars']}/{analytics_result['summary']['total_pillars']}")
+        
+        # Add top insights to result
+        result['analytics_insights'] = {
+            'engagement_score': analytics_result['metrics']['current']['engagement_score'],
+            'recommendation': analytics_result['quick_recommendations'][0]['recommendation'] if analytics_result['quick_recommendations'] else None
+        }
+
+    return result, 200
+
+
+@event_bp.route('/event', methods=['POST'])
+def event():
+    """Handle event webhooks"""
+    host = request.host
+    logger.info(f"Received event webhook on host: {host}")
+
+    result, status = handle_event(request.get_json(), host, debug=current_app.debug)
+    return jsonify(result), status
+
+
+@event_bp.route('/event/batch', methods=['POST'])
+def event_batch():
+    """Handle an array of event webhooks, returning one result per event in order"""
+    host = request.host
+    events, error = parse_batch(request.get_json(silent=True))
+    if error:
+        return jsonify({"error": error}), 400
+    logger.info(f"Received batch of {len(events)} events on host: {host}")
 
-    return jsonify(result), 200
\ No newline at end of file
+    return jsonify(run_batch(lambda data: handle_event(data, host), events)), 200
@@ -4,58 +4,18 @@ import json
 import logging
 from flask import Blueprint, jsonify, request, current_app
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 
 from src.services.action_plan.action_plan_service import ActionPlanService
 from src.services.health.health_score_service import HealthScoreService
-from src.analytics import AnalyticsService
+from src.analytics import lazy_analytics_service
+from src.api.routes.event_route import event_analytics_result, process_event_data, start_event_analytics
 from src.utils.strapi_api import strapi_get_health_scores, strapi_get_old_action_plan
 
 event_enhanced_bp = Blueprint('event_enhanced', __name__)
 logger = logging.getLogger(__name__)
 
 # Initialize services
-analytics_service = AnalyticsService()
-executor = ThreadPoolExecutor(max_workers=3)
-
-
-def process_event_data(event_data):
-    """
-    Process the entire event data by:
-      1. Extracting eventPayload (which may be a dict or a JSON‐encoded string).
-      2. Parsing it if necessary.
-      3. Computing routine insights.
-
-    Returns:
-        tuple: (insights_dict, payload_dict) or (None, None) on JSON parse error.
-    """
-    raw_payload = event_data.get("eventPayload")
-
-    if isinstance(raw_payload, str):
-        try:
-            payload = json.loads(raw_payload)
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in eventPayload: {raw_payload!r} – {e}")
-            return None, None
-    elif isinstance(raw_payload, dict):
-        payload = raw_payload
-    else:
-        logger.error(f"Unexpected type for eventPayload: {type(raw_payload).__name__}")
-        return None, None
-
-    insights = HealthScoreService.get_insights(payload)
-    return insights, payload
-
-
-def process_analytics_async(payload):
-    """Process analytics asynchronously"""
-    try:
-        analytics_result = analytics_service.process_event(payload)
-        logger.info(f"Analytics processed for account {payload.get('accountId')}")
-        return analytics_result
-    except Exception as e:
-        logger.error(f"Error in analytics processing: {e}", exc_info=True)
-        return None
+analytics_service = lazy_analytics_service()
 
 
 @event_enhanced_bp.route('/event/v2', methods=['POST'])
@@ -68,7 +28,7 @@ def event_v2():
     if not data:
         return jsonify({"error": "No JSON payload provided"}), 400
 
-    insights, payload = process_event_data(data)
+    payload, event_payload = process_event_data(data)
     if payload is None:
         return jsonify({"error": "Invalid eventPayload JSON"}), 400
 
@@ -78,11 +38,15 @@ def event_v2():
         logger.debug(f'Pretty payload: {pretty_payload}')
 
     # Extract key information
-    action_plan_id = payload.get('actionPlanUniqueId', 0)
-    account_id = payload.get('accountId', 0)
+    action_plan_id = event_payload.action_plan_unique_id or 0
+    account_id = event_payload.account_id or 0
 
-    # Submit analytics processing asynchronously
-    analytics_future = executor.submit(process_analytics_async, payload)
+    event_type = data.get('eventEnum')
+    if not event_type:
+        return jsonify({"error": "Missing eventEnum in payload"}), 400
+
+    # Cheap analytics for this response, in parallel with the Strapi work
+    analytics_future = start_event_analytics(event_payload)
 
     # Get initial health scores and action plan
     initial_health_scores = strapi_get_health_scores(account_id, host)
@@ -92,39 +56,29 @@ def event_v2():
     final_scores = HealthScoreService.calculate_first_month_update(
         account_id=account_id,
         action_plan=action_plan,
-        pretty_payload=payload,
+        pretty_payload=event_payload,
         initial_health_scores=initial_health_scores
     )
     logger.info(f"Final Health Scores per Pillar: {final_scores}")
 
     # Handle different event types
-    event_type = data.get('eventEnum')
-    if not event_type:
-        return jsonify({"error": "Missing eventEnum in payload"}), 400
-
     if event_type == 'RECALCULATE_ACTION_PLAN':
-        result = ActionPlanService.recalculate_action_plan(payload, host)
+        result = ActionPlanService.recalculate_action_plan(event_payload, host)
         logger.info('RECALCULATE_ACTION_PLAN processed')
     elif event_type == 'RENEW_ACTION_PLAN':
         logger.info('RENEW_ACTION_PLAN processing')
-        result = ActionPlanService.renew_action_plan(payload, host)
+        result = ActionPlanService.renew_action_plan(event_payload, host)
     else:
         result = {"error": f"Unhandled event type: {event_type}"}
 
-    # Try to get analytics result (non-blocking)
-    analytics_result = None
-    try:
-        analytics_result = analytics_future.result(timeout=2)  # 2 second timeout
-    except Exception as e:
-        logger.warning(f"Analytics processing timeout or error: {e}")
-
     # Include analytics in response if available
+    analytics_result = event_analytics_result(analytics_future)
     if analytics_result:
         result['analytics_summary'] = {
             'engagement_score': analytics_result['metrics']['current']['engagement_score'],
             'active_pillars': analytics_result['summary']['active_pillars'],
             'total_completions': analytics_result['summary']['total_completions'],
-            'top_recommendation': analytics_result['recommendations'][0] if analytics_result['recommendations'] else None
+            'top_recommendation': analytics_result['quick_recommendations'][0] if analytics_result['quick_recommendations'] else None
         }
 
     return jsonify(result), 200
@@ -137,13 +91,13 @@ def event_analytics_only():
     if not data:
         return jsonify({"error": "No JSON payload provided"}), 400
 
-    insights, payload = process_event_data(data)
+    payload, event_payload = process_event_data(data)
     if payload is None:
         return jsonify({"error": "Invalid eventPayload JSON"}), 400
 
     try:
         # Process analytics synchronously for this endpoint
-        analytics_result = analytics_service.process_event(payload)
+        analytics_result = analytics_service.process_event(event_payload)
         
         return jsonify({
             "status": "success",
@@ -8,4 +8,22 @@ health_bp = Blueprint('health', __name__)
 @health_bp.route('/', methods=['GET'])
 def health_check():
     """Basic health check endpoint"""
-    return jsonify({"status": "healthy", "service": "lth-recommendation"}), 200
\ No newline at end of file
+    return jsonify({"status": "healthy", "service": "lth-recommendation"}), 200
+
+@health_bp.route('/outbox', methods=['GET'])
+def outbox_status():
+    """Backlog, dead letters and delivery latency of the Strapi write outbox"""
+    from src.utils.outbox import get_outbox
+    return jsonify(get_outbox().stats()), 200
+
+@health_bp.route('/analytics-pool', methods=['GET'])
+def analytics_pool_status():
+    """Queue depth, wait times and shed jobs of the analytics worker pool"""
+    from src.analytics import get_analytics_pool
+    return jsonify(get_analytics_pool().stats()), 200
+
+@health_bp.route('/event-analytics-pool', methods=['GET'])
+def event_analytics_pool_status():
+    """Queue depth, wait times and shed runs of the /event analytics threads"""
+    from src.analytics import get_event_analytics_pool
+    return jsonify(get_event_analytics_pool().stats()), 200
@@ -4,15 +4,21 @@ import time
 import logging
 from flask import Blueprint, jsonify, request
 
-from src.scheduling.scheduler import main as process_action_plan
 from src.utils.typeform_api import trigger_followup
 from src.analytics.storage import AnalyticsStorage
+from src.config import Config
 
 webhook_bp = Blueprint('webhook', __name__)
 logger = logging.getLogger(__name__)
 
 # Initialize analytics storage
-analytics_storage = AnalyticsStorage()
+analytics_storage = AnalyticsStorage(db_path=Config.ANALYTICS_DB_PATH)
+
+
+def process_action_plan(host):
+    """Build and post the action plan; the scheduler is imported on first use, as it is slow to load"""
+    from src.scheduling.scheduler import main
+    return main(host)
 
 
 @webhook_bp.route('/webhook', methods=['POST'])
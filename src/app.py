@@ -60,6 +60,16 @@ def create_app(config_name=None):
     
     # Register error handlers
     register_error_handlers(app)
+
+    # Resume delivery of Strapi writes left in the outbox by a previous run
+    if app.config.get('USE_ASYNC_PROCESSING') and not app.config.get('TESTING'):
+        from src.utils.outbox import get_outbox
+        get_outbox()
+    
+    # Load what the blueprints import lazily before the first request needs it
+    if app.config.get('WARM_IMPORTS') and not app.config.get('TESTING'):
+        from src.utils.warmup import start_background_warmup
+        start_background_warmup(delay=app.config.get('WARM_IMPORTS_DELAY', 1.0))
     
     # Add request logging
     @app.before_request
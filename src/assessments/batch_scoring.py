@@ -0,0 +1,338 @@
+# rule_based_system/assessments/batch_scoring.py
+
+"""
+Score many questionnaires at once, e.g. to re-score every user after a
+weighting change.
+
+`score_health_batch` takes one row per questionnaire and one column per
+question (the keys of the per-pillar answer dicts `HealthAssessment` takes).
+Each answer column is encoded to category codes, the per-user conversion is
+applied once per distinct answer, and the pillar scores are computed from
+the resulting lookup tables with array arithmetic.
+
+The float operations run in the same order as in the per-user assessment
+classes, so every score is bit-identical to `float(assessment.report())`
+and the total to `HealthAssessment.calculate_total_score()`.
+"""
+
+import numbers
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.assessments.base_assessment import BaseAssessment
+from src.assessments.cognition_assessment import CognitionAssessment
+from src.assessments.exercise_assessment import ExerciseAssessment
+from src.assessments.gratitude_assessment import GratitudeAssessment
+from src.assessments.nutrition_assessment import ANSWER_KEY_MAPPING, WEIGHTS_CONFIG, NutritionAssessment
+from src.assessments.sleep_assessment import SleepAssessment
+from src.assessments.social_connections_assessment import SocialConnectionsAssessment
+from src.assessments.stress_management_assessment import StressManagementAssessment
+
+PILLARS = ['exercise', 'nutrition', 'sleep', 'social_connections', 'stress_management', 'gratitude', 'cognition']
+
+# Order of the pillars in HealthAssessment.calculate_total_score
+_TOTAL_ORDER = ['exercise', 'sleep', 'nutrition', 'stress_management', 'social_connections', 'gratitude', 'cognition']
+
+WEIGHT_KEY = 'Wie viel wiegst du (in kg)?'
+HEIGHT_KEY = 'Was ist deine Körpergröße (in cm)?'
+
+# Python 3.12 made sum() of floats compensated (Neumaier)
+_COMPENSATED_SUM = sys.version_info >= (3, 12)
+
+
+class _Answers:
+    """The answer columns of a batch, with row labels for error messages."""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.index = frame.index
+
+    def __len__(self):
+        return len(self.frame)
+
+    def require(self, keys):
+        for key in keys:
+            if key not in self.frame.columns:
+                raise ValueError(f"Missing required key: '{key}' in answers.")
+
+    def column(self, key, default=None):
+        if key not in self.frame.columns:
+            return np.full(len(self.frame), default, dtype=object)
+        return self.frame[key].to_numpy(dtype=object)
+
+    def lookup(self, key, convert, default=None, encode=None):
+        """
+        Apply `convert` once per distinct answer of question `key` and spread
+        the results over the rows. `encode` makes unhashable answers hashable.
+
+        :raises ValueError: naming the first row whose answer `convert` rejects
+        """
+        values = self.column(key, default)
+        if encode is not None:
+            values = pd.Series(values, dtype=object).map(encode).to_numpy(dtype=object)
+        codes, categories = pd.factorize(values)
+        table = np.empty(len(categories), dtype=float)
+        for code, category in enumerate(categories):
+            table[code] = self._convert(convert, category, lambda: np.argmax(codes == code))
+        result = table[np.maximum(codes, 0)] if len(table) else np.empty(len(values))
+
+        # None and NaN share the missing code, convert them one by one
+        for row in np.flatnonzero(codes == -1):
+            result[row] = self._convert(convert, values[row], lambda: row)
+        return result
+
+    def _convert(self, convert, value, first_row):
+        try:
+            return convert(value)
+        except ValueError as e:
+            raise ValueError(f"Row {self.index[first_row()]!r}: {e}") from e
+
+
+def _integer(question, convert=int):
+    """`convert` of an answer that has to be an integer, like the assessments validate it."""
+    def check(value):
+        try:
+            int(value)
+        except (ValueError, TypeError):
+            raise ValueError(f"Value for '{question}' must be an integer, got: {value}")
+        return convert(value)
+    return check
+
+
+def _mapped(mapping, message):
+    def check(value):
+        if value not in mapping:
+            raise ValueError(f"{message}: {value}")
+        return mapping[value]
+    return check
+
+
+def _float_sum(terms):
+    """Element-wise `sum(terms)` of float arrays, rounded like the builtin sum."""
+    total = terms[0] + 0.0
+    compensation = np.zeros_like(total)
+    for term in terms[1:]:
+        step = total + term
+        if _COMPENSATED_SUM:
+            compensation += np.where(
+                np.abs(total) >= np.abs(term), (total - step) + term, (term - step) + total
+            )
+        total = step
+    return total + compensation
+
+
+def _report(scores, formatter=lambda score: float(f"{score:.2f}")):
+    """`float(report())` for an array of scores, formatting each distinct score once."""
+    distinct, inverse = np.unique(scores, return_inverse=True)
+    return np.array([formatter(score) for score in distinct.tolist()], dtype=float)[inverse.reshape(-1)]
+
+
+def _exercise_scores(answers):
+    answers.require(ExerciseAssessment.REQUIRED_KEYS)
+    flexibility, activity, sports_per_week, strength = (
+        answers.lookup(key, _integer(key)) for key in ExerciseAssessment.REQUIRED_KEYS
+    )
+    score = (
+        0.10 * flexibility +
+        0.40 * sports_per_week +
+        0.30 * activity +
+        0.20 * strength
+    )
+    return score / 5 * 80
+
+
+def _height_squared(value):
+    """(height in m) ** 2 of a height answer, NaN if it cannot give a BMI."""
+    try:
+        height_cm = int(str(value).strip())
+    except (ValueError, AttributeError):
+        return np.nan
+    return (height_cm / 100) ** 2 if height_cm > 0 else np.nan
+
+
+def _weight(value):
+    try:
+        weight = int(str(value).strip())
+    except (ValueError, AttributeError):
+        return np.nan
+    return weight if weight > 0 else np.nan
+
+
+def _nutrition_scores(answers):
+    answers.require(NutritionAssessment.REQUIRED_KEYS)
+    integer_fields = ('sugar', 'processed', 'whole_grain')
+    component_scores = {
+        key: answers.lookup(
+            question,
+            _integer(question, WEIGHTS_CONFIG[key]['score_func']) if key in integer_fields
+            else WEIGHTS_CONFIG[key]['score_func']
+        )
+        for key, question in ANSWER_KEY_MAPPING.items()
+    }
+
+    weight = answers.lookup(WEIGHT_KEY, _weight, default='')
+    height_squared = answers.lookup(HEIGHT_KEY, _height_squared, default='')
+    has_bmi = ~np.isnan(weight) & ~np.isnan(height_squared)
+    bmi = np.where(has_bmi, weight / np.where(has_bmi, height_squared, 1.0), 0.0)
+    component_scores['bmi'] = np.select(
+        [bmi < 16, bmi < 18, bmi < 25, bmi < 30, bmi < 35, bmi < 40], [1, 2, 5, 3, 2, 1], 0
+    ).astype(float)
+
+    effective_weights = {}
+    for key, config in WEIGHTS_CONFIG.items():
+        if config.get('dynamic', False):
+            multiplier = (6 - component_scores[key]) / 5
+        else:
+            multiplier = np.ones(len(answers))
+        effective_weights[key] = config['base_weight'] * multiplier
+
+    weighted_sum = _float_sum([effective_weights[key] * component_scores[key] for key in component_scores])
+    max_weighted_sum = _float_sum([effective_weights[key] * 5 for key in effective_weights])
+    return np.where(has_bmi, weighted_sum / max_weighted_sum * 80, 0.0)
+
+
+def _sleep_problems(value):
+    if not isinstance(value, list):
+        raise ValueError("Value for 'Welche Schlafprobleme hast du?' must be a list.")
+    return 5 - sum(SleepAssessment.sleep_problems_mapping.get(problem, 0) for problem in value)
+
+
+def _sleep_scores(answers):
+    answers.require(SleepAssessment.REQUIRED_KEYS)
+    quality_key, problems_key, hours_key, tiredness_key, morning_key, evening_key = SleepAssessment.REQUIRED_KEYS
+
+    sleep_quality = answers.lookup(
+        quality_key, _mapped(SleepAssessment.sleep_quality_mapping, "Invalid sleep quality"))
+    sleep_hours = answers.lookup(
+        hours_key, _mapped(SleepAssessment.sleep_hours_mapping, "Invalid sleep hours"))
+    sleep_tiredness = 6 - answers.lookup(tiredness_key, _integer(tiredness_key))
+    time_outside_morning = answers.lookup(
+        morning_key, _mapped(SleepAssessment.time_outside_morning_mapping, "Invalid morning outside time"))
+    time_outside_evening = answers.lookup(
+        evening_key, _mapped(SleepAssessment.time_outside_evening_mapping, "Invalid evening outside time"))
+
+    # Lists are not hashable, so look the problems up as tuples
+    problem_scores = answers.lookup(
+        problems_key,
+        lambda value: _sleep_problems(list(value) if isinstance(value, tuple) else value),
+        encode=lambda value: tuple(value) if isinstance(value, list) else value
+    )
+    good_quality = np.isin(answers.column(quality_key), ['Sehr gut', 'Gut', 'Mittel'])
+    sleep_problems = np.where(good_quality, 5, problem_scores)
+
+    poor_quality = sleep_quality <= 2
+    score = (
+        0.30 * sleep_quality +
+        np.where(poor_quality, 0.05, 0) * sleep_problems +
+        0.30 * sleep_hours +
+        np.where(poor_quality, 0.25, 0.3) * sleep_tiredness +
+        0.075 * time_outside_morning +
+        0.025 * time_outside_evening
+    )
+    return BaseAssessment.normalize_score(score, 0, 80)
+
+
+def _loneliness(value):
+    if isinstance(value, str):
+        if not value.isdigit():
+            raise ValueError(f"Value for 'Fühlst du dich einsam?' must be an integer, got: {value}")
+        value = int(value)
+    elif not isinstance(value, numbers.Integral):
+        raise ValueError(f"Value for 'Fühlst du dich einsam?' must be an integer, got: {value}")
+    return 6 - value
+
+
+def _engagement(value):
+    engaged = bool(value.strip()) if isinstance(value, str) else bool(value)
+    return 5 if engaged else 0
+
+
+def _social_connections_scores(answers):
+    answers.require(SocialConnectionsAssessment.REQUIRED_KEYS)
+    activities_key, engagement_key, loneliness_key = SocialConnectionsAssessment.REQUIRED_KEYS
+
+    activities = answers.lookup(
+        activities_key, _mapped(SocialConnectionsAssessment.ACTIVITIES_MAPPING, "Invalid activity frequency"))
+    engagement = answers.lookup(engagement_key, _engagement)
+    loneliness = answers.lookup(loneliness_key, _loneliness)
+
+    score = (
+        0.30 * activities +
+        0.20 * engagement +
+        0.50 * loneliness
+    )
+    return BaseAssessment.normalize_score(score, 0, 80)
+
+
+def _stress_management_scores(answers):
+    answers.require(StressManagementAssessment.REQUIRED_KEYS)
+    level_key, *coping_keys = StressManagementAssessment.REQUIRED_KEYS
+    stress_level_mapping = {1: 5, 2: 4, 3: 3, 4: 2, 5: 0}
+
+    stress_level = answers.lookup(
+        level_key, _integer(level_key, lambda value: stress_level_mapping.get(int(value), 0)))
+    *healthy_keys, unhealthy_key = coping_keys
+    coping = [answers.lookup(key, _integer(key)) for key in healthy_keys]
+    # Reverse scoring for the unhealthy coping pattern question
+    coping.append(answers.lookup(
+        unhealthy_key, _integer(unhealthy_key, lambda value: 6 - int(value) if int(value) != 0 else 0)))
+
+    stress_coping = sum(coping) / len(coping)
+    score = (
+        0.60 * stress_level +
+        0.40 * stress_coping
+    )
+    return score / 5 * 80
+
+
+def _gratitude_scores(answers):
+    answers.require(GratitudeAssessment.REQUIRED_KEYS)
+    gratitude = [answers.lookup(key, _integer(key)) for key in GratitudeAssessment.REQUIRED_KEYS]
+    all_zero = np.logical_and.reduce([answer == 0 for answer in gratitude])
+    total_gratitude_score = sum(gratitude)
+    return np.where(all_zero, 0.0, ((total_gratitude_score - 5) / (25 - 5)) * 80)
+
+
+def _cognition_scores(answers):
+    answers.require(CognitionAssessment.REQUIRED_KEYS)
+    forgetfulness_key, concentration_key, learning_key = CognitionAssessment.REQUIRED_KEYS
+    forgetfulness = 6 - answers.lookup(forgetfulness_key, _integer(forgetfulness_key))
+    concentration = answers.lookup(concentration_key, _integer(concentration_key))
+    learning = answers.lookup(learning_key, _integer(learning_key))
+    total_points = forgetfulness + concentration + learning
+    return total_points / 15 * 80
+
+
+_PILLAR_SCORES = {
+    'exercise': _exercise_scores,
+    'nutrition': _nutrition_scores,
+    'sleep': _sleep_scores,
+    'social_connections': _social_connections_scores,
+    'stress_management': _stress_management_scores,
+    'gratitude': _gratitude_scores,
+    'cognition': _cognition_scores
+}
+
+
+def score_health_batch(responses):
+    """
+    Score every questionnaire in `responses`.
+
+    :param responses: A DataFrame with one row per questionnaire and one column per
+                      question, or anything `pandas.DataFrame` accepts for one (a list
+                      of answer dicts, a dict of answer arrays, a NumPy record array)
+    :return: A DataFrame with the index of `responses`, one column per pillar holding
+             `float(report())` of that pillar's assessment, and a 'total' column
+             holding `HealthAssessment.calculate_total_score()`
+    :raises ValueError: If a question is missing or a row has an invalid answer
+    """
+    if not isinstance(responses, pd.DataFrame):
+        responses = pd.DataFrame(responses, dtype=object)
+    answers = _Answers(responses)
+
+    scores = {pillar: _report(_PILLAR_SCORES[pillar](answers)) for pillar in PILLARS}
+    mean = _float_sum([scores[pillar] for pillar in _TOTAL_ORDER]) / len(_TOTAL_ORDER)
+    scores['total'] = _report(mean, lambda score: round(score, 2))
+    return pd.DataFrame(scores, index=responses.index)
@@ -49,6 +49,20 @@ class HealthAssessment:
         total_score = round(sum(scores) / len(scores), 2)
         return total_score
 
+    @staticmethod
+    def score_batch(responses):
+        """
+        Score many questionnaires at once with array lookups instead of one
+        HealthAssessment per user. See `batch_scoring.score_health_batch`.
+
+        :param responses: A DataFrame (or list of answer dicts) with one row per
+                          questionnaire and one column per question
+        :return: A DataFrame with one column per pillar score and a 'total' column
+        """
+        # Imported here so the scheduler does not load pandas at boot
+        from src.assessments.batch_scoring import score_health_batch
+        return score_health_batch(responses)
+
 if __name__ == "__main__":
     exercise = {
         'Wie schätzt du deine Beweglichkeit ein? ': '5',
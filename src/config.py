@@ -39,11 +39,50 @@ class Config:
     # Performance settings
     ENABLE_CACHING = True
     CACHE_TTL = 300  # 5 minutes
-    MAX_WORKERS = 5
+    CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "analytics_data/cache.db")  # shared by all workers
+    MAX_WORKERS = 5  # threads running the items of batch requests
+    # Events per batch request. Each /event makes a few Strapi calls, so MAX_WORKERS threads get
+    # through about this many well inside one gunicorn request timeout (30s by default)
+    EVENT_BATCH_MAX_SIZE = int(os.getenv("EVENT_BATCH_MAX_SIZE", "50"))
+    EVENT_BATCH_TIMEOUT = 25  # seconds a batch request runs; events not finished by then are reported as 504
+    EVENT_IDEMPOTENCY_TTL = int(os.getenv("EVENT_IDEMPOTENCY_TTL", "86400"))  # seconds a retried /event gets the stored result
+    EVENT_IDEMPOTENCY_MAX_ENTRIES = 20000
     CONNECTION_POOL_SIZE = 10
     REQUEST_TIMEOUT = 30
+    STRAPI_INLINE_TIMEOUT = 3  # seconds a request waits on a Strapi write before leaving it to the outbox
+    STRAPI_INLINE_PAUSE = 30  # seconds writes go straight to the outbox after an inline write failed
+    EVENT_ANALYTICS_TIMEOUT = 1.0  # seconds /event waits for its analytics insights
+    EVENT_ANALYTICS_WORKERS = int(os.getenv("EVENT_ANALYTICS_WORKERS", "5"))  # threads recording /event analytics
+    EVENT_ANALYTICS_QUEUE = int(os.getenv("EVENT_ANALYTICS_QUEUE", "50"))  # waiting runs before new ones are shed
+
+    # Outbox for Strapi writes not delivered inline (retried in the background when USE_ASYNC_PROCESSING is on)
+    OUTBOX_DB_PATH = os.getenv("OUTBOX_DB_PATH", "analytics_data/outbox.db")
+    OUTBOX_MAX_CONCURRENCY = 4
+    OUTBOX_MAX_ATTEMPTS = 8
+    OUTBOX_RATE_LIMIT = 5.0  # deliveries per second, per worker
+    OUTBOX_BATCH_SIZE = 20
+
+    # Analytics history and snapshots shared by all workers
+    ANALYTICS_DB_PATH = os.getenv("ANALYTICS_DB_PATH", "analytics_data/analytics.db")
+    METRICS_HISTORY_RETENTION = 30  # snapshots kept per account
+    ANALYTICS_RECENT_EVENTS = 50  # processed events kept in memory per worker
+    # Budget for the in-memory history fallback only, all accounts together. The default SQLite store
+    # keeps history and trend accumulators on disk (METRICS_HISTORY_RETENTION per account), not in process.
+    ANALYTICS_MEMORY_BUDGET_MB = 64
+    POPULATION_SKETCH_K = 200  # quantile sketch size; rank error is about 1.7 / k
+    ANALYTICS_HISTORY_PAGE_SIZE = 100  # snapshots per page of /analytics/user/<user_id>
+    ANALYTICS_HISTORY_MAX_PAGE_SIZE = 1000
+    WEBHOOK_COMPACT_AFTER_DAYS = 1  # raw webhook files of finished days are bundled per day
+    WEBHOOK_RETENTION_DAYS = int(os.getenv("WEBHOOK_RETENTION_DAYS", "0"))  # 0 keeps raw webhooks forever
+
+    # Worker processes for full analytics runs, per gunicorn worker
+    ANALYTICS_POOL_WORKERS = int(os.getenv("ANALYTICS_POOL_WORKERS", "2"))
+    ANALYTICS_POOL_QUEUE = int(os.getenv("ANALYTICS_POOL_QUEUE", "32"))  # waiting runs before new ones are shed
+    ANALYTICS_POOL_PROCESSES = True  # False runs them on threads instead
     
     # Optimization flags
+    WARM_IMPORTS = True  # import the lazily loaded analytics/scheduler modules in the background after boot
+    WARM_IMPORTS_DELAY = 1.0  # seconds
     USE_ASYNC_PROCESSING = True
     USE_RULE_COMPILATION = True
     ENABLE_PERFORMANCE_MONITORING = False
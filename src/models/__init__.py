@@ -0,0 +1,11 @@
+"""Request payload models."""
+
+from src.models.action_plan import WebhookPayload
+from src.models.routine_stats import CompletionStatistic, PillarCompletionStats, RoutineCompletion
+
+__all__ = [
+    'WebhookPayload',
+    'CompletionStatistic',
+    'PillarCompletionStats',
+    'RoutineCompletion'
+]
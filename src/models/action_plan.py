@@ -0,0 +1,28 @@
+"""Action plan event payloads"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from pydantic import Field
+
+from src.models.routine_stats import Identifier, PayloadModel, PillarCompletionStats, RoutineCompletion
+
+
+class WebhookPayload(PayloadModel):
+    """The eventPayload of a completion event"""
+    account_id: Optional[Identifier] = Field(None, alias='accountId')
+    action_plan_unique_id: Optional[Identifier] = Field(None, alias='actionPlanUniqueId')
+    start_date: Any = Field(None, alias='startDate')
+    period_in_days: Any = Field(None, alias='periodInDays')
+    pillar_completion_stats: List[PillarCompletionStats] = Field(default_factory=list, alias='pillarCompletionStats')
+    change_log: List[Dict[str, Any]] = Field(default_factory=list, alias='changeLog')
+
+    @classmethod
+    def of(cls, payload: Union['WebhookPayload', Dict[str, Any]]) -> 'WebhookPayload':
+        """`payload` parsed, or as is if it already is a WebhookPayload."""
+        return payload if isinstance(payload, cls) else cls.model_validate(payload)
+
+    def routines(self) -> Iterator[Tuple[PillarCompletionStats, RoutineCompletion]]:
+        """(pillar, routine) for every routine of every pillar"""
+        for pillar in self.pillar_completion_stats:
+            for routine in pillar.routine_completions:
+                yield pillar, routine
@@ -0,0 +1,112 @@
+"""Completion statistics of an event payload, by pillar and routine
+
+Parsed once per event, together with the per-routine and per-pillar
+aggregates the health score, action plan and analytics services read, so
+none of them walks the raw `pillarCompletionStats` tree again.
+"""
+
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+Number = Union[int, float]
+Identifier = Union[int, str]
+
+# Period units the analytics aggregate completions by
+AGGREGATED_PERIOD_UNITS = ('WEEK', 'MONTH')
+
+
+class PayloadModel(BaseModel):
+    """Base for payload models: built from the payload's camelCase keys or the field names"""
+    # Unknown fields are dropped rather than kept around per event
+    model_config = ConfigDict(extra='ignore', populate_by_name=True)
+
+
+class CompletionStatistic(PayloadModel):
+    """One completion statistic of a routine"""
+    # Kept whole: the action plan passes the statistics on to Strapi as received
+    model_config = ConfigDict(extra='allow')
+
+    completion_rate: Number = Field(0, alias='completionRate')
+    completion_rate_period_unit: Optional[str] = Field('', alias='completionRatePeriodUnit')
+    period_sequence_no: Number = Field(0, alias='periodSequenceNo')
+    completion_unit: Optional[str] = Field('', alias='completionUnit')
+    completion_target_total: Number = Field(0, alias='completionTargetTotal')
+    completed_value_total: Number = Field(0, alias='completedValueTotal')
+
+
+class RoutineCompletion(PayloadModel):
+    """A routine with its completion statistics and their aggregates"""
+    routine_unique_id: Optional[Identifier] = Field(None, alias='routineUniqueId')
+    routine_id: Optional[Identifier] = Field(None, alias='routineId')
+    display_name: Optional[str] = Field(None, alias='displayName')
+    schedule_category: Optional[str] = Field(None, alias='scheduleCategory')
+    completion_statistics: List[CompletionStatistic] = Field(default_factory=list, alias='completionStatistics')
+
+    # Set after validation
+    total_completions: Number = Field(0, exclude=True)  # sum of completion rates
+    latest_month_completion: Number = Field(0, exclude=True)  # rate of the latest MONTH statistic
+
+    @model_validator(mode='after')
+    def _aggregate(self) -> 'RoutineCompletion':
+        total = 0
+        latest_month = None
+        for stat in self.completion_statistics:
+            total += stat.completion_rate
+            if stat.completion_rate_period_unit == 'MONTH' and (
+                latest_month is None or stat.period_sequence_no > latest_month.period_sequence_no
+            ):
+                latest_month = stat
+        self.total_completions = total
+        self.latest_month_completion = latest_month.completion_rate if latest_month is not None else 0
+        return self
+
+    @property
+    def id(self) -> Optional[Identifier]:
+        """routineUniqueId, falling back to routineId"""
+        return self.routine_unique_id or self.routine_id
+
+    @property
+    def has_completion_data(self) -> bool:
+        return bool(self.completion_statistics)
+
+    def raw_statistics(self) -> List[Dict[str, Any]]:
+        """The statistics in the payload's own shape, undeclared fields included"""
+        return [stat.model_dump(by_alias=True, exclude_unset=True) for stat in self.completion_statistics]
+
+
+class PillarCompletionStats(PayloadModel):
+    """A pillar's routines and their aggregates"""
+    pillar_enum: Optional[str] = Field(None, alias='pillarEnum')
+    routine_completions: List[RoutineCompletion] = Field(default_factory=list, alias='routineCompletionStats')
+
+    # Set after validation
+    routines_with_data: int = Field(0, exclude=True)
+    total_completions: Number = Field(0, exclude=True)
+    month_completed: Number = Field(0, exclude=True)  # latest MONTH completion rates, summed over routines
+    completion_by_period: Dict[str, Dict[Number, Number]] = Field(default_factory=dict, exclude=True)
+
+    @model_validator(mode='after')
+    def _aggregate(self) -> 'PillarCompletionStats':
+        by_period = {unit.lower(): {} for unit in AGGREGATED_PERIOD_UNITS}
+        with_data = 0
+        total = 0
+        month_completed = 0
+        for routine in self.routine_completions:
+            if routine.completion_statistics:
+                with_data += 1
+            total += routine.total_completions
+            month_completed += routine.latest_month_completion
+            for stat in routine.completion_statistics:
+                periods = by_period.get((stat.completion_rate_period_unit or '').lower())
+                if periods is not None:
+                    periods[stat.period_sequence_no] = periods.get(stat.period_sequence_no, 0) + stat.completion_rate
+        self.routines_with_data = with_data
+        self.total_completions = total
+        self.month_completed = month_completed
+        self.completion_by_period = by_period
+        return self
+
+    @property
+    def engagement_rate(self) -> float:
+        return self.routines_with_data / len(self.routine_completions) if self.routine_completions else 0
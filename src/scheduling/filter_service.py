@@ -5,7 +5,7 @@ from typing import Dict, Any, List
 from src.assessments.health_assessment import HealthAssessment
 from src.utils.data_processing import integrate_answers
 from src.utils.strapi_api import strapi_get_all_routines, strapi_get_all_routines_development
-from src.utils.typeform_api import process_latest_response, get_field_mapping, get_responses
+from src.utils.typeform_api import process_latest_response, get_field_table, get_responses
 
 
 logging.basicConfig(level=logging.INFO)
@@ -715,7 +715,7 @@ def exclude_movement_routines_by_equipment(routines: List[Dict[str, Any]]) -> Li
 def main(app_env):
 
 
-    field_mapping = get_field_mapping(app_env)
+    field_mapping = get_field_table(app_env)
     responses = get_responses(app_env)
 
     if not (responses and field_mapping):
@@ -3,8 +3,9 @@
 import json
 import uuid
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Union
 
+from src.models.action_plan import WebhookPayload
 from src.utils.strapi_api import (
     strapi_get_old_action_plan,
     strapi_post_action_plan
@@ -17,12 +18,14 @@ class ActionPlanService:
     """Service for handling action plan operations"""
     
     @staticmethod
-    def print_matching_routine_details(new_data: Dict[str, Any], old_action_plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def print_matching_routine_details(
+        new_data: Union[WebhookPayload, Dict[str, Any]], old_action_plan: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
         """
         Find matching routines between new data and old action plan.
         
         Args:
-            new_data: New payload data with pillarCompletionStats
+            new_data: New payload data with pillarCompletionStats, raw or parsed
             old_action_plan: Existing action plan from Strapi
             
         Returns:
@@ -43,37 +46,33 @@ class ActionPlanService:
         
         # Find matching routines in new data
         matching_routines = []
-        pillar_stats_list = new_data.get('pillarCompletionStats', [])
-        
-        for pillar_idx, pillar in enumerate(pillar_stats_list):
-            routines_list = pillar.get('routineCompletionStats', [])
-            
-            for routine_idx, routine in enumerate(routines_list):
-                rid = routine.get('routineUniqueId') or routine.get('routineId')
-                if rid is None:
-                    logger.warning(f"New payload routine missing both IDs: {routine}")
-                    continue
-                    
-                if rid in old_routine_ids:
-                    logger.info(f"✅ Match found for id={rid} name={routine.get('displayName')}")
-                    matching_routines.append({
-                        "id": rid,
-                        "name": routine.get('displayName'),
-                        "statistics": routine.get('completionStatistics', [])
-                    })
+        for _, routine in WebhookPayload.of(new_data).routines():
+            rid = routine.id
+            if rid is None:
+                logger.warning(f"New payload routine missing both IDs: {routine.display_name}")
+                continue
+                
+            if rid in old_routine_ids:
+                logger.info(f"✅ Match found for id={rid} name={routine.display_name}")
+                matching_routines.append({
+                    "id": rid,
+                    "name": routine.display_name,
+                    "statistics": routine.raw_statistics()
+                })
         
         return matching_routines
     
     @staticmethod
-    def recalculate_action_plan(payload: Dict[str, Any], host: str) -> Dict[str, Any]:
+    def recalculate_action_plan(payload: Union[WebhookPayload, Dict[str, Any]], host: str) -> Dict[str, Any]:
         """
         Re-calculate an action plan by fetching the old plan from Strapi,
         finding matching routines, and returning their enriched list.
         """
         logger.info("=== RECALC_ACTION_PLAN START ===")
         
-        unique_id = payload.get("actionPlanUniqueId")
-        account_id = payload.get("accountId")
+        event = WebhookPayload.of(payload)
+        unique_id = event.action_plan_unique_id
+        account_id = event.account_id
         
         if not unique_id:
             logger.error("Missing actionPlanUniqueId")
@@ -94,7 +93,7 @@ class ActionPlanService:
             return {"error": "not-found"}
         
         matching = ActionPlanService.print_matching_routine_details(
-            new_data=payload,
+            new_data=event,
             old_action_plan=old_plan
         )
         
@@ -105,12 +104,13 @@ class ActionPlanService:
         }
     
     @staticmethod
-    def renew_action_plan(payload: Dict[str, Any], host: str) -> Dict[str, Any]:
+    def renew_action_plan(payload: Union[WebhookPayload, Dict[str, Any]], host: str) -> Dict[str, Any]:
         """
         Renew an action plan by cloning the old one and applying schedule changes.
         """
-        unique_id = payload.get("actionPlanUniqueId")
-        account_id = payload.get("accountId")
+        event = WebhookPayload.of(payload)
+        unique_id = event.action_plan_unique_id
+        account_id = event.account_id
         
         logger.info(f"Renew action plan called with {unique_id}, {account_id}")
         
@@ -134,7 +134,7 @@ class ActionPlanService:
         logger.info(f"Cloning plan {prev_id} → {new_id}")
         
         # Process schedule changes from changeLog
-        latest_changes = ActionPlanService._process_schedule_changes(payload.get("changeLog", []))
+        latest_changes = ActionPlanService._process_schedule_changes(event.change_log)
         
         # Apply changes to routines
         routines = attrs.get("routines", [])
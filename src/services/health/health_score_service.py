@@ -2,8 +2,9 @@
 
 import math
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 
+from src.models.action_plan import WebhookPayload
 from src.utils.strapi_api import strapi_get_health_scores
 
 logger = logging.getLogger(__name__)
@@ -225,32 +226,17 @@ class HealthScoreService:
         return scheduled_by_pillar
     
     @staticmethod
-    def extract_completions_by_pillar(payload: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    def extract_completions_by_pillar(payload: Union[WebhookPayload, Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
         """
-        Extract completed counts from payload and sum them by pillar.
+        Completed counts by pillar: the latest MONTH completion rate of each
+        routine, summed per pillar (precomputed when the payload is parsed).
         """
         completions_by_pillar = {}
         
-        for pillar_entry in payload.get("pillarCompletionStats", []):
-            pillar = pillar_entry.get("pillarEnum", "UNKNOWN")
-            if pillar not in completions_by_pillar:
-                completions_by_pillar[pillar] = {"completed": 0}
-            
-            for routine in pillar_entry.get("routineCompletionStats", []):
-                # Filter for MONTH statistics
-                month_stats = [
-                    stat for stat in routine.get("completionStatistics", [])
-                    if stat.get("completionRatePeriodUnit") == "MONTH"
-                ]
-                
-                if month_stats:
-                    # Get the latest month entry
-                    latest_stat = max(month_stats, key=lambda s: s.get("periodSequenceNo", 0))
-                    completion = latest_stat.get("completionRate", 0)
-                else:
-                    completion = 0
-                
-                completions_by_pillar[pillar]["completed"] += completion
+        for pillar_entry in WebhookPayload.of(payload).pillar_completion_stats:
+            pillar = pillar_entry.pillar_enum if pillar_entry.pillar_enum is not None else "UNKNOWN"
+            completions = completions_by_pillar.setdefault(pillar, {"completed": 0})
+            completions["completed"] += pillar_entry.month_completed
         
         return completions_by_pillar
     
@@ -258,7 +244,7 @@ class HealthScoreService:
     def calculate_first_month_update(
         account_id: int, 
         action_plan: Dict[str, Any], 
-        pretty_payload: Dict[str, Any], 
+        pretty_payload: Union[WebhookPayload, Dict[str, Any]], 
         initial_health_scores: Dict[str, float]
     ) -> Dict[str, Any]:
         """
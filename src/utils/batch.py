@@ -0,0 +1,97 @@
+"""Run the items of a batch request concurrently.
+
+Batch endpoints hand each item to `run_batch`, which runs them on one thread
+pool shared by every batch request in this process. The items are mostly
+waiting on Strapi, so threads (sharing the pooled HTTP session and the
+analytics caches) are enough; CPU-heavy analytics still go to the analytics
+worker processes. One item failing never fails the others.
+
+A batch answers within Config.EVENT_BATCH_TIMEOUT, before the gunicorn worker
+is killed. Items still waiting for a thread by then are cancelled, and items
+already running are left to finish; both are reported as 504 so the caller
+retries just those, which the /event idempotency cache makes safe.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_batch_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by all batch requests in this process."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=Config.MAX_WORKERS, thread_name_prefix="batch")
+    return _executor
+
+
+def parse_batch(data: Any) -> Tuple[List[Any], Optional[str]]:
+    """
+    Items of a batch request body: either a JSON array or {"events": [...]}.
+
+    Returns:
+        tuple: (items, error message or None)
+    """
+    items = data.get('events') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return [], "Expected a JSON array of events or an object with an 'events' array"
+    if not items:
+        return [], "No events provided"
+    if len(items) > Config.EVENT_BATCH_MAX_SIZE:
+        return [], f"At most {Config.EVENT_BATCH_MAX_SIZE} events per batch, got {len(items)}"
+    return items, None
+
+
+def _run_item(handler: Callable[[Any], Tuple[Dict, int]], item: Any) -> Tuple[Dict, int]:
+    try:
+        return handler(item)
+    except Exception as e:
+        logger.error(f"Batch item failed: {e}", exc_info=True)
+        return {"error": str(e)}, 500
+
+
+def run_batch(
+    handler: Callable[[Any], Tuple[Dict, int]],
+    items: Sequence[Any],
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Call `handler(item)` for every item, which returns (body, status) like a
+    single-item route, and collect per-item results in request order.
+
+    Items not finished within `timeout` seconds (default
+    Config.EVENT_BATCH_TIMEOUT) get status 504.
+    """
+    if timeout is None:
+        timeout = Config.EVENT_BATCH_TIMEOUT
+    futures = [get_batch_executor().submit(_run_item, handler, item) for item in items]
+    _, pending = wait(futures, timeout=timeout)
+    for future in pending:
+        future.cancel()
+    if pending:
+        logger.warning(f"Batch timed out after {timeout}s with {len(pending)} of {len(futures)} items unfinished")
+
+    results = []
+    for index, future in enumerate(futures):
+        if future in pending:
+            body, status = {"error": f"Not finished within {timeout}s, retry this item"}, 504
+        else:
+            body, status = future.result()
+        results.append({"index": index, "status": status, "result": body})
+
+    succeeded = sum(1 for result in results if result["status"] < 400)
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded
+    }
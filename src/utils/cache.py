@@ -0,0 +1,349 @@
+"""Pluggable key/value cache behind Config.ENABLE_CACHING and Config.CACHE_TTL.
+
+Two backends are available:
+
+- ``memory``: in-process LRU with per-entry TTL. Values are stored as-is, so
+  it can hold objects that are not JSON serializable.
+- ``shared``: a SQLite file shared by all gunicorn workers on the host.
+  Values must be JSON serializable and come back as fresh copies.
+
+Callers get a namespaced :class:`Cache` from :func:`get_cache` and never talk
+to a backend directly.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Storage for one namespace. `get` returns (found, value)."""
+
+    @abstractmethod
+    def get(self, key: str) -> Tuple[bool, Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def size(self) -> int:
+        raise NotImplementedError
+
+
+class NullCacheBackend(CacheBackend):
+    """Backend used when caching is disabled: every lookup is a miss."""
+
+    def get(self, key):
+        return False, None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def size(self):
+        return 0
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl):
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Cache namespace stored in a SQLite file shared across processes."""
+
+    _local = threading.local()
+
+    def __init__(self, path: str, namespace: str, max_entries: int = 1024):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL,"
+                " accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_entries_lru"
+                " ON cache_entries (namespace, accessed_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get(self.path)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            connections[self.path] = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return False, None
+        value, expires_at = row
+        with conn:
+            if expires_at is not None and expires_at <= now:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                )
+                return False, None
+            conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key)
+            )
+        return True, json.loads(value)
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries"
+                " (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), expires_at, now)
+            )
+            overflow = self._count(conn) - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                    " SELECT key FROM cache_entries WHERE namespace = ?"
+                    " ORDER BY accessed_at ASC LIMIT ?)",
+                    (self.namespace, self.namespace, overflow)
+                )
+
+    def delete(self, key):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            )
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    def size(self):
+        return self._count(self._connect())
+
+    def _count(self, conn: sqlite3.Connection) -> int:
+        return conn.execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+
+
+class Cache:
+    """Namespaced cache with hit/miss counters and invalidation hooks."""
+
+    def __init__(self, namespace: str, backend: CacheBackend, ttl: Optional[float] = None):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._invalidation_hooks: List[Callable[[str, Optional[str]], None]] = []
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            found, value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Cache read failed for {self.namespace}:{key}: {e}")
+            found, value = False, None
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return value if found else default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = _MISSING) -> None:
+        try:
+            self.backend.set(key, value, self.ttl if ttl is _MISSING else ttl)
+        except Exception as e:
+            logger.warning(f"Cache write failed for {self.namespace}:{key}: {e}")
+
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: Optional[float] = _MISSING) -> Any:
+        """Return the cached value, computing and storing it on a miss. None is not cached."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            if value is not None:
+                self.set(key, value, ttl)
+        return value
+
+    def delete(self, key: str) -> None:
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            logger.warning(f"Cache delete failed for {self.namespace}:{key}: {e}")
+        self._run_invalidation_hooks(key)
+
+    def clear(self) -> None:
+        try:
+            self.backend.clear()
+        except Exception as e:
+            logger.warning(f"Cache clear failed for {self.namespace}: {e}")
+        self._run_invalidation_hooks(None)
+
+    def on_invalidate(self, hook: Callable[[str, Optional[str]], None]) -> None:
+        """Register `hook(namespace, key)`; key is None when the whole namespace is cleared."""
+        self._invalidation_hooks.append(hook)
+
+    def _run_invalidation_hooks(self, key: Optional[str]) -> None:
+        for hook in self._invalidation_hooks:
+            try:
+                hook(self.namespace, key)
+            except Exception as e:
+                logger.warning(f"Cache invalidation hook failed for {self.namespace}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': self.backend.size(),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0
+        }
+
+
+_caches: Dict[str, Cache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(
+    namespace: str,
+    backend: str = 'memory',
+    ttl: Optional[float] = _MISSING,
+    max_entries: int = 1024
+) -> Cache:
+    """
+    Return the process-wide cache for `namespace`, creating it on first use.
+
+    Args:
+        namespace: Cache name, also used as the key prefix in the shared backend
+        backend: 'memory' (this process only) or 'shared' (all workers on the host)
+        ttl: Default entry lifetime in seconds; Config.CACHE_TTL when omitted, None for no expiry
+        max_entries: LRU size limit for the namespace
+    """
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is not None:
+            return cache
+
+        if not Config.ENABLE_CACHING:
+            cache_backend = NullCacheBackend()
+        elif backend == 'shared':
+            cache_backend = SQLiteCacheBackend(Config.CACHE_DB_PATH, namespace, max_entries)
+        elif backend == 'memory':
+            cache_backend = MemoryCacheBackend(max_entries)
+        else:
+            raise ValueError(f"Unknown cache backend: {backend}")
+
+        cache = Cache(namespace, cache_backend, Config.CACHE_TTL if ttl is _MISSING else ttl)
+        _caches[namespace] = cache
+        return cache
+
+
+def invalidate(namespace: str, key: Optional[str] = None) -> None:
+    """Drop one key, or the whole namespace, if that cache has been created."""
+    cache = _caches.get(namespace)
+    if cache is None:
+        return
+    if key is None:
+        cache.clear()
+    else:
+        cache.delete(key)
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters and sizes for every cache created in this process."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.namespace: cache.stats() for cache in caches}
@@ -0,0 +1,396 @@
+"""Durable outbox for outgoing writes (Strapi action plans and health scores).
+
+Writes are delivered inline first, with a short timeout, so later reads see
+them; the ones that fail are stored in a local SQLite file instead of being
+lost. A background sender delivers them with limited concurrency and a rate
+limit, retries transient failures with exponential backoff and dead-letters
+messages that keep failing. Every gunicorn worker runs a sender; they claim
+messages atomically, so each message is delivered by one worker.
+
+Messages with the same ordering key (e.g. one account's action plans) are
+delivered one at a time, and a new message replaces the older ones still
+pending, so a stale write never lands after a newer one.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DEAD = 'dead'
+
+# Messages claimed by a worker that died are retried after this many seconds
+CLAIM_TIMEOUT = 300
+
+_handlers: Dict[str, Callable[[Dict[str, Any], str], None]] = {}
+
+
+class PermanentDeliveryError(Exception):
+    """Delivery failed in a way retrying will not fix (e.g. a 4xx response)."""
+
+
+def register_handler(kind: str, handler: Callable[[Dict[str, Any], str], None]) -> None:
+    """Register `handler(payload, environment)` for a message kind. It must raise on failure."""
+    _handlers[kind] = handler
+
+
+class RateLimiter:
+    """Token bucket; `acquire` blocks until a token is available."""
+
+    def __init__(self, rate_per_second: float, burst: Optional[int] = None):
+        self.rate = rate_per_second
+        self.capacity = burst or max(1, int(rate_per_second))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_for = (1 - self._tokens) / self.rate
+            time.sleep(wait_for)
+
+
+class Outbox:
+    """SQLite-backed outbox with a background sender."""
+
+    _local = threading.local()
+
+    def __init__(
+        self,
+        path: str,
+        max_concurrency: int = 4,
+        max_attempts: int = 8,
+        rate_per_second: float = 5.0,
+        batch_size: int = 20,
+        poll_interval: float = 1.0,
+        base_backoff: float = 2.0,
+        max_backoff: float = 600.0
+    ):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="outbox-send")
+        self._rate_limiter = RateLimiter(rate_per_second)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._latencies = deque(maxlen=1000)
+        self.delivered = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.superseded = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox_messages ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " kind TEXT NOT NULL,"
+                " environment TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL,"
+                " next_attempt_at REAL NOT NULL,"
+                " claimed_by TEXT,"
+                " claimed_at REAL,"
+                " last_error TEXT)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_outbox_due"
+                " ON outbox_messages (status, next_attempt_at)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(outbox_messages)")}
+            if 'ordering_key' not in columns:
+                conn.execute("ALTER TABLE outbox_messages ADD COLUMN ordering_key TEXT")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_outbox_ordering_key"
+                " ON outbox_messages (ordering_key, status)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get(self.path)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            connections[self.path] = conn
+        return conn
+
+    def enqueue(
+        self, kind: str, payload: Dict[str, Any], environment: str, ordering_key: Optional[str] = None
+    ) -> int:
+        """
+        Persist a message and wake the sender. Returns the message id.
+
+        Pending messages with the same `ordering_key` are superseded: only the
+        newest write for the key is delivered.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            superseded = 0
+            if ordering_key is not None:
+                superseded = conn.execute(
+                    "DELETE FROM outbox_messages WHERE ordering_key = ? AND status = ?",
+                    (ordering_key, PENDING)
+                ).rowcount
+            cursor = conn.execute(
+                "INSERT INTO outbox_messages"
+                " (kind, environment, payload, status, created_at, next_attempt_at, ordering_key)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, environment, json.dumps(payload), PENDING, now, now, ordering_key)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if superseded:
+            with self._lock:
+                self.superseded += superseded
+        self._wakeup.set()
+        return cursor.lastrowid
+
+    def has_pending(self, ordering_key: str) -> bool:
+        """Whether a message with this ordering key is waiting or being delivered."""
+        return self._connect().execute(
+            "SELECT 1 FROM outbox_messages WHERE ordering_key = ? AND status IN (?, ?) LIMIT 1",
+            (ordering_key, PENDING, IN_FLIGHT)
+        ).fetchone() is not None
+
+    def start(self) -> None:
+        """Start the background sender (idempotent)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                processed = self.process_due()
+            except Exception as e:
+                logger.error(f"Outbox dispatch failed: {e}", exc_info=True)
+                processed = 0
+            if not processed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def process_due(self) -> int:
+        """Claim one batch of due messages and deliver it. Returns the batch size."""
+        batch = self._claim_batch()
+        futures = []
+        for message in batch:
+            self._rate_limiter.acquire()
+            futures.append(self._executor.submit(self._deliver, message))
+        wait(futures)
+        return len(batch)
+
+    def _claim_batch(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Skip keys another delivery is still working on
+            candidates = conn.execute(
+                "SELECT id, kind, environment, payload, attempts, created_at, ordering_key FROM outbox_messages m"
+                " WHERE ((status = ? AND next_attempt_at <= ?) OR (status = ? AND claimed_at < ?))"
+                " AND (ordering_key IS NULL OR NOT EXISTS ("
+                "   SELECT 1 FROM outbox_messages o WHERE o.ordering_key = m.ordering_key"
+                "   AND o.status = ? AND o.claimed_at >= ? AND o.id != m.id))"
+                " ORDER BY id LIMIT ?",
+                (PENDING, now, IN_FLIGHT, now - CLAIM_TIMEOUT, IN_FLIGHT, now - CLAIM_TIMEOUT, self.batch_size)
+            ).fetchall()
+            # At most one message per key in a batch, since a batch is delivered concurrently
+            rows, keys = [], set()
+            for row in candidates:
+                if row[6] is not None:
+                    if row[6] in keys:
+                        continue
+                    keys.add(row[6])
+                rows.append(row)
+            conn.executemany(
+                "UPDATE outbox_messages SET status = ?, claimed_by = ?, claimed_at = ? WHERE id = ?",
+                [(IN_FLIGHT, self.worker_id, now, row[0]) for row in rows]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [
+            {
+                'id': row[0], 'kind': row[1], 'environment': row[2],
+                'payload': json.loads(row[3]), 'attempts': row[4], 'created_at': row[5]
+            }
+            for row in rows
+        ]
+
+    def _deliver(self, message: Dict[str, Any]) -> None:
+        conn = self._connect()
+        attempts = message['attempts'] + 1
+        handler = _handlers.get(message['kind'])
+        try:
+            if handler is None:
+                raise PermanentDeliveryError(f"No handler registered for {message['kind']}")
+            handler(message['payload'], message['environment'])
+        except PermanentDeliveryError as e:
+            self._dead_letter(conn, message, attempts, str(e))
+        except Exception as e:
+            if self._supersede_if_newer(conn, message):
+                return
+            if attempts >= self.max_attempts:
+                self._dead_letter(conn, message, attempts, str(e))
+            else:
+                backoff = min(self.base_backoff * 2 ** (attempts - 1), self.max_backoff)
+                conn.execute(
+                    "UPDATE outbox_messages SET status = ?, attempts = ?, next_attempt_at = ?,"
+                    " claimed_by = NULL, claimed_at = NULL, last_error = ? WHERE id = ?",
+                    (PENDING, attempts, time.time() + backoff, str(e), message['id'])
+                )
+                with self._lock:
+                    self.retried += 1
+                logger.warning(
+                    f"Outbox message {message['id']} ({message['kind']}) failed attempt {attempts}, "
+                    f"retrying in {backoff:.0f}s: {e}"
+                )
+        else:
+            conn.execute("DELETE FROM outbox_messages WHERE id = ?", (message['id'],))
+            with self._lock:
+                self.delivered += 1
+                self._latencies.append(time.time() - message['created_at'])
+
+    def _supersede_if_newer(self, conn: sqlite3.Connection, message: Dict[str, Any]) -> bool:
+        """Drop a failed message when a newer one with its ordering key was queued meanwhile."""
+        cursor = conn.execute(
+            "DELETE FROM outbox_messages WHERE id = ? AND ordering_key IS NOT NULL AND EXISTS ("
+            " SELECT 1 FROM outbox_messages o WHERE o.ordering_key = outbox_messages.ordering_key AND o.id > ?)",
+            (message['id'], message['id'])
+        )
+        if cursor.rowcount:
+            with self._lock:
+                self.superseded += 1
+            logger.info(f"Outbox message {message['id']} ({message['kind']}) superseded by a newer write")
+        return bool(cursor.rowcount)
+
+    def _dead_letter(self, conn: sqlite3.Connection, message: Dict[str, Any], attempts: int, error: str) -> None:
+        conn.execute(
+            "UPDATE outbox_messages SET status = ?, attempts = ?, claimed_by = NULL,"
+            " claimed_at = NULL, last_error = ? WHERE id = ?",
+            (DEAD, attempts, error, message['id'])
+        )
+        with self._lock:
+            self.dead_lettered += 1
+        logger.error(f"Outbox message {message['id']} ({message['kind']}) dead-lettered after {attempts} attempts: {error}")
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT id, kind, environment, attempts, created_at, last_error FROM outbox_messages"
+            " WHERE status = ? ORDER BY id LIMIT ?",
+            (DEAD, limit)
+        ).fetchall()
+        return [
+            {'id': r[0], 'kind': r[1], 'environment': r[2], 'attempts': r[3], 'created_at': r[4], 'last_error': r[5]}
+            for r in rows
+        ]
+
+    def requeue_dead(self, message_id: Optional[int] = None) -> int:
+        """Move dead-lettered messages (one, or all) back to pending with a fresh attempt budget."""
+        query = "UPDATE outbox_messages SET status = ?, attempts = 0, next_attempt_at = ? WHERE status = ?"
+        params = [PENDING, time.time(), DEAD]
+        if message_id is not None:
+            query += " AND id = ?"
+            params.append(message_id)
+        cursor = self._connect().execute(query, params)
+        self._wakeup.set()
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        counts = dict(self._connect().execute(
+            "SELECT status, COUNT(*) FROM outbox_messages GROUP BY status"
+        ).fetchall())
+        with self._lock:
+            latencies = sorted(self._latencies)
+            delivered, retried, dead_lettered = self.delivered, self.retried, self.dead_lettered
+            superseded = self.superseded
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+        return {
+            'pending': counts.get(PENDING, 0),
+            'in_flight': counts.get(IN_FLIGHT, 0),
+            'dead': counts.get(DEAD, 0),
+            'delivered': delivered,
+            'retried': retried,
+            'dead_lettered': dead_lettered,
+            'superseded': superseded,
+            'delivery_latency_seconds': {
+                'p50': percentile(0.50),
+                'p95': percentile(0.95),
+                'max': round(latencies[-1], 3) if latencies else None
+            }
+        }
+
+
+_outbox: Optional[Outbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    """Process-wide outbox; the sender thread is started on first use."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Outbox(
+                Config.OUTBOX_DB_PATH,
+                max_concurrency=Config.OUTBOX_MAX_CONCURRENCY,
+                max_attempts=Config.OUTBOX_MAX_ATTEMPTS,
+                rate_per_second=Config.OUTBOX_RATE_LIMIT,
+                batch_size=Config.OUTBOX_BATCH_SIZE
+            )
+            _outbox.start()
+        return _outbox
@@ -0,0 +1,74 @@
+"""Request coalescing: concurrent calls with the same key share one execution."""
+
+import copy
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one `fn` per key at a time. Callers arriving while a call for
+    the same key is in flight wait for it and receive a deep copy of its result
+    (or its exception), so they can mutate what they get back independently.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key)
+            call.error = e
+            call.done.set()
+            raise
+
+        # Followers copy from a snapshot, since the leader's caller may mutate its result
+        has_waiters = self._finish(key) > 0
+        call.result = copy.deepcopy(result) if has_waiters else result
+        call.done.set()
+        return result
+
+    def _finish(self, key: Hashable) -> int:
+        """Stop accepting followers for `key` and return how many joined."""
+        with self._lock:
+            return self._calls.pop(key).waiters
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executed': self.executed,
+                'coalesced': self.coalesced
+            }
@@ -1,7 +1,14 @@
 import os
+import threading
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 import json
+import time
+
+from src.config import Config
+from src.utils.outbox import PermanentDeliveryError, get_outbox, register_handler
+from src.utils.singleflight import SingleFlight
 
 load_dotenv()
 
@@ -28,6 +35,45 @@ DEV_ACTION_PLAN_ENDPOINT = f"{DEV_BASE_URL}/action-plans"
 DEV_ROUTINES_ENDPOINT = f"{DEV_BASE_URL}/routines"
 DEV_HEALTH_SCORES_ENDPOINT = f"{DEV_BASE_URL}/health-scores"
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def _http():
+    """
+    Process-wide requests session, so calls to Strapi reuse pooled keep-alive
+    connections instead of opening one per request. Created on first use, i.e.
+    in the worker process rather than the gunicorn master.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_maxsize=Config.CONNECTION_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+# Concurrent identical reads (same endpoint and filter) share one request.
+# Results are not cached beyond that: action plans and health scores are
+# edited by the app and other Strapi clients too, so a cached copy could be
+# stale (and RENEW would clone an outdated plan).
+_read_flight = SingleFlight()
+
+
+def _coalesced_get(url, headers, params):
+    """GET a Strapi collection; concurrent calls for the same (endpoint, filter) wait on one request."""
+    def fetch():
+        response = _http().get(url, headers=headers, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    return _read_flight.do((url, tuple(sorted(params.items()))), fetch)
+
+
 def strapi_get_action_plan(actionPlanId, host):
     if host == "lthrecommendation-dev-g2g0hmcqdtbpg8dw.germanywestcentral-01.azurewebsites.net":
         app_env = "development"
@@ -43,13 +89,9 @@ def strapi_get_action_plan(actionPlanId, host):
     print('app_env', app_env)
     print(f"actionPlanId: {actionPlanId}")
     print("URL:", base_url)
+    headers = DEV_HEADERS if app_env == "development" else STAGING_HEADERS
     try:
-        if app_env == "development":
-            response = requests.get(base_url, headers=DEV_HEADERS, params=params)
-        else:
-            response = requests.get(base_url, headers=STAGING_HEADERS, params=params)
-        response.raise_for_status()
-        result = response.json()
+        result = _coalesced_get(base_url, headers, params)
 
         if "data" in result and isinstance(result["data"], list) and len(result["data"]) > 0:
             action_plan_record = result["data"][0]
@@ -81,13 +123,9 @@ def strapi_get_old_action_plan(actionPlanId, host):
     print('app_env', app_env)
     print(f"actionPlanId: {actionPlanId}")
     print("URL:", base_url)
+    headers = DEV_HEADERS if app_env == "development" else STAGING_HEADERS
     try:
-        if app_env == "development":
-            response = requests.get(base_url, headers=DEV_HEADERS, params=params)
-        else:
-            response = requests.get(base_url, headers=STAGING_HEADERS, params=params)
-        response.raise_for_status()
-        result = response.json()
+        result = _coalesced_get(base_url, headers, params)
 
         return result
     except Exception as e:
@@ -110,13 +148,9 @@ def strapi_get_health_scores(accountId, host):
     print('app_env', app_env)
     print(f"accountId: {accountId}")
     print("URL:", base_url)
+    headers = DEV_HEADERS if app_env == "development" else STAGING_HEADERS
     try:
-        if app_env == "development":
-            response = requests.get(base_url, headers=DEV_HEADERS, params=params)
-        else:
-            response = requests.get(base_url, headers=STAGING_HEADERS, params=params)
-        response.raise_for_status()
-        result = response.json()
+        result = _coalesced_get(base_url, headers, params)
         return result
 
     except Exception as e:
@@ -148,7 +182,7 @@ def strapi_get_all_routines():
             f"&populate[resources][populate]=*"
             f"&populate[routineClass][populate]=*"
         )
-        response = requests.get(url, headers=STAGING_HEADERS)
+        response = _http().get(url, headers=STAGING_HEADERS)
         print(f"Fetching page {page}: {response.status_code}")
         if response.status_code == 200:
             try:
@@ -192,7 +226,7 @@ def strapi_get_all_routines_development():
             f"&populate[resources][populate]=*"
             f"&populate[routineClass][populate]=*"
         )
-        response = requests.get(url, headers=DEV_HEADERS)
+        response = _http().get(url, headers=DEV_HEADERS)
         print(f"Fetching page {page}: {response.status_code}")
         print(f"Fetching DEV_ROUTINES_ENDPOINT {DEV_ROUTINES_ENDPOINT}: {response.status_code}")
         if response.status_code == 200:
@@ -213,60 +247,126 @@ def strapi_get_all_routines_development():
     return all_routines
 
 
-def strapi_post_action_plan(action_plan, account_id, environment):
+ACTION_PLAN_MESSAGE = "strapi.action_plan"
+HEALTH_SCORES_MESSAGE = "strapi.health_scores"
+
+
+def _check_delivery(response):
+    """Raise if Strapi did not accept a write; 4xx other than 408/429 will not be retried."""
+    if response.status_code < 400:
+        return
+    if response.status_code in (408, 429) or response.status_code >= 500:
+        raise RuntimeError(f"Strapi returned {response.status_code}")
+    raise PermanentDeliveryError(f"Strapi returned {response.status_code}: {response.text[:500]}")
+
+
+def _deliver_action_plan(payload, environment, timeout=None):
+    """Outbox handler: POST one action plan, raising on failure."""
+    action_plan = payload["action_plan"]
+    account_id = payload["account_id"]
     if environment == 'development':
-        environments = [
-            ("dev", DEV_ACTION_PLAN_ENDPOINT, DEV_HEADERS)
-        ]
+        env, endpoint, headers = "dev", DEV_ACTION_PLAN_ENDPOINT, DEV_HEADERS
     else:
-            environments = [
-            ("staging", STAGING_ACTION_PLAN_ENDPOINT, STAGING_HEADERS),
-        ]
-    for env, endpoint, headers in environments:
-        print(f"=== Outgoing Request Details (Post Action Plan) for {env} ===")
-        print(f"Account ID: {account_id}")
-        print("URL:", endpoint)
-        print("================================")
-        try:
-            response = requests.post(endpoint, headers=headers, json=action_plan)
-        except Exception as e:
-            print(f"Error while making the POST request for account {account_id} to {env}: {e}")
-            continue
-        print(f"=== Response Received from {env} ===")
-        print(f"Response for account {account_id}: {response.status_code}")
-        try:
-            response_data = response.json()
-            #print("JSON Response:", response_data)
-        except ValueError as json_error:
-            print(f"JSON decoding failed for account {account_id} on {env}: {json_error}")
-            print("Raw response content:", response.text)
-        print("================================")
+        env, endpoint, headers = "staging", STAGING_ACTION_PLAN_ENDPOINT, STAGING_HEADERS
+    print(f"=== Outgoing Request Details (Post Action Plan) for {env} ===")
+    print(f"Account ID: {account_id}")
+    print("URL:", endpoint)
+    print("================================")
+    response = _http().post(endpoint, headers=headers, json=action_plan, timeout=timeout or Config.REQUEST_TIMEOUT)
+    print(f"=== Response Received from {env} ===")
+    print(f"Response for account {account_id}: {response.status_code}")
+    _check_delivery(response)
 
-def strapi_post_health_scores(healthscores_with_tags, environment):
+
+def _deliver_health_scores(payload, environment, timeout=None):
+    """Outbox handler: POST one health score document, raising on failure."""
+    healthscores_with_tags = payload["health_scores"]
     if environment == 'development':
-        environments = [
-            ("dev", DEV_HEALTH_SCORES_ENDPOINT, DEV_HEADERS)
-        ]
+        env, endpoint, headers = "dev", DEV_HEALTH_SCORES_ENDPOINT, DEV_HEADERS
+    else:
+        env, endpoint, headers = "staging", STAGING_HEALTH_SCORES_ENDPOINT, STAGING_HEADERS
+    print(f"=== Outgoing Request Details (Post Health Scores) for {env} ===")
+    print("URL:", endpoint)
+    response = _http().post(
+        endpoint, headers=headers, json=healthscores_with_tags, timeout=timeout or Config.REQUEST_TIMEOUT
+    )
+    print(f"=== Response Received from {env} ===")
+    print("Response:", response.status_code)
+    _check_delivery(response)
+
+
+register_handler(ACTION_PLAN_MESSAGE, _deliver_action_plan)
+register_handler(HEALTH_SCORES_MESSAGE, _deliver_health_scores)
+
+
+# Monotonic time until which writes skip the inline attempt, after one failed
+_inline_paused_until = 0.0
+
+
+def _send(kind, handler, payload, environment, description, ordering_key=None):
+    """
+    Deliver a write before returning, so a follow-up event for the account
+    reads what was just written.
+
+    With USE_ASYNC_PROCESSING on, a request never waits on an unhealthy Strapi
+    for long: the inline attempt times out after Config.STRAPI_INLINE_TIMEOUT,
+    a failed write goes to the outbox to be retried in the background, and for
+    Config.STRAPI_INLINE_PAUSE seconds after a failure writes are queued
+    without trying inline. A write for an account that still has one queued
+    is queued behind it, so it cannot be overtaken by the older write.
+    """
+    global _inline_paused_until
+    if not Config.USE_ASYNC_PROCESSING:
+        timeout = Config.REQUEST_TIMEOUT
     else:
-            environments = [
-            ("staging", STAGING_HEALTH_SCORES_ENDPOINT, STAGING_HEADERS),
-        ]
-    for env, endpoint, headers in environments:
-        print(f"=== Outgoing Request Details (Post Health Scores) for {env} ===")
-        print("URL:", endpoint)
-        try:
-            response = requests.post(endpoint, headers=headers, json=healthscores_with_tags)
-        except Exception as e:
-            print(f"Error while making the POST request to {env}: {e}")
-            continue
-        print(f"=== Response Received from {env} ===")
-        print("Response:", response.status_code)
-        try:
-            response_data = response.json()
-            #print("JSON Response:", response_data)
-        except ValueError:
-            print("Response is not JSON, raw content:", response.text)
-        print("================================")
+        timeout = Config.STRAPI_INLINE_TIMEOUT
+        if time.monotonic() < _inline_paused_until:
+            reason = "Strapi recently failed"
+        elif ordering_key is not None and get_outbox().has_pending(ordering_key):
+            reason = "an earlier write is still queued"
+        else:
+            reason = None
+        if reason is not None:
+            message_id = get_outbox().enqueue(kind, payload, environment, ordering_key)
+            print(f"Queued {description} since {reason} (outbox message {message_id})")
+            return
+    try:
+        handler(payload, environment, timeout=timeout)
+        return
+    except PermanentDeliveryError as e:
+        print(f"Strapi rejected {description}: {e}")
+        return
+    except Exception as e:
+        if not Config.USE_ASYNC_PROCESSING:
+            print(f"Error while posting {description}: {e}")
+            return
+        _inline_paused_until = time.monotonic() + Config.STRAPI_INLINE_PAUSE
+        print(f"Error while posting {description}, queueing it for retry: {e}")
+    message_id = get_outbox().enqueue(kind, payload, environment, ordering_key)
+    print(f"Queued {description} for retry (outbox message {message_id})")
+
+
+def _ordering_key(kind, environment, account_id):
+    """Writes of one kind for one account are delivered in order; None if the account is unknown."""
+    return None if account_id is None else f"{kind}:{environment}:{account_id}"
+
+
+def strapi_post_action_plan(action_plan, account_id, environment):
+    _send(
+        ACTION_PLAN_MESSAGE, _deliver_action_plan,
+        {"action_plan": action_plan, "account_id": account_id},
+        environment, f"action plan for account {account_id}",
+        _ordering_key(ACTION_PLAN_MESSAGE, environment, account_id)
+    )
+
+
+def strapi_post_health_scores(healthscores_with_tags, environment):
+    _send(
+        HEALTH_SCORES_MESSAGE, _deliver_health_scores,
+        {"health_scores": healthscores_with_tags},
+        environment, "health scores",
+        _ordering_key(HEALTH_SCORES_MESSAGE, environment, healthscores_with_tags.get('data', {}).get('accountId'))
+    )
 
 
 def post_health_scores_to_internal_endpoint(healthscores_with_tags, environment):
@@ -303,7 +403,7 @@ def post_health_scores_to_internal_endpoint(healthscores_with_tags, environment)
     print(f"Account ID: {account_id}")
     
     try:
-        response = requests.post(internal_endpoint, headers=headers, json=healthscores_with_tags)
+        response = _http().post(internal_endpoint, headers=headers, json=healthscores_with_tags)
         print(f"Response Status: {response.status_code}")
         
         if response.status_code == 200:
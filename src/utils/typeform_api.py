@@ -1,9 +1,15 @@
 import os
+import threading
 import time
+from collections import namedtuple
 
 import requests
 from dotenv import load_dotenv
 
+from src.config import Config
+from src.utils.cache import get_cache
+from src.utils.data_processing import integrate_answers
+
 load_dotenv()
 
 TYPEFORM_API_KEY = os.getenv("TYPEFORM_API_KEY")
@@ -21,6 +27,63 @@ headers = {
     'Content-Type': 'application/json'
 }
 
+SPECIAL_FIELD_LABELS = {
+    '7RNIAzXy1eCa': 'Vorname',
+    'ANmNYBscN0R5': 'Nachname',
+    'TMp57UpKHkMM': 'Frühstück',
+    'mAtyQU2ScE16': 'Mittagessen',
+    'cRdUJhgqJfMx': 'Abendessen'
+}
+
+# Question title -> pillar key used by integrate_answers ('exercise', 'sleep', ...)
+QUESTION_PILLARS = {
+    question: pillar
+    for pillar, questions in integrate_answers({}).items()
+    for question in questions
+}
+
+ANSWER_PARSERS = {
+    'choice': lambda answer: answer.get('choice', {}).get('label', 'No label'),
+    'choices': lambda answer: ", ".join(answer.get('choices', {}).get('labels', [])),
+    'boolean': lambda answer: answer.get('boolean', 'No boolean value'),
+    'number': lambda answer: answer.get('number', 'No number value'),
+    'text': lambda answer: answer.get('text', 'No text value'),
+}
+
+# Typeform form field type -> answer type it produces in a response
+FIELD_ANSWER_TYPES = {
+    'multiple_choice': 'choice',
+    'dropdown': 'choice',
+    'picture_choice': 'choice',
+    'yes_no': 'boolean',
+    'legal': 'boolean',
+    'number': 'number',
+    'opinion_scale': 'number',
+    'rating': 'number',
+    'short_text': 'text',
+    'long_text': 'text',
+}
+
+TypeformField = namedtuple('TypeformField', ['label', 'pillar', 'answer_type', 'parse'])
+
+_form_cache = get_cache('typeform-forms', ttl=None, max_entries=16)
+_form_cache_lock = threading.Lock()
+
+
+class _CachedForm:
+    """Compiled form definition plus the validators needed to revalidate it."""
+
+    def __init__(self, form_data, etag=None, last_modified=None):
+        self.mapping = {field['id']: field['title'] for field in form_data['fields']}
+        self.table = compile_field_table(form_data['fields'])
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.monotonic()
+        self.refreshing = False
+
+    def is_stale(self):
+        return time.monotonic() - self.fetched_at > Config.CACHE_TTL
+
 
 def trigger_followup(host):
     if host == "lthrecommendation-dev-g2g0hmcqdtbpg8dw.germanywestcentral-01.azurewebsites.net":
@@ -52,20 +115,128 @@ def get_responses(app_env):
         print(f"Failed to retrieve responses. Status code: {response.status_code}")
         return None
 
-def get_field_mapping(app_env):
+def compile_field_table(form_fields):
+    """
+    Precompiles form fields into {field_id: TypeformField(label, pillar, answer_type, parse)}
+    so answers can be labelled and parsed with a single lookup.
+    """
+    table = {}
+    for field in form_fields:
+        label = SPECIAL_FIELD_LABELS.get(field['id'], field['title'])
+        answer_type = FIELD_ANSWER_TYPES.get(field.get('type'))
+        if answer_type == 'choice' and field.get('properties', {}).get('allow_multiple_selection'):
+            answer_type = 'choices'
+        table[field['id']] = TypeformField(
+            label=label,
+            pillar=QUESTION_PILLARS.get(label),
+            answer_type=answer_type,
+            parse=ANSWER_PARSERS.get(answer_type)
+        )
+    for field_id, label in SPECIAL_FIELD_LABELS.items():
+        if field_id not in table:
+            table[field_id] = TypeformField(label=label, pillar=None, answer_type=None, parse=None)
+    return table
+
+
+def _get_form_target(app_env):
     if app_env == "development":
-        form_url = FORM_URL_DEV
-    else:
-        form_url = FORM_URL
+        return FORM_ID_DEV, FORM_URL_DEV
+    return FORM_ID, FORM_URL
+
+
+def _fetch_form(form_url, cached=None):
+    """
+    Downloads the form definition. When a cached entry is passed the request is
+    conditional and a 304 returns the cached entry with a renewed timestamp.
+    """
+    request_headers = dict(headers)
+    if cached is not None:
+        if cached.etag:
+            request_headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            request_headers['If-Modified-Since'] = cached.last_modified
 
-    response = requests.get(form_url, headers=headers)
+    response = requests.get(form_url, headers=request_headers, timeout=Config.REQUEST_TIMEOUT)
+    if cached is not None and response.status_code == 304:
+        cached.fetched_at = time.monotonic()
+        return cached
     if response.status_code == 200:
-        form_data = response.json()
-        field_mapping = {field['id']: field['title'] for field in form_data['fields']}
-        return field_mapping
-    else:
-        print(f"Failed to retrieve form. Status code: {response.status_code}")
+        return _CachedForm(
+            response.json(),
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified')
+        )
+    print(f"Failed to retrieve form. Status code: {response.status_code}")
+    return None
+
+
+def _refresh_form(form_id, form_url, cached):
+    refreshed = None
+    try:
+        refreshed = _fetch_form(form_url, cached)
+    except Exception as e:
+        print(f"Error refreshing form definition {form_id}: {e}")
+    finally:
+        with _form_cache_lock:
+            cached.refreshing = False
+            if refreshed is not None:
+                _form_cache.set(form_id, refreshed)
+
+
+def _get_cached_form(app_env):
+    """
+    Returns the compiled form for the environment. Fresh entries are served from
+    the cache; stale ones are served while a background thread revalidates them.
+    """
+    form_id, form_url = _get_form_target(app_env)
+    if not Config.ENABLE_CACHING:
+        return _fetch_form(form_url)
+
+    with _form_cache_lock:
+        cached = _form_cache.get(form_id)
+        if cached is not None and cached.is_stale() and not cached.refreshing:
+            cached.refreshing = True
+            try:
+                threading.Thread(
+                    target=_refresh_form,
+                    args=(form_id, form_url, cached),
+                    name=f"typeform-refresh-{form_id}",
+                    daemon=True
+                ).start()
+            except Exception:
+                cached.refreshing = False
+                raise
+    if cached is not None:
+        return cached
+
+    cached = _fetch_form(form_url)
+    if cached is not None:
+        with _form_cache_lock:
+            _form_cache.set(form_id, cached)
+    return cached
+
+
+def invalidate_form_cache(form_id=None):
+    """Drops one cached form definition, or all of them when no form id is given."""
+    with _form_cache_lock:
+        if form_id is None:
+            _form_cache.clear()
+        else:
+            _form_cache.delete(form_id)
+
+
+def get_field_mapping(app_env):
+    cached = _get_cached_form(app_env)
+    if cached is None:
+        return None
+    return dict(cached.mapping)
+
+
+def get_field_table(app_env):
+    cached = _get_cached_form(app_env)
+    if cached is None:
         return None
+    return cached.table
 
 def get_latest_response(responses):
     """
@@ -84,18 +255,22 @@ def get_latest_response(responses):
     return sorted_items[0]
 
 def process_latest_response(responses, field_mapping):
+    """
+    Builds {label: value} for the latest response. `field_mapping` is either the
+    compiled table from get_field_table or a plain {field_id: title} mapping.
+    """
     latest_response = get_latest_response(responses)
     if not latest_response:
         return None
     #print("Latest response", latest_response)
 
-    special_field_labels = {
-        '7RNIAzXy1eCa': 'Vorname',
-        'ANmNYBscN0R5': 'Nachname',
-        'TMp57UpKHkMM': 'Frühstück',
-        'mAtyQU2ScE16': 'Mittagessen',
-        'cRdUJhgqJfMx': 'Abendessen'
-    }
+    field_table = field_mapping
+    if field_mapping and not isinstance(next(iter(field_mapping.values())), TypeformField):
+        field_table = compile_field_table(
+            [{'id': field_id, 'title': title} for field_id, title in field_mapping.items()]
+        )
+    elif not field_mapping:
+        field_table = compile_field_table([])
 
     answers = {}
     account_id = latest_response.get('hidden', {}).get('accountid', 'Unknown')
@@ -103,25 +278,17 @@ def process_latest_response(responses, field_mapping):
 
     for answer in latest_response.get('answers', []):
         field_id = answer['field']['id']
-        field_label = special_field_labels.get(field_id, field_mapping.get(field_id, f"Unknown Field ({field_id})"))
-
         answer_type = answer['type']
-        value = None
-
-        if answer_type == 'choice':
-            value = answer.get('choice', {}).get('label', 'No label')
-        elif answer_type == 'choices':
-            value = ", ".join(answer.get('choices', {}).get('labels', []))
-        elif answer_type == 'boolean':
-            value = answer.get('boolean', 'No boolean value')
-        elif answer_type == 'number':
-            value = answer.get('number', 'No number value')
-        elif answer_type == 'text':
-            value = answer.get('text', 'No text value')
+        field = field_table.get(field_id)
+
+        if field is None:
+            field_label = f"Unknown Field ({field_id})"
+            parse = ANSWER_PARSERS.get(answer_type)
         else:
-            value = 'Unknown Type'
+            field_label = field.label
+            parse = field.parse if field.answer_type == answer_type else ANSWER_PARSERS.get(answer_type)
 
-        answers[field_label] = value
+        answers[field_label] = parse(answer) if parse else 'Unknown Type'
 
     return answers
 
@@ -0,0 +1,48 @@
+"""
+Background import of the modules that are loaded lazily to keep boot fast.
+
+Blueprints import the analytics stack (NumPy, SciPy) and the scheduler on
+first use. Once a worker is serving, a daemon thread imports them, so the
+first request that needs them does not pay for the import either.
+"""
+
+import importlib
+import logging
+import threading
+import time
+from typing import Dict, Sequence
+
+logger = logging.getLogger(__name__)
+
+WARM_MODULES = (
+    'scipy.stats',
+    'src.analytics.analytics_service',
+    'src.scheduling.scheduler'
+)
+
+
+def warm_imports(modules: Sequence[str] = WARM_MODULES) -> Dict[str, float]:
+    """Import `modules`, returning the seconds each took (0 if already loaded)."""
+    timings = {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            # The request that needs the module will raise the error properly
+            logger.warning(f"Warm-up import of {name} failed: {e}")
+            continue
+        timings[name] = round(time.perf_counter() - started, 3)
+    logger.info(f"Warmed imports: {timings}")
+    return timings
+
+
+def start_background_warmup(modules: Sequence[str] = WARM_MODULES, delay: float = 1.0) -> threading.Thread:
+    """Run warm_imports in a daemon thread after `delay` seconds, leaving the worker free to boot and serve."""
+    def run():
+        time.sleep(delay)
+        warm_imports(modules)
+
+    thread = threading.Thread(target=run, name="import-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,154 @@
+"""Bounded work queue in front of a process pool.
+
+CPU-bound work submitted from request handlers runs in worker processes, so
+it does not compete for the GIL with the threads serving requests. At most
+`max_queue` jobs wait for a worker; further submissions are shed and counted
+instead of growing an unbounded executor queue.
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _timed_call(fn: Callable[..., Any], submitted_at: float, *args: Any):
+    """Runs in the worker: returns (seconds waited in the queue, seconds running, result)."""
+    started_at = time.time()
+    result = fn(*args)
+    return started_at - submitted_at, time.time() - started_at, result
+
+
+class BoundedWorkerPool:
+    """Process (or, for tests, thread) pool that sheds work once `max_queue` jobs are waiting."""
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 32, use_processes: bool = True, name: str = "worker"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self.name = name
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self._waits = deque(maxlen=1000)
+        self._durations = deque(maxlen=1000)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.shed = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.use_processes:
+                # spawn: workers must not inherit the parent's threads, locks or SQLite connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Optional[Future]:
+        """
+        Queue `fn(*args)`; in process mode both must be picklable.
+
+        Returns:
+            A future for the result, or None if the queue was full and the job was shed
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.shed += 1
+                logger.warning(f"{self.name} pool full ({self._pending} pending), shedding job")
+                return None
+            self._pending += 1
+            self.submitted += 1
+
+        # Submitted outside the lock: a process pool's submit can block on its call queue
+        try:
+            inner = self._submit(fn, args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                self.submitted -= 1
+            raise
+
+        outer = Future()
+        inner.add_done_callback(lambda done: self._finished(done, outer))
+        return outer
+
+    def _current_executor(self):
+        with self._lock:
+            return self._get_executor()
+
+    def _submit(self, fn, args) -> Future:
+        executor = self._current_executor()
+        try:
+            return executor.submit(_timed_call, fn, time.time(), *args)
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool rather than failing every later job
+            with self._lock:
+                if self._executor is executor:
+                    logger.error(f"{self.name} pool broken, restarting it")
+                    self._executor = None
+            # Reap the broken pool's processes and queue thread
+            executor.shutdown(wait=False, cancel_futures=True)
+            return self._current_executor().submit(_timed_call, fn, time.time(), *args)
+
+    def _finished(self, done: Future, outer: Future) -> None:
+        try:
+            waited, ran, result = done.result()
+        except Exception as e:
+            with self._lock:
+                self._pending -= 1
+                self.failed += 1
+            logger.error(f"{self.name} job failed: {e}")
+            outer.set_exception(e)
+            return
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+            self._waits.append(waited)
+            self._durations.append(ran)
+        outer.set_result(result)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = self._pending
+            waits, durations = sorted(self._waits), sorted(self._durations)
+            submitted, completed, failed, shed = self.submitted, self.completed, self.failed, self.shed
+
+        def summary(values):
+            if not values:
+                return {'p50': None, 'p95': None, 'max': None}
+            return {
+                'p50': round(values[min(len(values) - 1, int(0.50 * len(values)))], 3),
+                'p95': round(values[min(len(values) - 1, int(0.95 * len(values)))], 3),
+                'max': round(values[-1], 3)
+            }
+
+        return {
+            'workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'queue_depth': max(0, pending - self.max_workers),
+            'running': min(pending, self.max_workers),
+            'submitted': submitted,
+            'completed': completed,
+            'failed': failed,
+            'shed': shed,
+            'wait_seconds': summary(waits),
+            'run_seconds': summary(durations)
+        }
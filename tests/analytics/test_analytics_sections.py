@@ -0,0 +1,111 @@
+"""Tests for section-selectable analytics"""
+
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src.analytics import AnalyticsService
+from src.analytics.analytics_service import FULL_SECTIONS
+from src.analytics.metrics_calculator import MetricsCalculator
+from src.analytics.metrics_store import InMemoryMetricsHistoryStore
+from src.utils import cache as cache_module
+
+FIXTURES = Path(__file__).parent.parent / "fixtures"
+CHEAP_SECTIONS = ('summary', 'metrics', 'quick_recommendations')
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, '_caches', {})
+    monkeypatch.setattr(cache_module.Config, 'CACHE_DB_PATH', str(tmp_path / "cache.db"))
+    monkeypatch.setattr(cache_module.Config, 'ANALYTICS_DB_PATH', str(tmp_path / "analytics.db"))
+    return AnalyticsService()
+
+
+@pytest.fixture
+def event():
+    with open(FIXTURES / "event_payload_sample.json") as f:
+        return json.load(f)
+
+
+class TestSections:
+    """Test that only the stages behind the requested sections run"""
+
+    def test_default_response_has_every_section(self, service, event):
+        response = service.process_event(event)
+        assert list(response) == ['account_id', 'action_plan_id', 'timestamp', *FULL_SECTIONS]
+
+    def test_cheap_sections_skip_trends_and_insights(self, service, event):
+        with patch.object(service.trend_analyzer, 'analyze_trends') as analyze, \
+             patch.object(service.insights_engine, 'generate_insights') as generate:
+            response = service.process_event(event, sections=CHEAP_SECTIONS)
+
+        analyze.assert_not_called()
+        generate.assert_not_called()
+        assert set(response) == {'account_id', 'action_plan_id', 'timestamp', *CHEAP_SECTIONS}
+        assert 'engagement_score' in response['metrics']['current']
+
+    def test_history_recorded_whatever_is_requested(self, service, event):
+        service.process_event(event, sections=('summary',))
+        assert service.analytics_version(event['accountId']) == 1
+
+    def test_quick_recommendations_are_prioritized(self, service, event):
+        recommendations = service.process_event(event, sections=('quick_recommendations',))['quick_recommendations']
+        order = {'high': 0, 'medium': 1, 'low': 2}
+        assert [order[r['priority']] for r in recommendations] == sorted(order[r['priority']] for r in recommendations)
+
+    def test_unknown_section(self, service, event):
+        with pytest.raises(ValueError):
+            service.process_event(event, sections=('everything',))
+
+
+class TestSharedRun:
+    """Test that a run computes each stage once across responses"""
+
+    def test_full_response_reuses_cheap_stages(self, service, event):
+        run = service.start_run(event)
+        with patch.object(
+            service.metrics_calculator, 'calculate_metrics', wraps=service.metrics_calculator.calculate_metrics
+        ) as calculate:
+            cheap = run.response(CHEAP_SECTIONS)
+            full = run.response()
+
+        assert calculate.call_count == 1
+        assert service.analytics_version(event['accountId']) == 1
+        assert full['metrics'] == cheap['metrics']
+        assert full['summary'] == cheap['summary']
+
+
+class TestRunTrends:
+    """Test that a run's pillar trends do not depend on which path computes them"""
+
+    def test_accumulators_match_batch_regression(self, service, event):
+        rng = random.Random(37)
+        template = MetricsCalculator(history_store=InMemoryMetricsHistoryStore()).calculate_metrics(
+            service.event_processor.process_completion_event(service.start_run(event).event)
+        )
+        now = datetime.utcnow()
+        for days_ago in range(10, 0, -1):
+            snapshot = json.loads(json.dumps(template))
+            snapshot['timestamp'] = (now - timedelta(days=days_ago)).isoformat()
+            for data in snapshot['pillar_metrics'].values():
+                data['completion_score'] = rng.uniform(0, 100)
+                data['engagement_rate'] = rng.uniform(0, 1)
+            service.metrics_calculator.history_store.append(snapshot)
+
+        run = service.start_run(event)
+        history = run.stage('history')
+        assert len(history) == 11
+        assert service.metrics_calculator.get_trend_accumulators(run.account_id, window=len(history)) is not None
+
+        online = run.stage('trends')['pillar_trends']
+        batch = service.trend_analyzer.analyze_trends(history)['pillar_trends']
+        assert list(online) == list(batch)
+        for pillar, expected in batch.items():
+            for field in ('completion_trend', 'engagement_trend', 'volatility', 'momentum'):
+                assert online[pillar][field] == pytest.approx(expected[field])
+            assert online[pillar]['forecast'] == expected['forecast']
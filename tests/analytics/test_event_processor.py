@@ -0,0 +1,16 @@
+"""Tests for EventProcessor's recent-events buffer"""
+
+from src.analytics.event_processor import EventProcessor
+
+
+class TestRecentEvents:
+    """Test that processed events are kept in a bounded ring buffer"""
+
+    def test_buffer_keeps_newest_events(self):
+        processor = EventProcessor(max_recent_events=3)
+        for account_id in range(5):
+            processor.process_completion_event({'accountId': account_id, 'pillarCompletionStats': []})
+
+        assert [event['account_id'] for event in processor.get_recent_events()] == [2, 3, 4]
+        assert [event['account_id'] for event in processor.get_recent_events(limit=1)] == [4]
+        assert processor.stats() == {'recent_events': 3, 'max_recent_events': 3}
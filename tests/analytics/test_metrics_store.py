@@ -0,0 +1,99 @@
+"""Tests for the shared metrics history"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.analytics.metrics_calculator import MetricsCalculator
+from src.analytics.metrics_store import InMemoryMetricsHistoryStore, SQLiteMetricsHistoryStore
+
+
+def _metrics(account_id, timestamp, score=50.0):
+    return {
+        'account_id': account_id,
+        'timestamp': timestamp,
+        'engagement_metrics': {'engagement_score': score}
+    }
+
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteMetricsHistoryStore(str(tmp_path / "analytics.db"), retention=3)
+    return InMemoryMetricsHistoryStore(retention=3)
+
+
+class TestMetricsHistoryStore:
+    """Test range reads and retention for both store implementations"""
+
+    def test_range_is_ordered_and_bounded(self, store):
+        for day in (3, 1, 2):
+            store.append(_metrics(494, f"2025-01-0{day}T10:00:00", score=day))
+
+        history = store.range(494)
+        assert [m['engagement_metrics']['engagement_score'] for m in history] == [1, 2, 3]
+        assert [m['timestamp'] for m in store.range(494, since="2025-01-01T10:00:00")] == [
+            "2025-01-02T10:00:00", "2025-01-03T10:00:00"
+        ]
+        assert [m['timestamp'] for m in store.range(494, until="2025-01-02T10:00:00", limit=1)] == [
+            "2025-01-02T10:00:00"
+        ]
+
+    def test_retention_keeps_newest_per_account(self, store):
+        for day in range(1, 6):
+            store.append(_metrics(494, f"2025-01-0{day}T10:00:00"))
+        store.append(_metrics(7, "2025-01-01T10:00:00"))
+
+        assert store.count(494) == 3
+        assert store.range(494)[0]['timestamp'] == "2025-01-03T10:00:00"
+        assert store.count(7) == 1
+
+    def test_account_ids_match_across_types(self, store):
+        store.append(_metrics(494, "2025-01-01T10:00:00"))
+        assert len(store.range("494")) == 1
+
+
+class TestSharedHistory:
+    """Test that calculators in different workers share one history"""
+
+    def test_second_calculator_sees_first_calculators_metrics(self, tmp_path):
+        path = str(tmp_path / "analytics.db")
+        worker_a = MetricsCalculator(SQLiteMetricsHistoryStore(path))
+        worker_b = MetricsCalculator(SQLiteMetricsHistoryStore(path))
+
+        now = datetime.utcnow()
+        worker_a.history_store.append(_metrics(494, (now - timedelta(days=10)).isoformat()))
+        worker_a.history_store.append(_metrics(494, (now - timedelta(days=1)).isoformat()))
+
+        assert len(worker_b.get_historical_metrics(494, days=7)) == 1
+        assert len(worker_b.get_historical_metrics(494, days=30)) == 2
+
+
+class TestMemoryBudget:
+    """Test global LRU eviction in the in-memory store"""
+
+    def test_least_recently_used_account_evicted_over_budget(self):
+        snapshot_size = len(json.dumps(_metrics(1, "2025-01-01T10:00:00")))
+        store = InMemoryMetricsHistoryStore(retention=5, max_bytes=snapshot_size * 2)
+
+        store.append(_metrics(1, "2025-01-01T10:00:00"))
+        store.append(_metrics(2, "2025-01-01T10:00:00"))
+        store.range(1)  # account 1 is now the most recently used
+        store.append(_metrics(3, "2025-01-01T10:00:00"))
+
+        assert store.count(2) == 0
+        assert store.count(1) == 1
+        assert store.count(3) == 1
+        stats = store.stats()
+        assert stats['bytes'] <= stats['max_bytes']
+        assert stats['evicted_accounts'] == 1
+
+    def test_retention_releases_bytes(self):
+        store = InMemoryMetricsHistoryStore(retention=1)
+        store.append(_metrics(1, "2025-01-01T10:00:00"))
+        size = store.stats()['bytes']
+        store.append(_metrics(1, "2025-01-02T10:00:00"))
+
+        assert store.stats()['bytes'] == size
+        assert store.stats()['snapshots'] == 1
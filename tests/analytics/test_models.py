@@ -0,0 +1,69 @@
+"""Tests for the slotted analytics models and their cached derived values"""
+
+import pickle
+from datetime import datetime
+
+import pytest
+
+from src.analytics.models import (
+    CompletionStatistic, CompletionUnit, PeriodUnit, Pillar, PillarCompletion, RoutineCompletion, UserAnalytics
+)
+
+
+def _routine(routine_id, done_per_period, target=4):
+    stats = [
+        CompletionStatistic(0, PeriodUnit.WEEK, period, CompletionUnit.ROUTINE, target, done)
+        for period, done in enumerate(done_per_period)
+    ]
+    return RoutineCompletion(routine_id, f"Routine {routine_id}", Pillar.MOVEMENT, stats)
+
+
+def _analytics():
+    routines = {
+        'low': _routine('low', [1, 1, 0]),
+        'mid': _routine('mid', [2, 3, 3]),
+        'high': _routine('high', [2, 4, 4])
+    }
+    pillars = {
+        'SLEEP': PillarCompletion(Pillar.SLEEP, 50.0, 4, 1),
+        'MOVEMENT': PillarCompletion(Pillar.MOVEMENT, 75.0, 4, 3)
+    }
+    return UserAnalytics('u1', datetime(2025, 1, 1), pillars, routines, 60.0, 50.0)
+
+
+class TestModels:
+    """Test derived values and the slotted layout"""
+
+    def test_instances_have_no_dict(self):
+        analytics = _analytics()
+        for obj in (analytics, analytics.routine_completions['low'], analytics.pillar_completions['SLEEP'],
+                    analytics.routine_completions['low'].completion_stats[0]):
+            assert not hasattr(obj, '__dict__')
+            with pytest.raises(AttributeError):
+                obj.unexpected = 1
+
+    def test_derived_values(self):
+        analytics = _analytics()
+        high = analytics.routine_completions['high']
+        assert high.average_completion_rate == pytest.approx(250 / 3)
+        assert high.trend == 'improving'
+        assert analytics.routine_completions['low'].trend == 'declining'
+        assert [r.routine_id for r in analytics.struggling_routines] == ['low']
+        assert [r.routine_id for r in analytics.successful_routines] == ['high']
+        assert analytics.pillar_rankings == [('MOVEMENT', 75.0), ('SLEEP', 25.0)]
+
+    def test_derived_values_computed_once(self):
+        analytics = _analytics()
+        assert analytics.successful_routines is analytics.successful_routines
+        assert analytics.pillar_rankings is analytics.pillar_rankings
+
+    def test_equality_and_pickling_ignore_cache(self):
+        analytics = _analytics()
+        assert analytics.struggling_routines
+        fresh = _analytics()
+        assert analytics == fresh
+        assert 'routine_groups' not in repr(analytics)
+
+        restored = pickle.loads(pickle.dumps(analytics))
+        assert restored == fresh
+        assert [r.routine_id for r in restored.struggling_routines] == ['low']
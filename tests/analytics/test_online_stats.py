@@ -0,0 +1,173 @@
+"""Tests for the online pillar trend accumulators"""
+
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from src.analytics.metrics_calculator import MetricsCalculator
+from src.analytics.metrics_store import InMemoryMetricsHistoryStore, SQLiteMetricsHistoryStore
+from src.analytics.online_stats import RunningTrend, TrendAccumulators
+from src.analytics.trend_analyzer import SeriesMatrix, TrendAnalyzer
+
+
+def _snapshots(n_points, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            'account_id': 494,
+            'timestamp': (start + timedelta(days=t)).isoformat(),
+            'pillar_metrics': {
+                pillar: {'completion_score': rng.uniform(0, 100), 'engagement_rate': rng.uniform(0, 1)}
+                for pillar in ('MOVEMENT', 'SLEEP')
+                if pillar == 'MOVEMENT' or t % 4
+            },
+            'routine_metrics': [],
+            'engagement_metrics': {'engagement_score': rng.uniform(0, 100)},
+            'performance_indicators': {'habit_formation_index': rng.uniform(0, 100), 'completion_velocity': 'stable'}
+        }
+        for t in range(n_points)
+    ]
+
+
+class TestRunningTrend:
+    """Test the streaming statistics against batch computations"""
+
+    def test_sliding_window_matches_linregress(self):
+        values = list(np.random.default_rng(1).uniform(0, 100, 40))
+        trend = RunningTrend()
+        for value in values:
+            trend.add(value)
+        for value in values[:15]:
+            trend.remove_oldest(value)
+
+        window = values[15:]
+        expected = stats.linregress(np.arange(len(window)), window)
+        slope, intercept, r_value, p_value = trend.regression()
+        assert slope == pytest.approx(expected.slope)
+        assert intercept == pytest.approx(expected.intercept)
+        assert r_value == pytest.approx(expected.rvalue)
+        assert p_value == pytest.approx(expected.pvalue)
+
+        matrix = SeriesMatrix([{'value': value} for value in window])
+        assert trend.volatility() == pytest.approx(matrix.volatility()[0])
+        assert trend.momentum() == pytest.approx(matrix.momentum()[0])
+        assert trend.last() == window[-1]
+
+    def test_constant_window_after_downdates(self):
+        trend = RunningTrend()
+        for value in [12.5, 80.0, 33.3, 33.3, 33.3, 33.3]:
+            trend.add(value)
+        trend.remove_oldest(12.5)
+        trend.remove_oldest(80.0)
+
+        assert trend.trend() == {'direction': 'stable', 'slope': 0.0, 'strength': 0.0, 'p_value': 1.0}
+        assert trend.volatility() == 0.0
+
+    def test_state_round_trip(self):
+        trend = RunningTrend()
+        for value in (1.0, 4.0, 2.0, 8.0):
+            trend.add(value)
+        restored = RunningTrend(trend.to_state())
+        restored.add(5.0)
+        trend.add(5.0)
+        assert restored.regression() == trend.regression()
+        assert restored.momentum() == trend.momentum()
+
+    def test_emptied_by_removal(self):
+        trend = RunningTrend()
+        trend.add(3.0)
+        trend.remove_oldest(3.0)
+        assert trend.n == 0
+        assert trend.trend()['direction'] == 'insufficient_data'
+
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteMetricsHistoryStore(str(tmp_path / "analytics.db"), retention=10)
+    return InMemoryMetricsHistoryStore(retention=10)
+
+
+class TestStoreAccumulators:
+    """Test that both stores keep the accumulators in step with retention"""
+
+    def test_accumulators_follow_retained_history(self, store):
+        for metrics in _snapshots(25):
+            store.append(metrics)
+
+        online = store.trend_accumulators(494)
+        rebuilt = TrendAccumulators.from_snapshots(store.range(494))
+        assert list(online.pillars) == list(rebuilt.pillars)
+        for pillar, series in rebuilt.pillars.items():
+            for field, expected in series.items():
+                actual = online.series(pillar, field)
+                assert actual.n == expected.n
+                assert actual.regression() == pytest.approx(expected.regression())
+                assert list(actual.recent) == pytest.approx(list(expected.recent))
+
+    def test_unknown_account(self, store):
+        assert store.trend_accumulators(7) is None
+
+    def test_sqlite_rebuilds_missing_state(self, tmp_path):
+        path = str(tmp_path / "analytics.db")
+        store = SQLiteMetricsHistoryStore(path, retention=10)
+        snapshots = _snapshots(6)
+        for metrics in snapshots[:5]:
+            store.append(metrics)
+        # History written before the accumulator table existed
+        with sqlite3.connect(path) as conn:
+            conn.execute("DELETE FROM trend_accumulators")
+
+        store.append(snapshots[5])
+        online = store.trend_accumulators(494).series('MOVEMENT', 'completion_score')
+        assert online.n == 6
+        assert online.last() == snapshots[5]['pillar_metrics']['MOVEMENT']['completion_score']
+
+
+class TestAnalyzerReadsAccumulators:
+    """Test that analyze_trends gives the same pillar trends from accumulators"""
+
+    def test_pillar_trends_match_matrix_path(self):
+        history = _snapshots(12, seed=3)
+        accumulators = TrendAccumulators.from_snapshots(history)
+
+        batch = TrendAnalyzer().analyze_trends(history)
+        online = TrendAnalyzer().analyze_trends(history, accumulators)
+
+        assert list(online['pillar_trends']) == list(batch['pillar_trends'])
+        for pillar, expected in batch['pillar_trends'].items():
+            actual = online['pillar_trends'][pillar]
+            assert actual['completion_trend'] == pytest.approx(expected['completion_trend'])
+            assert actual['engagement_trend'] == pytest.approx(expected['engagement_trend'])
+            assert actual['volatility'] == pytest.approx(expected['volatility'])
+            assert actual['momentum'] == pytest.approx(expected['momentum'])
+            assert actual['forecast'] == expected['forecast']
+        assert online['predictions']['pillar_forecasts'] == batch['predictions']['pillar_forecasts']
+
+
+class TestAccumulatorWindow:
+    """Test that the accumulators are only used when they cover the analyzed window"""
+
+    @pytest.fixture
+    def calculator(self):
+        store = InMemoryMetricsHistoryStore(retention=10)
+        for metrics in _snapshots(10):
+            store.append(metrics)
+        return MetricsCalculator(history_store=store)
+
+    def test_whole_history(self, calculator):
+        assert calculator.get_trend_accumulators(494, window=10) is not None
+        assert calculator.get_trend_accumulators(494) is not None
+
+    def test_shorter_window_falls_back_to_history(self, calculator):
+        assert calculator.get_trend_accumulators(494, window=4) is None
+
+        window = calculator.history_store.range(494)[-4:]
+        expected = TrendAnalyzer().analyze_trends(window)
+        trends = TrendAnalyzer().analyze_trends(window, calculator.get_trend_accumulators(494, window=len(window)))
+        assert trends['pillar_trends'] == expected['pillar_trends']
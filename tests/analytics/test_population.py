@@ -0,0 +1,183 @@
+"""Tests for the quantile sketches and cross-account population statistics"""
+
+import bisect
+import json
+import random
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+from src.analytics import AnalyticsService
+from src.analytics.population import InMemoryPopulationStats, SQLitePopulationStats
+from src.analytics.sketches import KLLSketch
+from src.api.routes import analytics_endpoint
+from src.utils import cache as cache_module
+
+FIXTURES = Path(__file__).parent.parent / "fixtures"
+
+
+def _rank_error(sorted_values, estimate, q):
+    return abs(bisect.bisect_right(sorted_values, estimate) / len(sorted_values) - q)
+
+
+def _metrics(account_id, completion, engagement, habit_index):
+    return {
+        'account_id': account_id,
+        'timestamp': '2025-01-01T00:00:00',
+        'pillar_metrics': {'MOVEMENT': {'completion_score': completion, 'engagement_rate': engagement}},
+        'performance_indicators': {'habit_formation_index': habit_index}
+    }
+
+
+class TestKLLSketch:
+    """Test sketch accuracy, merging and serialisation"""
+
+    def test_quantiles_within_rank_error(self):
+        rng = random.Random(7)
+        values = [rng.gauss(50, 15) for _ in range(50000)]
+        sketch = KLLSketch(200, seed=1)
+        for value in values:
+            sketch.update(value)
+
+        ordered = sorted(values)
+        for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+            assert _rank_error(ordered, sketch.quantile(q), q) < 0.02
+        assert sketch.n == len(values)
+        assert (sketch.min, sketch.max) == (ordered[0], ordered[-1])
+        # Bounded memory: a few k values, not the whole stream
+        assert sum(len(level) for level in sketch.compactors) < 5 * sketch.k
+
+    def test_merge_matches_single_stream(self):
+        rng = random.Random(3)
+        values = [rng.uniform(0, 100) for _ in range(30000)]
+        parts = [KLLSketch(200, seed=seed) for seed in range(3)]
+        for i, value in enumerate(values):
+            parts[i % 3].update(value)
+        merged = parts[0]
+        merged.merge(parts[1])
+        merged.merge(parts[2])
+
+        ordered = sorted(values)
+        assert merged.n == len(values)
+        for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+            assert _rank_error(ordered, merged.quantile(q), q) < 0.02
+        assert merged.rank(50.0) == pytest.approx(0.5, abs=0.02)
+
+    def test_state_round_trip(self):
+        sketch = KLLSketch(50, seed=0)
+        for value in range(1000):
+            sketch.update(value)
+        restored = KLLSketch.from_state(json.loads(json.dumps(sketch.to_state())))
+        assert restored.n == sketch.n
+        assert restored.quantiles([0.25, 0.5, 0.75]) == sketch.quantiles([0.25, 0.5, 0.75])
+
+    def test_empty_and_mismatched(self):
+        assert KLLSketch().quantile(0.5) is None
+        assert KLLSketch().rank(1.0) is None
+        with pytest.raises(ValueError):
+            small = KLLSketch(50)
+            small.update(1.0)
+            KLLSketch(200).merge(small)
+
+
+class TestPopulationStats:
+    """Test the per-metric population sketches"""
+
+    def test_summary_and_ranks(self):
+        population = InMemoryPopulationStats()
+        for account_id in range(100):
+            population.add(_metrics(account_id, float(account_id), account_id / 100, 100.0 - account_id))
+
+        summary = population.summary()
+        completion = summary['pillars']['MOVEMENT']['completion_score']
+        assert completion['count'] == 100
+        assert completion['p50'] == pytest.approx(49.5, abs=1)
+        assert summary['habit_formation_index']['p90'] == pytest.approx(90, abs=1)
+
+        ranks = population.percentile_ranks(_metrics(1, 75.0, 0.1, 95.0))
+        assert ranks['pillars']['MOVEMENT']['completion_score'] == pytest.approx(76, abs=1)
+        assert ranks['pillars']['MOVEMENT']['engagement_rate'] == pytest.approx(11, abs=1)
+        assert ranks['habit_formation_index'] == pytest.approx(96, abs=1)
+
+    def test_each_account_counts_once(self):
+        population = InMemoryPopulationStats()
+        for account_id in range(10):
+            population.add(_metrics(account_id, 10.0 * account_id, 0.5, 50.0))
+        # A heavy sender only moves its own (latest) value
+        for _ in range(1000):
+            population.add(_metrics(0, 95.0, 0.5, 50.0))
+
+        completion = population.summary()['pillars']['MOVEMENT']['completion_score']
+        assert completion['count'] == 10
+        assert completion['max'] == 95.0
+        assert population.percentile_ranks(_metrics(0, 45.0, 0.5, 50.0))['pillars']['MOVEMENT']['completion_score'] == 40.0
+
+    def test_sqlite_workers_share_population(self, tmp_path):
+        path = str(tmp_path / "analytics.db")
+        worker_a = SQLitePopulationStats(path, flush_every=10, rebuild_seconds=0)
+        worker_b = SQLitePopulationStats(path, flush_every=1000, rebuild_seconds=0)
+        for account_id in range(25):
+            worker_a.add(_metrics(account_id, float(account_id), 0.5, 50.0))
+        for account_id in range(25, 40):
+            worker_b.add(_metrics(account_id, float(account_id), 0.5, 50.0))
+
+        # b's reads flush its own pending updates; a still holds 5 unflushed ones
+        completion = worker_b.summary()['pillars']['MOVEMENT']['completion_score']
+        assert completion['count'] == 35
+
+        worker_a.flush()
+        completion = worker_b.summary()['pillars']['MOVEMENT']['completion_score']
+        assert completion['count'] == 40
+        assert (completion['min'], completion['max']) == (0.0, 39.0)
+
+        # A later snapshot from another worker replaces the account's value
+        worker_b.add(_metrics(0, 80.0, 0.5, 50.0))
+        # b's update is still pending, so a sees the old value
+        assert worker_a.summary()['pillars']['MOVEMENT']['completion_score']['min'] == 0.0
+        completion = worker_b.summary()['pillars']['MOVEMENT']['completion_score']
+        assert completion['count'] == 40
+        assert completion['min'] == 1.0
+
+    def test_sqlite_rebuilds_are_throttled(self, tmp_path):
+        population = SQLitePopulationStats(str(tmp_path / "analytics.db"), rebuild_seconds=3600)
+        population.add(_metrics(1, 10.0, 0.5, 50.0))
+        assert population.summary()['pillars']['MOVEMENT']['completion_score']['count'] == 1
+
+        population.add(_metrics(2, 20.0, 0.5, 50.0))
+        assert population.summary()['pillars']['MOVEMENT']['completion_score']['count'] == 1
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, '_caches', {})
+    monkeypatch.setattr(cache_module.Config, 'CACHE_DB_PATH', str(tmp_path / "cache.db"))
+    monkeypatch.setattr(cache_module.Config, 'ANALYTICS_DB_PATH', str(tmp_path / "analytics.db"))
+    return AnalyticsService()
+
+
+@pytest.fixture
+def event():
+    with open(FIXTURES / "event_payload_sample.json") as f:
+        return json.load(f)
+
+
+class TestPopulationEndpoint:
+    """Test that processed events feed the population endpoint"""
+
+    def test_population_with_account_percentiles(self, service, event, monkeypatch):
+        service.process_event(event)
+        monkeypatch.setattr(analytics_endpoint, 'analytics_service', service)
+        app = Flask(__name__)
+        app.register_blueprint(analytics_endpoint.analytics_endpoint_bp)
+        client = app.test_client()
+
+        response = client.get(f"/api/analytics/population?account_id={event['accountId']}")
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body['population']['habit_formation_index']['count'] == 1
+        assert body['percentiles']['habit_formation_index'] == 100.0
+        assert set(body['percentiles']['pillars']) == set(body['population']['pillars'])
+
+        assert client.get("/api/analytics/population").status_code == 200
+        assert client.get("/api/analytics/population?account_id=999999").status_code == 404
@@ -0,0 +1,65 @@
+"""Tests for the shared AnalyticsService"""
+
+import threading
+
+from src.analytics import AnalyticsService, get_analytics_service
+from src.analytics import registry
+
+
+class TestAnalyticsServiceRegistry:
+    """Test that all callers get one service instance"""
+
+    def test_blueprints_share_one_instance(self):
+        from src.api.routes import analytics_endpoint, event_route
+
+        assert event_route.analytics_service is analytics_endpoint.analytics_service
+        # Blueprints hold a stand-in that builds the shared service on first use
+        assert event_route.analytics_service.metrics_calculator is get_analytics_service().metrics_calculator
+
+    def test_concurrent_first_use_creates_one_instance(self, monkeypatch):
+        monkeypatch.setattr(registry, '_service', None)
+        created = []
+        original_init = AnalyticsService.__init__
+
+        def counting_init(self):
+            created.append(self)
+            original_init(self)
+
+        monkeypatch.setattr(AnalyticsService, '__init__', counting_init)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get_analytics_service())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(created) == 1
+        assert all(result is results[0] for result in results)
+
+
+class TestPrimeAnalyticsViews:
+    """Test rendering the GET views in a pool worker after an event"""
+
+    def test_primes_the_views_the_endpoints_read(self, tmp_path, monkeypatch):
+        import json
+        from pathlib import Path
+
+        from src.utils import cache as cache_module
+
+        monkeypatch.setattr(cache_module, '_caches', {})
+        monkeypatch.setattr(cache_module.Config, 'CACHE_DB_PATH', str(tmp_path / "cache.db"))
+        monkeypatch.setattr(cache_module.Config, 'ANALYTICS_DB_PATH', str(tmp_path / "analytics.db"))
+        monkeypatch.setattr(cache_module.Config, 'ENABLE_CACHING', True)
+        monkeypatch.setattr(registry, '_service', None)
+        with open(Path(__file__).parent.parent / "fixtures" / "event_payload_sample.json") as f:
+            event = json.load(f)
+
+        service = get_analytics_service()
+        service.start_run(event).response(('summary', 'metrics'))
+        account_id = event['accountId']
+
+        assert registry.prime_analytics_views(account_id) == len(registry.PRIMED_SUMMARY_DAYS)
+        for days in registry.PRIMED_SUMMARY_DAYS:
+            cached = service.response_cache.get(service.response_key(account_id, 'summary', str(days), days))
+            assert cached == service.get_analytics_summary(account_id, days)
+        assert registry.prime_analytics_views(account_id) == 0
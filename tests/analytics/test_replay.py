@@ -0,0 +1,80 @@
+"""Tests for replaying stored raw webhooks"""
+
+from datetime import datetime, timedelta
+
+from src.analytics.processor import AnalyticsProcessor
+from src.analytics.replay import replay, users_by_size
+from src.analytics.storage import AnalyticsStorage
+from src.analytics.webhook_archive import parse_received_at
+
+
+def _webhook(user_id, rate):
+    return {
+        'userId': user_id,
+        'pillarCompletionStats': {'MOVEMENT': {'completionRate': rate, 'totalRoutines': 1, 'completedRoutines': 1}},
+        'routineCompletionStats': {'r1': {'name': 'Walk', 'pillar': 'MOVEMENT'}},
+        'completionStatistics': [{'routineId': 'r1', 'completionRate': rate, 'periodSequenceNo': 1}]
+    }
+
+
+def _store_webhooks(storage_path):
+    storage = AnalyticsStorage(str(storage_path))
+    for rate in (20, 40, 60):
+        storage.process_and_store_webhook(_webhook('u1', rate))
+    for rate in (10, 90):
+        storage.process_and_store_webhook(_webhook('u2', rate))
+    return storage
+
+
+class TestReplay:
+    """Test that replays rebuild snapshots and rollups and can resume"""
+
+    def test_rescoring_rebuilds_snapshots_and_rollups(self, tmp_path, monkeypatch):
+        storage = _store_webhooks(tmp_path)
+        before = storage.snapshots.range('u1')
+        assert users_by_size(tmp_path) == ['u1', 'u2']
+
+        monkeypatch.setattr(AnalyticsProcessor, '_calculate_overall_completion', lambda self, routines: 42.0)
+        result = replay(str(tmp_path), workers=1)
+
+        assert (result['replayed'], result['webhooks'], result['failed']) == (2, 5, [])
+        after = storage.snapshots.range('u1')
+        assert [s['timestamp'] for s in after] == [s['timestamp'] for s in before]
+        assert [s['overall_completion_rate'] for s in after] == [42.0, 42.0, 42.0]
+        rollup = storage.get_rollups('u1', 'all')[0]
+        assert rollup['snapshots'] == 3
+        assert rollup['average_completion_rate'] == 42.0
+        assert storage.get_aggregated_analytics('u1')['average_completion_rate'] == 42.0
+
+    def test_resume_skips_finished_users(self, tmp_path):
+        _store_webhooks(tmp_path)
+        assert replay(str(tmp_path), workers=1, users=['u1'])['replayed'] == 1
+
+        resumed = replay(str(tmp_path), workers=1)
+        assert (resumed['skipped'], resumed['replayed']) == (1, 1)
+        assert replay(str(tmp_path), workers=1)['replayed'] == 0
+        assert replay(str(tmp_path), workers=1, restart=True)['replayed'] == 2
+
+    def test_snapshots_after_the_last_webhook_are_kept(self, tmp_path):
+        storage = _store_webhooks(tmp_path)
+        later = (datetime.utcnow() + timedelta(minutes=5)).isoformat()
+        storage.snapshots.append('u1', later, {'user_id': 'u1', 'timestamp': later, 'overall_completion_rate': 7.0})
+
+        replay(str(tmp_path), workers=1)
+        snapshots = storage.snapshots.range('u1')
+        assert len(snapshots) == 4
+        assert snapshots[-1]['timestamp'] == later
+        assert storage.get_rollups('u1', 'all')[0]['snapshots'] == 4
+
+    def test_worker_processes(self, tmp_path):
+        storage = _store_webhooks(tmp_path)
+        before = storage.snapshots.range('u2')
+
+        result = replay(str(tmp_path), workers=2)
+        assert (result['replayed'], result['webhooks'], result['failed']) == (2, 5, [])
+        assert storage.snapshots.range('u2') == before
+
+    def test_file_names(self):
+        assert parse_received_at("webhook_20250101_100000_123456.json") == (datetime(2025, 1, 1, 10, 0, 0, 123456), True)
+        assert parse_received_at("webhook_20250101_100000.json") == (datetime(2025, 1, 1, 10, 0, 0), False)
+        assert parse_received_at("notes.json") is None
@@ -0,0 +1,126 @@
+"""Tests for versioned, cached analytics GET responses"""
+
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+from src.analytics import AnalyticsService
+from src.analytics import metrics_calculator as metrics_calculator_module
+from src.api.routes import analytics_endpoint
+from src.utils import cache as cache_module
+
+FIXTURES = Path(__file__).parent.parent / "fixtures"
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, '_caches', {})
+    monkeypatch.setattr(cache_module.Config, 'CACHE_DB_PATH', str(tmp_path / "cache.db"))
+    monkeypatch.setattr(cache_module.Config, 'ENABLE_CACHING', True)
+    monkeypatch.setattr(cache_module.Config, 'ANALYTICS_DB_PATH', str(tmp_path / "analytics.db"))
+    return AnalyticsService()
+
+
+@pytest.fixture
+def event():
+    with open(FIXTURES / "event_payload_sample.json") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def client(service, monkeypatch):
+    monkeypatch.setattr(analytics_endpoint, 'analytics_service', service)
+    app = Flask(__name__)
+    app.register_blueprint(analytics_endpoint.analytics_endpoint_bp)
+    return app.test_client()
+
+
+class TestVersionedResponses:
+    """Test that GET views are rendered once per account version"""
+
+    def test_version_increments_per_event(self, service, event):
+        account_id = event['accountId']
+        assert service.analytics_version(account_id) == 0
+        service.process_event(event)
+        service.process_event(event)
+        assert service.analytics_version(account_id) == 2
+
+    def test_summary_rendered_once_per_version(self, service, event):
+        account_id = event['accountId']
+        service.process_event(event)
+
+        with patch.object(service.trend_analyzer, 'analyze_trends', wraps=service.trend_analyzer.analyze_trends) as analyze:
+            first = service.get_analytics_summary(account_id, 7)
+            second = service.get_analytics_summary(account_id, 7)
+            assert analyze.call_count == 1
+            assert first == second
+
+            service.process_event(event)
+            analyze.reset_mock()
+            service.get_analytics_summary(account_id, 7)
+            assert analyze.call_count == 1
+
+    def test_params_are_part_of_the_key(self, service, event):
+        service.process_event(event)
+        with patch.object(service.trend_analyzer, 'analyze_trends', wraps=service.trend_analyzer.analyze_trends) as analyze:
+            service.get_analytics_summary(event['accountId'], 7)
+            service.get_analytics_summary(event['accountId'], 30)
+        assert analyze.call_count == 2
+
+
+class TestConditionalGet:
+    """Test ETag / If-None-Match on the summary endpoint"""
+
+    def test_unchanged_account_gets_304(self, client, service, event):
+        service.process_event(event)
+        url = f"/api/analytics/summary/{event['accountId']}"
+
+        first = client.get(url)
+        assert first.status_code == 200
+        etag = first.headers['ETag']
+
+        second = client.get(url, headers={'If-None-Match': etag})
+        assert second.status_code == 304
+        assert second.data == b''
+        assert second.headers['ETag'] == etag
+
+    def test_new_event_changes_etag(self, client, service, event):
+        service.process_event(event)
+        url = f"/api/analytics/summary/{event['accountId']}"
+        etag = client.get(url).headers['ETag']
+
+        service.process_event(event)
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_missing_account_is_not_tagged(self, client):
+        response = client.get("/api/analytics/summary/123456")
+        assert response.status_code == 404
+        assert 'ETag' not in response.headers
+
+    def test_snapshot_leaving_the_window_changes_etag_and_body(self, client, service, event, monkeypatch):
+        now = datetime.utcnow()
+        metrics = service.start_run(event).stage('metrics')
+        service.metrics_calculator.history_store.append(
+            dict(metrics, timestamp=(now - timedelta(days=6)).isoformat())
+        )
+        url = f"/api/analytics/summary/{event['accountId']}?days=7"
+        first = client.get(url)
+        assert first.get_json()['data_points'] == 2
+
+        class TwoDaysLater(datetime):
+            @classmethod
+            def utcnow(cls):
+                return now + timedelta(days=2)
+
+        # No new events, but the older snapshot is now outside the 7-day window
+        monkeypatch.setattr(metrics_calculator_module, 'datetime', TwoDaysLater)
+        second = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        assert second.status_code == 200
+        assert second.headers['ETag'] != first.headers['ETag']
+        assert second.get_json()['data_points'] == 1
@@ -0,0 +1,279 @@
+"""Tests for the SQLite-backed AnalyticsStorage"""
+
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.analytics.storage import AnalyticsStorage, SnapshotStore
+
+
+def _snapshot(user_id, timestamp, rate=50.0):
+    return {"user_id": user_id, "timestamp": timestamp, "overall_completion_rate": rate}
+
+
+class TestSnapshotStore:
+    """Test range reads and batched writes"""
+
+    def test_same_second_snapshots_are_all_kept(self, tmp_path):
+        store = SnapshotStore(tmp_path / "analytics.db")
+        store.append("u1", "2025-01-01T10:00:00", _snapshot("u1", "2025-01-01T10:00:00", 1))
+        store.append("u1", "2025-01-01T10:00:00", _snapshot("u1", "2025-01-01T10:00:00", 2))
+
+        assert [s["overall_completion_rate"] for s in store.range("u1")] == [1, 2]
+
+    def test_range_seeks_to_window(self, tmp_path):
+        store = SnapshotStore(tmp_path / "analytics.db")
+        store.append_many([
+            ("u1", f"2025-01-0{day}T10:00:00", _snapshot("u1", f"2025-01-0{day}T10:00:00", day))
+            for day in (3, 1, 2)
+        ] + [("u2", "2025-01-02T10:00:00", _snapshot("u2", "2025-01-02T10:00:00"))])
+
+        window = store.range("u1", since="2025-01-02T00:00:00", until="2025-01-03T00:00:00")
+        assert [s["overall_completion_rate"] for s in window] == [2]
+        assert [s["overall_completion_rate"] for s in store.range("u1")] == [1, 2, 3]
+
+    def test_concurrent_appends_are_all_committed(self, tmp_path):
+        store = SnapshotStore(tmp_path / "analytics.db")
+
+        def write(i):
+            store.append("u1", f"2025-01-01T10:00:{i:02d}", _snapshot("u1", f"2025-01-01T10:00:{i:02d}", i))
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert [s["overall_completion_rate"] for s in store.range("u1")] == list(range(20))
+
+    def test_appends_from_separate_workers_keep_running_totals(self, tmp_path, monkeypatch):
+        # One store per thread stands in for one store per gunicorn worker
+        path = tmp_path / "analytics.db"
+        SnapshotStore(path).append("u1", "2025-01-01T10:00:00", _snapshot("u1", "2025-01-01T10:00:00", 1))
+
+        # Line both writers up right before they read the user's last row; a
+        # writer holding the lock times out waiting for the other and goes on
+        barrier = threading.Barrier(2)
+        insert = SnapshotStore._insert
+
+        def racing_insert(self, conn, rows):
+            try:
+                barrier.wait(timeout=0.5)
+            except threading.BrokenBarrierError:
+                pass
+            insert(self, conn, rows)
+
+        monkeypatch.setattr(SnapshotStore, '_insert', racing_insert)
+
+        def write(worker):
+            timestamp = f"2025-01-01T11:00:0{worker}"
+            SnapshotStore(path).append("u1", timestamp, _snapshot("u1", timestamp, 1))
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        rows = SnapshotStore(path)._connect().execute(
+            "SELECT seq, cum_completion_rate FROM analytics_snapshots WHERE user_id = 'u1' ORDER BY seq"
+        ).fetchall()
+        assert rows == [(1, 1.0), (2, 2.0), (3, 3.0)]
+
+    def test_duplicate_seqs_are_renumbered_and_then_rejected(self, tmp_path):
+        import sqlite3
+
+        store = SnapshotStore(tmp_path / "analytics.db")
+        store.append_many([("u1", f"2025-01-0{day}T10:00:00", _snapshot("u1", f"2025-01-0{day}T10:00:00", day))
+                           for day in (1, 2, 3)])
+        conn = store._connect()
+        # A database written before the unique index, where two appends raced
+        conn.execute("DROP INDEX idx_analytics_snapshots_user_seq")
+        conn.execute("UPDATE analytics_snapshots SET seq = 2, cum_completion_rate = 3 WHERE seq = 3")
+        conn.commit()
+
+        SnapshotStore(tmp_path / "analytics.db")
+        assert conn.execute("SELECT seq, cum_completion_rate FROM analytics_snapshots ORDER BY seq").fetchall() == \
+            [(1, 1.0), (2, 3.0), (3, 6.0)]
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("UPDATE analytics_snapshots SET seq = 1 WHERE seq = 2")
+        conn.rollback()
+
+    def test_failed_batch_raises_for_its_writers(self, tmp_path):
+        store = SnapshotStore(tmp_path / "analytics.db")
+        with pytest.raises(TypeError):
+            store.append("u1", "2025-01-01T10:00:00", {"not_serializable": object()})
+
+        store.append("u1", "2025-01-01T10:00:00", _snapshot("u1", "2025-01-01T10:00:00"))
+        assert len(store.range("u1")) == 1
+
+
+class TestAnalyticsStorage:
+    """Test history reads and the legacy file import"""
+
+    def test_history_filters_by_days(self, tmp_path):
+        storage = AnalyticsStorage(str(tmp_path))
+        recent = (datetime.utcnow() - timedelta(days=1)).isoformat()
+        old = (datetime.utcnow() - timedelta(days=40)).isoformat()
+        storage.snapshots.append_many([("u1", old, _snapshot("u1", old)), ("u1", recent, _snapshot("u1", recent))])
+
+        assert [s["timestamp"] for s in storage.get_user_analytics_history("u1", days=30)] == [recent]
+
+    def test_legacy_files_imported_once(self, tmp_path):
+        timestamp = (datetime.utcnow() - timedelta(days=1)).isoformat()
+        user_dir = tmp_path / "u1"
+        user_dir.mkdir()
+        (user_dir / "analytics_20250101_100000.json").write_text(json.dumps(_snapshot("u1", timestamp)))
+
+        AnalyticsStorage(str(tmp_path))
+        storage = AnalyticsStorage(str(tmp_path))
+
+        assert len(storage.get_user_analytics_history("u1")) == 1
+
+
+def _naive_aggregate(history):
+    """The aggregation as it was computed from the full history"""
+    n = len(history)
+    first_half, second_half = history[:n // 2], history[n // 2:]
+    first_avg = sum(h['overall_completion_rate'] for h in first_half) / len(first_half)
+    second_avg = sum(h['overall_completion_rate'] for h in second_half) / len(second_half)
+    return {
+        "snapshots": n,
+        "average_completion_rate": round(sum(h['overall_completion_rate'] for h in history) / n, 1),
+        "average_engagement_score": round(sum(h['engagement_score'] for h in history) / n, 1),
+        "trend": "improving" if second_avg > first_avg else "declining"
+    }
+
+
+class TestRollups:
+    """Test that aggregates read from running totals match a full recomputation"""
+
+    def _fill(self, storage, rates, start):
+        rows = []
+        for i, rate in enumerate(rates):
+            timestamp = (start + timedelta(hours=6 * i)).isoformat()
+            snapshot = {"user_id": "u1", "timestamp": timestamp,
+                        "overall_completion_rate": rate, "engagement_score": 100 - rate}
+            rows.append(("u1", timestamp, snapshot))
+        return rows
+
+    @pytest.mark.parametrize("period,days", [("week", 7), ("month", 30), ("quarter", 90)])
+    def test_aggregate_matches_full_history(self, tmp_path, period, days):
+        import random
+        rng = random.Random(days)
+        storage = AnalyticsStorage(str(tmp_path))
+        start = datetime.utcnow() - timedelta(days=120)
+        rows = self._fill(storage, [round(rng.uniform(0, 100), 2) for _ in range(470)], start)
+        rng.shuffle(rows)  # out-of-order arrival must not corrupt the running totals
+        storage.snapshots.append_many(rows)
+
+        aggregated = storage.get_aggregated_analytics("u1", period)
+        expected = _naive_aggregate(storage.get_user_analytics_history("u1", days))
+
+        for key, value in expected.items():
+            assert aggregated[key] == value
+
+    def test_equal_halves_are_not_improving(self, tmp_path):
+        storage = AnalyticsStorage(str(tmp_path))
+        storage.snapshots.append_many(self._fill(storage, [33.3] * 10, datetime.utcnow() - timedelta(days=3)))
+
+        assert storage.get_aggregated_analytics("u1", "week")["trend"] == "declining"
+
+    def test_bucket_rollups(self, tmp_path):
+        storage = AnalyticsStorage(str(tmp_path))
+        monday = datetime(2025, 1, 6, 8)
+        storage.snapshots.append_many([
+            ("u1", (monday + timedelta(days=1)).isoformat(), {"overall_completion_rate": 60, "engagement_score": 0}),
+            ("u1", monday.isoformat(), {"overall_completion_rate": 40, "engagement_score": 0}),
+            ("u1", (monday + timedelta(days=7)).isoformat(), {"overall_completion_rate": 90, "engagement_score": 0})
+        ])
+
+        weeks = storage.get_rollups("u1", "week")
+        assert [w["bucket_start"] for w in weeks] == ["2025-01-13", "2025-01-06"]
+        assert weeks[1]["snapshots"] == 2
+        assert weeks[1]["average_completion_rate"] == 50.0
+        assert weeks[1]["completion_rate_stddev"] == 10.0
+        assert weeks[1]["first"]["completion_rate"] == 40
+        assert weeks[1]["last"]["completion_rate"] == 60
+        assert storage.get_rollups("u1", "all")[0]["snapshots"] == 3
+        assert storage.get_rollups("u1", "quarter")[0]["bucket_start"] == "2025-01-01"
+
+    def test_tables_without_running_totals_are_migrated(self, tmp_path):
+        import sqlite3
+        conn = sqlite3.connect(str(tmp_path / "analytics.db"))
+        conn.execute(
+            "CREATE TABLE analytics_snapshots (id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " user_id TEXT NOT NULL, timestamp TEXT NOT NULL, snapshot TEXT NOT NULL)"
+        )
+        for i, rate in enumerate([20, 40, 90]):
+            timestamp = (datetime.utcnow() - timedelta(days=3 - i)).isoformat()
+            conn.execute(
+                "INSERT INTO analytics_snapshots (user_id, timestamp, snapshot) VALUES (?, ?, ?)",
+                ("u1", timestamp, json.dumps({"overall_completion_rate": rate, "engagement_score": 10}))
+            )
+        conn.commit()
+        conn.close()
+
+        storage = AnalyticsStorage(str(tmp_path))
+
+        aggregated = storage.get_aggregated_analytics("u1", "week")
+        assert aggregated["snapshots"] == 3
+        assert aggregated["average_completion_rate"] == 50.0
+        assert aggregated["trend"] == "improving"
+        assert storage.get_rollups("u1", "all")[0]["snapshots"] == 3
+
+
+class TestHistoryPaging:
+    """Test cursor pagination and the streaming NDJSON export of the history"""
+
+    @pytest.fixture
+    def storage(self, tmp_path):
+        storage = AnalyticsStorage(str(tmp_path))
+        start = datetime.utcnow() - timedelta(days=5)
+        rows = [
+            ("u1", (start + timedelta(hours=i // 2)).isoformat(), _snapshot("u1", None, i))
+            for i in range(25)
+        ]
+        storage.snapshots.append_many(rows)
+        return storage
+
+    @pytest.fixture
+    def client(self, storage, monkeypatch):
+        from flask import Flask
+        from src.api.routes import analytics_route
+
+        monkeypatch.setattr(analytics_route, 'analytics_storage', storage)
+        app = Flask(__name__)
+        app.register_blueprint(analytics_route.analytics_bp)
+        return app.test_client()
+
+    def test_pages_cover_history_once(self, storage):
+        rates, cursor = [], None
+        while True:
+            page, cursor = storage.get_user_analytics_page("u1", days=30, cursor=cursor, limit=7)
+            rates.extend(s["overall_completion_rate"] for s in page)
+            if cursor is None:
+                break
+        # Snapshots sharing a timestamp are split across pages without loss or repeats
+        assert rates == list(range(25))
+
+    def test_stream_reads_in_batches(self, storage):
+        streamed = storage.snapshots.iter_range("u1", batch_size=4)
+        assert [s["overall_completion_rate"] for s in streamed] == list(range(25))
+
+    def test_paged_endpoint(self, client):
+        first = client.get("/analytics/user/u1?limit=10").get_json()
+        assert first["snapshots"] == 10
+        second = client.get(f"/analytics/user/u1?limit=10&cursor={first['next_cursor']}").get_json()
+        assert second["history"][0]["overall_completion_rate"] == 10
+
+        assert client.get("/analytics/user/u1?cursor=not-a-cursor").status_code == 400
+        assert client.get("/analytics/user/u1?limit=0").status_code == 400
+
+    def test_ndjson_export(self, client):
+        response = client.get("/analytics/user/u1?format=ndjson&days=30")
+        assert response.mimetype == "application/x-ndjson"
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line)["overall_completion_rate"] for line in lines] == list(range(25))
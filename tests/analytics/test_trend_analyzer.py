@@ -0,0 +1,176 @@
+"""Tests for the batched TrendAnalyzer"""
+
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from src.analytics.trend_analyzer import SeriesMatrix, TrendAnalyzer, batched_linregress
+
+
+def _history(n_points, seed=0, missing_pillar=None):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    history = []
+    for t in range(n_points):
+        pillars = {}
+        for pillar in ('MOVEMENT', 'SLEEP', 'NUTRITION'):
+            if pillar == missing_pillar and t % 3 == 1:
+                continue
+            pillars[pillar] = {
+                'completion_score': rng.uniform(0, 100),
+                'engagement_rate': rng.uniform(0, 1),
+                'consistency_score': rng.uniform(0, 100)
+            }
+        history.append({
+            'timestamp': (start + timedelta(days=t)).isoformat(),
+            'pillar_metrics': pillars,
+            'routine_metrics': [
+                {'routine_id': i, 'routine_name': f'Routine {i}', 'adherence_rate': rng.uniform(0, 1)}
+                for i in range(4) if rng.random() > 0.2
+            ],
+            'engagement_metrics': {'engagement_score': rng.uniform(0, 100)},
+            'performance_indicators': {'habit_formation_index': rng.uniform(0, 100), 'completion_velocity': 'stable'}
+        })
+    return history
+
+
+class TestBatchedLinregress:
+    """Test the closed-form regression against scipy.stats.linregress"""
+
+    @pytest.mark.parametrize("n_points", [2, 3, 30, 365])
+    def test_matches_linregress_per_column(self, n_points):
+        rng = np.random.default_rng(n_points)
+        values = rng.uniform(0, 100, size=(n_points, 6))
+        present = rng.random((n_points, 6)) > 0.25
+        present[:2] = True
+
+        slope, intercept, r_value, p_value = batched_linregress(values, present)
+
+        for j in range(values.shape[1]):
+            y = values[present[:, j], j]
+            expected = stats.linregress(np.arange(len(y)), y)
+            assert slope[j] == pytest.approx(expected.slope, rel=1e-9, abs=1e-12)
+            assert intercept[j] == pytest.approx(expected.intercept, rel=1e-9, abs=1e-12)
+            assert r_value[j] == pytest.approx(expected.rvalue, rel=1e-9, abs=1e-12)
+            assert p_value[j] == pytest.approx(expected.pvalue, rel=1e-6, abs=1e-12)
+
+    def test_edge_cases(self):
+        values = np.array([[5.0, 1.0, 1.0, 3.0], [5.0, 2.0, 1.0, np.nan], [5.0, 3.0, 2.0, np.nan]])
+        present = ~np.isnan(values)
+
+        slope, _, r_value, p_value = batched_linregress(values, present)
+
+        # Constant series: flat, no correlation, not significant
+        assert (slope[0], r_value[0], p_value[0]) == (0.0, 0.0, 1.0)
+        # Perfect line: |r| == 1 and p ~ 0
+        assert r_value[1] == 1.0 and p_value[1] < 1e-9
+        # A single point has no trend
+        assert np.isnan(slope[3])
+
+    def test_two_points(self):
+        values = np.array([[1.0, 4.0], [1.0, 2.0]])
+        _, _, _, p_value = batched_linregress(values, np.ones_like(values, dtype=bool))
+
+        assert list(p_value) == [1.0, 0.0]
+
+
+class TestSeriesMatrix:
+    """Test volatility and momentum against the per-series formulas"""
+
+    def test_volatility_and_momentum(self):
+        rows = [{'a': 10, 'b': 0}, {'a': 20}, {'a': 15, 'b': 0}, {'a': 30, 'b': 5}]
+        matrix = SeriesMatrix(rows)
+
+        a = np.array([10, 20, 15, 30])
+        assert matrix.volatility()[0] == pytest.approx(np.std(a) / np.mean(a) * 100)
+        assert matrix.momentum()[0] == pytest.approx((30 - 15) / abs(15 - 20))
+        # b = [0, 0, 5]: previous change is 0, so no momentum
+        assert matrix.momentum()[1] == 0.0
+        assert matrix.last(1) == 5.0
+
+
+class TestAnalyzeTrends:
+    """Test analyze_trends end to end on the batched path"""
+
+    def test_pillar_trend_matches_linregress(self):
+        history = _history(30, seed=1)
+        trends = TrendAnalyzer().analyze_trends(history)
+
+        sleep = [m['pillar_metrics']['SLEEP']['completion_score'] for m in history if 'SLEEP' in m['pillar_metrics']]
+        expected = stats.linregress(np.arange(len(sleep)), sleep)
+        completion_trend = trends['pillar_trends']['SLEEP']['completion_trend']
+        assert completion_trend['slope'] == round(expected.slope, 4)
+        assert completion_trend['strength'] == pytest.approx(abs(expected.rvalue))
+        assert completion_trend['p_value'] == pytest.approx(expected.pvalue)
+
+    def test_prediction_matches_regression(self):
+        history = _history(10, seed=2)
+        trends = TrendAnalyzer().analyze_trends(history)
+
+        scores = [m['engagement_metrics']['engagement_score'] for m in history]
+        fit = stats.linregress(np.arange(len(scores)), scores)
+        expected = max(0, min(100, fit.slope * len(scores) + fit.intercept))
+        assert trends['predictions']['next_week_engagement']['predicted_score'] == round(expected, 1)
+
+    def test_constant_history_is_json_safe(self):
+        history = _history(5, seed=3)
+        for metric in history:
+            for data in metric['pillar_metrics'].values():
+                data['completion_score'] = 50.0
+
+        trend = TrendAnalyzer().analyze_trends(history)['pillar_trends']['MOVEMENT']['completion_trend']
+        assert trend == {'direction': 'stable', 'slope': 0.0, 'strength': 0.0, 'p_value': 1.0}
+
+
+class TestPillarCorrelations:
+    """Test the batched correlation matrix against pairwise pearsonr"""
+
+    def test_matches_pearsonr(self):
+        history = _history(30, seed=4)
+        correlations = TrendAnalyzer().analyze_trends(history)['pattern_analysis']['pillar_correlations']
+
+        scores = {
+            pillar: [m['pillar_metrics'][pillar]['completion_score'] for m in history]
+            for pillar in ('MOVEMENT', 'SLEEP', 'NUTRITION')
+        }
+        assert list(correlations) == ['MOVEMENT_vs_SLEEP', 'MOVEMENT_vs_NUTRITION', 'SLEEP_vs_NUTRITION']
+        for key, value in correlations.items():
+            first, second = key.split('_vs_')
+            expected, _ = stats.pearsonr(scores[first], scores[second])
+            assert value == round(expected, 3)
+
+    def test_constant_pillar_is_skipped(self):
+        history = _history(10, seed=5)
+        for metric in history:
+            metric['pillar_metrics']['SLEEP']['completion_score'] = 40.0
+
+        correlations = TrendAnalyzer().analyze_trends(history)['pattern_analysis']['pillar_correlations']
+        assert list(correlations) == ['MOVEMENT_vs_NUTRITION']
+
+    def test_missing_snapshots_use_shared_rows(self):
+        history = _history(12, seed=6, missing_pillar='SLEEP')
+        correlations = TrendAnalyzer().analyze_trends(history)['pattern_analysis']['pillar_correlations']
+
+        shared = [m['pillar_metrics'] for m in history if 'SLEEP' in m['pillar_metrics']]
+        expected, _ = stats.pearsonr(
+            [p['MOVEMENT']['completion_score'] for p in shared],
+            [p['SLEEP']['completion_score'] for p in shared]
+        )
+        assert correlations['MOVEMENT_vs_SLEEP'] == pytest.approx(round(expected, 3))
+
+    def test_matrix_form(self):
+        history = _history(8, seed=7)
+        result = TrendAnalyzer().pillar_correlation_matrix(history)
+        correlations = TrendAnalyzer().analyze_trends(history)['pattern_analysis']['pillar_correlations']
+
+        assert result['pillars'] == ['MOVEMENT', 'SLEEP', 'NUTRITION']
+        matrix = result['matrix']
+        assert [matrix[i][i] for i in range(3)] == [1.0, 1.0, 1.0]
+        assert matrix[0][1] == matrix[1][0] == correlations['MOVEMENT_vs_SLEEP']
+
+    def test_too_few_snapshots(self):
+        matrix = TrendAnalyzer().pillar_correlation_matrix(_history(2, seed=8))['matrix']
+        assert all(value is None for row in matrix for value in row)
@@ -0,0 +1,143 @@
+"""Tests for compacting and expiring stored raw webhooks"""
+
+import gzip
+import json
+from datetime import date, datetime, timedelta
+
+from src.analytics.replay import replay
+from src.analytics.storage import AnalyticsStorage
+from src.analytics.webhook_archive import (
+    RAW_WEBHOOK_TIME_FORMAT, compact, iter_webhooks, webhook_dir
+)
+
+
+def _write(storage_path, user_id, received_at, payload):
+    directory = webhook_dir(storage_path, user_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"webhook_{received_at.strftime(RAW_WEBHOOK_TIME_FORMAT)}.json"
+    path.write_text(json.dumps(payload, indent=2))
+    return path
+
+
+def _three_days(storage_path):
+    times = [datetime(2025, 3, day, hour, 0, 0, 250000) for day in (1, 2, 3) for hour in (9, 17)]
+    for i, received_at in enumerate(times):
+        _write(storage_path, 'u1', received_at, {'userId': 'u1', 'n': i})
+    return times
+
+
+def _names(storage_path):
+    return sorted(path.name for path in webhook_dir(storage_path, 'u1').iterdir())
+
+
+class TestCompaction:
+    """Test that compaction bundles finished days without changing what readers see"""
+
+    def test_bundles_finished_days(self, tmp_path):
+        times = _three_days(tmp_path)
+        before = list(iter_webhooks(tmp_path, 'u1'))
+
+        result = compact(str(tmp_path), today=date(2025, 3, 3))
+        assert result == {'users': 1, 'compacted': 4, 'expired': 0}
+        assert _names(tmp_path) == [
+            f"webhook_{times[4].strftime(RAW_WEBHOOK_TIME_FORMAT)}.json",
+            f"webhook_{times[5].strftime(RAW_WEBHOOK_TIME_FORMAT)}.json",
+            "webhooks_20250301.idx.json", "webhooks_20250301.ndjson.gz",
+            "webhooks_20250302.idx.json", "webhooks_20250302.ndjson.gz"
+        ]
+        assert list(iter_webhooks(tmp_path, 'u1')) == before
+
+        # Plain gzip'd NDJSON for other tools
+        with gzip.open(webhook_dir(tmp_path, 'u1') / "webhooks_20250301.ndjson.gz", 'rt') as f:
+            assert [json.loads(line)['webhook']['n'] for line in f] == [0, 1]
+
+        assert compact(str(tmp_path), today=date(2025, 3, 3))['compacted'] == 0
+
+    def test_range_reads_and_late_files(self, tmp_path):
+        _three_days(tmp_path)
+        compact(str(tmp_path), today=date(2025, 3, 4))
+        _write(tmp_path, 'u1', datetime(2025, 3, 1, 12), {'userId': 'u1', 'n': 'late'})
+        compact(str(tmp_path), today=date(2025, 3, 4))
+
+        storage = AnalyticsStorage(str(tmp_path))
+        window = storage.get_raw_webhooks('u1', since=datetime(2025, 3, 1, 10), until=datetime(2025, 3, 2, 10))
+        assert [w['webhook']['n'] for w in window] == ['late', 1, 2]
+        assert window[0]['received_at'] == '2025-03-01T12:00:00'
+
+    def test_interrupted_compaction_is_repaired(self, tmp_path):
+        times = _three_days(tmp_path)
+        directory = webhook_dir(tmp_path, 'u1')
+        leftover = directory / f"webhook_{times[0].strftime(RAW_WEBHOOK_TIME_FORMAT)}.json"
+        content = leftover.read_text()
+        compact(str(tmp_path), today=date(2025, 3, 2))
+        # Crashed after writing the index but before deleting the files,
+        # and a later run crashed after appending to the bundle but before indexing
+        leftover.write_text(content)
+        with open(directory / "webhooks_20250301.ndjson.gz", 'ab') as f:
+            f.write(b"partial")
+
+        assert [payload['n'] for _, _, payload in iter_webhooks(tmp_path, 'u1')] == [0, 1, 2, 3, 4, 5]
+        compact(str(tmp_path), today=date(2025, 3, 2))
+        assert not leftover.exists()
+        assert [payload['n'] for _, _, payload in iter_webhooks(tmp_path, 'u1')] == [0, 1, 2, 3, 4, 5]
+
+    def test_missing_bundle_is_rebuilt_from_fresh_files(self, tmp_path):
+        times = _three_days(tmp_path)
+        directory = webhook_dir(tmp_path, 'u1')
+        leftover = directory / f"webhook_{times[1].strftime(RAW_WEBHOOK_TIME_FORMAT)}.json"
+        content = leftover.read_text()
+        compact(str(tmp_path), today=date(2025, 3, 2))
+        # Indexed, but the bundle is gone and only one of its files is left
+        leftover.write_text(content)
+        (directory / "webhooks_20250301.ndjson.gz").unlink()
+
+        assert compact(str(tmp_path), today=date(2025, 3, 2))['compacted'] == 1
+        assert not leftover.exists()
+        with gzip.open(directory / "webhooks_20250301.ndjson.gz", 'rt') as f:
+            assert [json.loads(line)['webhook']['n'] for line in f] == [1]
+        assert [payload['n'] for _, _, payload in iter_webhooks(tmp_path, 'u1')] == [1, 2, 3, 4, 5]
+
+    def test_short_bundle_keeps_the_records_it_holds(self, tmp_path):
+        _three_days(tmp_path)
+        compact(str(tmp_path), today=date(2025, 3, 2))
+        bundle_path = webhook_dir(tmp_path, 'u1') / "webhooks_20250301.ndjson.gz"
+        with open(bundle_path, 'r+b') as f:
+            f.truncate(bundle_path.stat().st_size - 1)
+        _write(tmp_path, 'u1', datetime(2025, 3, 1, 12), {'userId': 'u1', 'n': 'late'})
+
+        compact(str(tmp_path), today=date(2025, 3, 2))
+        assert [payload['n'] for _, _, payload in iter_webhooks(tmp_path, 'u1')] == [0, 'late', 2, 3, 4, 5]
+        with gzip.open(bundle_path, 'rt') as f:
+            assert [json.loads(line)['webhook']['n'] for line in f] == [0, 'late']
+
+    def test_retention_expires_old_days(self, tmp_path):
+        _three_days(tmp_path)
+        compact(str(tmp_path), today=date(2025, 3, 3))
+
+        result = compact(str(tmp_path), retention_days=1, today=date(2025, 3, 3))
+        assert result['expired'] == 2
+        assert [payload['n'] for _, _, payload in iter_webhooks(tmp_path, 'u1')] == [2, 3, 4, 5]
+        assert "webhooks_20250301.ndjson.gz" not in _names(tmp_path)
+
+
+class TestReplayAcrossArchive:
+    """Test that replays read compacted webhooks and respect retention"""
+
+    def test_replay_after_compaction_and_retention(self, tmp_path):
+        storage = AnalyticsStorage(str(tmp_path))
+        for rate in (20, 40):
+            storage.process_and_store_webhook({
+                'userId': 'u1',
+                'routineCompletionStats': {'r1': {'pillar': 'MOVEMENT'}},
+                'completionStatistics': [{'routineId': 'r1', 'completionRate': rate}]
+            })
+        old = (datetime.utcnow() - timedelta(days=400)).isoformat()
+        storage.snapshots.append('u1', old, {'user_id': 'u1', 'timestamp': old, 'overall_completion_rate': 5.0})
+        before = storage.snapshots.range('u1')
+
+        compact(str(tmp_path), today=datetime.utcnow().date() + timedelta(days=1))
+        assert not any(name.startswith("webhook_") for name in _names(tmp_path))
+
+        assert replay(str(tmp_path), workers=1)['webhooks'] == 2
+        # The snapshot whose webhook is gone is older than every retained webhook, so it stays
+        assert storage.snapshots.range('u1') == before
@@ -0,0 +1,154 @@
+"""Tests for /event handling: retried deliveries and the bound on analytics"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+from src.api.routes import event_route
+from src.utils import cache as cache_module
+
+PAYLOAD = {
+    "actionPlanUniqueId": "plan-1",
+    "accountId": 494,
+    "pillarCompletionStats": [
+        {
+            "pillarEnum": "MOVEMENT",
+            "routineCompletionStats": [
+                {"routineUniqueId": 1, "displayName": "Walk",
+                 "completionStatistics": [{"completionRate": 2, "completionRatePeriodUnit": "MONTH", "periodSequenceNo": 1}]}
+            ]
+        }
+    ]
+}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, '_caches', {})
+    monkeypatch.setattr(cache_module.Config, 'CACHE_DB_PATH', str(tmp_path / "cache.db"))
+    monkeypatch.setattr(cache_module.Config, 'ENABLE_CACHING', True)
+    app = Flask(__name__)
+    app.register_blueprint(event_route.event_bp)
+    return app.test_client()
+
+
+@pytest.fixture
+def pipeline():
+    """The external calls of the event pipeline, with a renew that posts a new plan id each time."""
+    renewals = iter(range(1, 100))
+    with patch.object(event_route, 'strapi_get_health_scores', return_value={}) as get_scores, \
+         patch.object(event_route, 'strapi_get_old_action_plan', return_value=None), \
+         patch.object(event_route, 'process_event_analytics', return_value=None), \
+         patch.object(event_route.ActionPlanService, 'renew_action_plan',
+                      side_effect=lambda payload, host: {"data": {"actionPlanUniqueId": f"new-{next(renewals)}"}}) as renew:
+        yield {'get_scores': get_scores, 'renew': renew}
+
+
+def _event(payload=PAYLOAD, event_type="RENEW_ACTION_PLAN"):
+    return {"eventEnum": event_type, "eventPayload": payload}
+
+
+class TestEventIdempotency:
+    """Test that a retried event costs a lookup, not a second run"""
+
+    def test_retry_gets_stored_result(self, client, pipeline):
+        first = client.post('/event', json=_event())
+        # Same event, delivered as a string with its keys in another order
+        reordered = json.dumps(dict(reversed(list(PAYLOAD.items()))), indent=2)
+        second = client.post('/event', json=_event(reordered))
+
+        assert first.status_code == second.status_code == 200
+        assert second.get_json() == first.get_json()
+        assert pipeline['renew'].call_count == 1
+        assert pipeline['get_scores'].call_count == 1
+
+    def test_different_events_run(self, client, pipeline):
+        client.post('/event', json=_event())
+        client.post('/event', json=_event(dict(PAYLOAD, accountId=495)))
+        client.post('/event', json=_event(event_type="RECALCULATE_ACTION_PLAN"))
+        changed = json.loads(json.dumps(PAYLOAD))
+        changed["pillarCompletionStats"][0]["routineCompletionStats"][0]["completionStatistics"][0]["completionRate"] = 3
+        client.post('/event', json=_event(changed))
+
+        assert pipeline['renew'].call_count == 3
+        assert pipeline['get_scores'].call_count == 4
+
+    def test_failures_are_not_stored(self, client, pipeline):
+        pipeline['renew'].side_effect = lambda payload, host: {"error": "strapi-fetch-failed"}
+        client.post('/event', json=_event())
+        client.post('/event', json=_event())
+        assert pipeline['renew'].call_count == 2
+
+    def test_fingerprint(self):
+        key = event_route.event_fingerprint("RENEW_ACTION_PLAN", PAYLOAD, "api.example")
+        assert key.startswith("api.example:RENEW_ACTION_PLAN:494:plan-1:")
+        assert key != event_route.event_fingerprint("RENEW_ACTION_PLAN", PAYLOAD, "dev.example")
+
+
+class TestEventAnalyticsTimeout:
+    """Test that slow analytics cannot stall the webhook response"""
+
+    def test_responds_without_insights_when_analytics_is_slow(self, client, pipeline, monkeypatch):
+        import threading
+
+        release = threading.Event()
+        monkeypatch.setattr(event_route.Config, 'EVENT_ANALYTICS_TIMEOUT', 0.05)
+        monkeypatch.setattr(event_route, 'process_event_analytics', lambda event_payload: release.wait(5))
+        try:
+            response = client.post('/event', json=_event())
+        finally:
+            release.set()
+
+        assert response.status_code == 200
+        assert 'analytics_insights' not in response.get_json()
+
+    def test_includes_insights_when_analytics_is_ready(self, client, pipeline, monkeypatch):
+        analytics = {
+            'metrics': {'current': {'engagement_score': 42.0}},
+            'summary': {'active_pillars': 1, 'total_pillars': 7},
+            'quick_recommendations': []
+        }
+        monkeypatch.setattr(event_route, 'process_event_analytics', lambda event_payload: analytics)
+
+        response = client.post('/event', json=_event())
+        assert response.get_json()['analytics_insights'] == {'engagement_score': 42.0, 'recommendation': None}
+
+
+class TestEventAnalyticsPool:
+    """Test that /event analytics run on a bounded pool that sheds and counts"""
+
+    @pytest.fixture
+    def pool(self, monkeypatch):
+        from src.analytics import registry
+        from src.utils.worker_pool import BoundedWorkerPool
+
+        pool = BoundedWorkerPool(max_workers=1, max_queue=0, use_processes=False, name="event-analytics")
+        monkeypatch.setattr(registry, '_event_pool', pool)
+        yield pool
+        pool.shutdown(wait=False)
+
+    def test_full_pool_sheds_analytics(self, client, pipeline, pool, monkeypatch):
+        import threading
+
+        release = threading.Event()
+        monkeypatch.setattr(event_route.Config, 'EVENT_ANALYTICS_TIMEOUT', 0.05)
+        monkeypatch.setattr(event_route, 'process_event_analytics', lambda event_payload: release.wait(5))
+        try:
+            first = client.post('/event', json=_event())
+            second = client.post('/event', json=_event(dict(PAYLOAD, accountId=495)))
+        finally:
+            release.set()
+
+        assert first.status_code == second.status_code == 200
+        assert 'analytics_insights' not in second.get_json()
+        assert pool.stats()['shed'] == 1
+        assert pipeline['renew'].call_count == 2
+
+    def test_missing_event_type_starts_no_analytics(self, client, pipeline, pool):
+        response = client.post('/event', json={"eventPayload": PAYLOAD})
+
+        assert response.status_code == 400
+        assert pool.stats()['submitted'] == 0
+        pipeline['get_scores'].assert_not_called()
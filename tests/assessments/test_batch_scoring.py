@@ -0,0 +1,133 @@
+"""Tests for scoring many questionnaires at once"""
+
+import random
+
+import pandas as pd
+import pytest
+
+from src.assessments import batch_scoring
+from src.assessments.cognition_assessment import CognitionAssessment
+from src.assessments.exercise_assessment import ExerciseAssessment
+from src.assessments.gratitude_assessment import GratitudeAssessment
+from src.assessments.health_assessment import HealthAssessment
+from src.assessments.nutrition_assessment import ANSWER_KEY_MAPPING, NutritionAssessment
+from src.assessments.sleep_assessment import SleepAssessment
+from src.assessments.social_connections_assessment import SocialConnectionsAssessment
+from src.assessments.stress_management_assessment import StressManagementAssessment
+
+ASSESSMENTS = {
+    'exercise': ExerciseAssessment,
+    'nutrition': NutritionAssessment,
+    'sleep': SleepAssessment,
+    'social_connections': SocialConnectionsAssessment,
+    'stress_management': StressManagementAssessment,
+    'gratitude': GratitudeAssessment,
+    'cognition': CognitionAssessment
+}
+
+
+def _level(rng, low=0):
+    value = rng.randint(low, 5)
+    return str(value) if rng.random() < 0.5 else value
+
+
+def random_questionnaire(rng):
+    """Per-pillar answer dicts, covering every answer option and the BMI edge cases."""
+    nutrition = {
+        ANSWER_KEY_MAPPING['sugar']: _level(rng),
+        ANSWER_KEY_MAPPING['processed']: _level(rng),
+        ANSWER_KEY_MAPPING['whole_grain']: _level(rng),
+        ANSWER_KEY_MAPPING['fluids']: rng.choice(['0-3', '4-6', '7-9', '10-12', '> 12', 'weiß nicht']),
+        ANSWER_KEY_MAPPING['alcohol']: rng.choice(['Gar keinen', '1-3', '4-6', '7-9', '10-12', '> 12']),
+        batch_scoring.WEIGHT_KEY: rng.choice([str(rng.randint(40, 140)), rng.randint(40, 140), ' 72 ', '', 'n/a', 0]),
+        batch_scoring.HEIGHT_KEY: rng.choice([str(rng.randint(140, 210)), rng.randint(140, 210), '180', -1])
+    }
+    if rng.random() < 0.1:
+        del nutrition[batch_scoring.HEIGHT_KEY]
+
+    sleep_keys = SleepAssessment.REQUIRED_KEYS
+    sleep = {
+        sleep_keys[0]: rng.choice(list(SleepAssessment.sleep_quality_mapping)),
+        sleep_keys[1]: rng.sample(['Einschlafprobleme', 'Durchschlafprobleme', 'Sonstige', 'Albträume'], rng.randint(0, 4)),
+        sleep_keys[2]: rng.choice(list(SleepAssessment.sleep_hours_mapping)),
+        sleep_keys[3]: _level(rng, low=1),
+        sleep_keys[4]: rng.choice(list(SleepAssessment.time_outside_morning_mapping)),
+        sleep_keys[5]: rng.choice(list(SleepAssessment.time_outside_evening_mapping))
+    }
+    activities_key, engagement_key, loneliness_key = SocialConnectionsAssessment.REQUIRED_KEYS
+    social_connections = {
+        activities_key: rng.choice(list(SocialConnectionsAssessment.ACTIVITIES_MAPPING)),
+        engagement_key: rng.choice(['Sportverein', '', '  ', True, False, None]),
+        loneliness_key: _level(rng, low=1)
+    }
+    return {
+        'exercise': {key: _level(rng) for key in ExerciseAssessment.REQUIRED_KEYS},
+        'nutrition': nutrition,
+        'sleep': sleep,
+        'social_connections': social_connections,
+        'stress_management': {key: _level(rng) for key in StressManagementAssessment.REQUIRED_KEYS},
+        'gratitude': {key: _level(rng) for key in GratitudeAssessment.REQUIRED_KEYS},
+        'cognition': {key: _level(rng, low=1) for key in CognitionAssessment.REQUIRED_KEYS}
+    }
+
+
+def per_user_scores(questionnaire):
+    pillars = {pillar: dict(answers) for pillar, answers in questionnaire.items()}
+    scores = {pillar: float(ASSESSMENTS[pillar](dict(answers)).report()) for pillar, answers in pillars.items()}
+    scores['total'] = HealthAssessment(**pillars).calculate_total_score()
+    return scores
+
+
+def flatten(questionnaire):
+    return {question: answer for answers in questionnaire.values() for question, answer in answers.items()}
+
+
+@pytest.fixture(scope="module")
+def questionnaires():
+    rng = random.Random(50)
+    return [random_questionnaire(rng) for _ in range(400)]
+
+
+class TestParity:
+    """Test that batch scores are bit-identical to the per-user path"""
+
+    def test_matches_per_user_scores(self, questionnaires):
+        batch = HealthAssessment.score_batch([flatten(q) for q in questionnaires])
+
+        assert list(batch.columns) == batch_scoring.PILLARS + ['total']
+        for row, questionnaire in zip(batch.to_dict('records'), questionnaires):
+            expected = per_user_scores(questionnaire)
+            assert {k: v.hex() for k, v in row.items()} == {k: v.hex() for k, v in expected.items()}
+
+    def test_keeps_dataframe_index(self, questionnaires):
+        frame = pd.DataFrame([flatten(q) for q in questionnaires[:3]], index=['a', 'b', 'c'], dtype=object)
+        batch = batch_scoring.score_health_batch(frame)
+        assert list(batch.index) == ['a', 'b', 'c']
+        assert batch.loc['b', 'total'] == per_user_scores(questionnaires[1])['total']
+
+    def test_builtin_sum_rounding(self):
+        terms = [pd.Series([0.1, 1e16]).to_numpy(), pd.Series([0.2, 1.0]).to_numpy(), pd.Series([0.3, -1e16]).to_numpy()]
+        assert list(batch_scoring._float_sum(terms)) == [sum([0.1, 0.2, 0.3]), sum([1e16, 1.0, -1e16])]
+
+
+class TestInvalidAnswers:
+    """Test that invalid answers fail like the per-user path, naming the row"""
+
+    def test_missing_question(self, questionnaires):
+        rows = [flatten(q) for q in questionnaires[:2]]
+        for row in rows:
+            del row[ANSWER_KEY_MAPPING['fluids']]
+        with pytest.raises(ValueError, match="Missing required key"):
+            batch_scoring.score_health_batch(rows)
+
+    @pytest.mark.parametrize("question, answer, message", [
+        (ExerciseAssessment.REQUIRED_KEYS[0], 'viel', "must be an integer"),
+        (SleepAssessment.REQUIRED_KEYS[0], 'sehr gut', "Invalid sleep quality"),
+        (SleepAssessment.REQUIRED_KEYS[1], 'Sonstige', "must be a list"),
+        (SocialConnectionsAssessment.REQUIRED_KEYS[2], 'oft', "must be an integer"),
+    ])
+    def test_invalid_answer(self, questionnaires, question, answer, message):
+        rows = [flatten(q) for q in questionnaires[:3]]
+        rows[2][question] = answer
+        with pytest.raises(ValueError, match=f"Row 2: .*{message}"):
+            batch_scoring.score_health_batch(rows)
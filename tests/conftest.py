@@ -3,10 +3,28 @@
 import pytest
 import os
 import sys
+import tempfile
 
 # Add src to Python path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
+# Read by Config on import; covers the modules that open stores at import time
+_DB_DIR = tempfile.mkdtemp(prefix="lth-test-db-")
+for _name in ('CACHE_DB_PATH', 'OUTBOX_DB_PATH', 'ANALYTICS_DB_PATH'):
+    os.environ[_name] = os.path.join(_DB_DIR, _name.split('_')[0].lower() + ".db")
+
+
+@pytest.fixture(autouse=True)
+def isolated_databases(tmp_path, monkeypatch):
+    """Keep the SQLite cache, outbox and analytics stores out of the working tree"""
+    from src.config import Config
+    from src.utils import cache as cache_module
+
+    monkeypatch.setattr(Config, 'CACHE_DB_PATH', str(tmp_path / "cache.db"))
+    monkeypatch.setattr(Config, 'OUTBOX_DB_PATH', str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(Config, 'ANALYTICS_DB_PATH', str(tmp_path / "analytics.db"))
+    monkeypatch.setattr(cache_module, '_caches', {})
+
 @pytest.fixture
 def sample_nutrition_answers():
     """Sample nutrition assessment answers for testing"""
@@ -0,0 +1,127 @@
+"""Tests for the typed event payload and its precomputed aggregates"""
+
+import json
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from src.analytics.event_processor import EventProcessor
+from src.api.routes.event_route import process_event_data
+from src.models import CompletionStatistic, PillarCompletionStats, RoutineCompletion, WebhookPayload
+from src.services.action_plan.action_plan_service import ActionPlanService
+from src.services.health.health_score_service import HealthScoreService
+
+FIXTURES = Path(__file__).parent.parent / "fixtures"
+
+
+def _stat(rate, unit, period):
+    return {'completionRate': rate, 'completionRatePeriodUnit': unit, 'periodSequenceNo': period}
+
+
+PAYLOAD = {
+    'accountId': 7,
+    'actionPlanUniqueId': 'plan-1',
+    'pillarCompletionStats': [
+        {
+            'pillarEnum': 'MOVEMENT',
+            'routineCompletionStats': [
+                {
+                    'routineUniqueId': 1,
+                    'displayName': 'Walk',
+                    'completionStatistics': [
+                        _stat(2, 'WEEK', 1), _stat(3, 'WEEK', 2), _stat(4, 'MONTH', 1), _stat(6, 'MONTH', 2)
+                    ]
+                },
+                {'routineId': 2, 'displayName': 'Stretch', 'completionStatistics': [_stat(1, 'WEEK', 2)]},
+                {'routineUniqueId': 3, 'displayName': 'Swim'}
+            ]
+        },
+        {'pillarEnum': 'SLEEP', 'routineCompletionStats': []}
+    ]
+}
+
+
+@pytest.fixture
+def sample():
+    with open(FIXTURES / "event_payload_sample.json") as f:
+        return json.load(f)
+
+
+class TestAggregates:
+    """Test the aggregates computed while parsing"""
+
+    def test_routine_and_pillar_aggregates(self):
+        event = WebhookPayload.of(PAYLOAD)
+        movement, sleep = event.pillar_completion_stats
+        walk, stretch, swim = movement.routine_completions
+
+        assert (walk.total_completions, walk.latest_month_completion) == (15, 6)
+        assert (stretch.id, stretch.latest_month_completion) == (2, 0)
+        assert not swim.has_completion_data
+        assert movement.routines_with_data == 2
+        assert movement.total_completions == 16
+        assert movement.month_completed == 6
+        assert movement.completion_by_period == {'week': {1: 2, 2: 4}, 'month': {1: 4, 2: 6}}
+        assert movement.engagement_rate == pytest.approx(2 / 3)
+        assert (sleep.engagement_rate, sleep.month_completed) == (0, 0)
+
+    def test_built_from_field_names(self):
+        pillar = PillarCompletionStats(
+            pillar_enum="STRESS",
+            routine_completions=[
+                RoutineCompletion(completion_statistics=[
+                    CompletionStatistic(completion_rate=3, completion_rate_period_unit="MONTH", period_sequence_no=1)
+                ]),
+                RoutineCompletion(completion_statistics=[
+                    CompletionStatistic(completion_rate=2, completion_rate_period_unit="MONTH", period_sequence_no=1)
+                ])
+            ]
+        )
+        assert pillar.month_completed == 5
+        assert WebhookPayload().pillar_completion_stats == []
+
+    def test_statistics_keep_the_payload_shape(self, sample):
+        routine = sample['pillarCompletionStats'][0]['routineCompletionStats'][0]
+        parsed = WebhookPayload.of(sample).pillar_completion_stats[0].routine_completions[0]
+        assert parsed.raw_statistics() == routine['completionStatistics']
+
+    def test_statistics_keep_undeclared_fields(self):
+        stat = dict(_stat(2, 'WEEK', 1), streakDays=4, source='watch')
+        payload = {'pillarCompletionStats': [{'routineCompletionStats': [{'completionStatistics': [stat]}]}]}
+        parsed = WebhookPayload.of(payload).pillar_completion_stats[0].routine_completions[0]
+        assert parsed.raw_statistics() == [stat]
+
+    def test_invalid_payload(self):
+        invalid = {'pillarCompletionStats': [{'routineCompletionStats': [{'completionStatistics': [{'completionRate': 'all'}]}]}]}
+        with pytest.raises(ValidationError):
+            WebhookPayload.of(invalid)
+        assert process_event_data({'eventPayload': invalid}) == (None, None)
+
+
+class TestSharedPayload:
+    """Test that the services read the parsed payload the same as the raw one"""
+
+    def test_parsed_once(self, sample):
+        payload, event = process_event_data({'eventPayload': json.dumps(sample)})
+        assert payload == sample
+        assert WebhookPayload.of(event) is event
+
+    def test_services_match_raw_payload(self, sample):
+        event = WebhookPayload.of(sample)
+        old_plan = {'routines': [{'routineUniqueId': 461}, {'routineId': 2}]}
+
+        assert HealthScoreService.extract_completions_by_pillar(event) == \
+            HealthScoreService.extract_completions_by_pillar(sample)
+        assert ActionPlanService.print_matching_routine_details(event, old_plan) == \
+            ActionPlanService.print_matching_routine_details(sample, old_plan)
+
+        from_event = EventProcessor().process_completion_event(event)
+        from_raw = EventProcessor().process_completion_event(sample)
+        from_event.pop('timestamp'), from_raw.pop('timestamp')
+        assert from_event == from_raw
+
+    def test_completions_by_pillar(self):
+        assert HealthScoreService.extract_completions_by_pillar(PAYLOAD) == {
+            'MOVEMENT': {'completed': 6}, 'SLEEP': {'completed': 0}
+        }
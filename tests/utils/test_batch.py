@@ -0,0 +1,127 @@
+"""Tests for batch event endpoints"""
+
+import json
+import threading
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+from src.analytics import AnalyticsService
+from src.api.routes import analytics_endpoint, event_route
+from src.utils import batch
+from src.utils import cache as cache_module
+
+FIXTURES = Path(__file__).parent.parent / "fixtures"
+
+
+@pytest.fixture
+def event():
+    with open(FIXTURES / "event_payload_sample.json") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, '_caches', {})
+    monkeypatch.setattr(cache_module.Config, 'CACHE_DB_PATH', str(tmp_path / "cache.db"))
+    monkeypatch.setattr(cache_module.Config, 'ANALYTICS_DB_PATH', str(tmp_path / "analytics.db"))
+    monkeypatch.setattr(analytics_endpoint, 'analytics_service', AnalyticsService())
+    app = Flask(__name__)
+    app.register_blueprint(analytics_endpoint.analytics_endpoint_bp)
+    app.register_blueprint(event_route.event_bp)
+    return app.test_client()
+
+
+class TestRunBatch:
+    """Test running batch items on the shared pool"""
+
+    def test_results_in_request_order(self):
+        def handler(item):
+            if item == 'boom':
+                raise RuntimeError("boom")
+            return {"item": item}, 400 if item == 'bad' else 200
+
+        result = batch.run_batch(handler, ['a', 'boom', 'bad', 'b'])
+        assert [r['status'] for r in result['results']] == [200, 500, 400, 200]
+        assert [r['index'] for r in result['results']] == [0, 1, 2, 3]
+        assert result['results'][1]['result'] == {"error": "boom"}
+        assert (result['succeeded'], result['failed']) == (2, 2)
+
+    def test_items_run_concurrently(self, monkeypatch):
+        monkeypatch.setattr(batch.Config, 'MAX_WORKERS', 3)
+        monkeypatch.setattr(batch, '_executor', None)
+        barrier = threading.Barrier(3, timeout=5)
+
+        def handler(item):
+            barrier.wait()
+            return {}, 200
+
+        assert batch.run_batch(handler, [1, 2, 3])['succeeded'] == 3
+
+    def test_unfinished_items_time_out(self, monkeypatch):
+        monkeypatch.setattr(batch.Config, 'MAX_WORKERS', 1)
+        monkeypatch.setattr(batch, '_executor', None)
+        release = threading.Event()
+        started = []
+
+        def handler(item):
+            started.append(item)
+            if item == 'slow':
+                release.wait(5)
+            return {"item": item}, 200
+
+        try:
+            result = batch.run_batch(handler, ['slow', 'queued'], timeout=0.1)
+        finally:
+            release.set()
+        assert [r['status'] for r in result['results']] == [504, 504]
+        assert (result['succeeded'], result['failed']) == (0, 2)
+        batch.get_batch_executor().shutdown(wait=True)
+        # The queued item was cancelled instead of running after the response
+        assert started == ['slow']
+
+    def test_parse_batch(self, monkeypatch):
+        monkeypatch.setattr(batch.Config, 'EVENT_BATCH_MAX_SIZE', 2)
+        assert batch.parse_batch([{}, {}]) == ([{}, {}], None)
+        assert batch.parse_batch({'events': [{}]}) == ([{}], None)
+        assert batch.parse_batch([])[1] == "No events provided"
+        assert batch.parse_batch({'eventPayload': {}})[1]
+        assert batch.parse_batch([{}, {}, {}])[1] == "At most 2 events per batch, got 3"
+
+
+class TestBatchEndpoints:
+    """Test the batch routes return per-item results"""
+
+    def test_analytics_batch_matches_single_calls(self, client, event):
+        other = dict(event, accountId=event['accountId'] + 1)
+        response = client.post('/api/analytics/events/batch', json=[event, {'accountId': 1}, other])
+
+        assert response.status_code == 200
+        body = response.get_json()
+        assert (body['succeeded'], body['failed']) == (2, 1)
+        first, missing, second = body['results']
+        assert first['result']['account_id'] == event['accountId']
+        assert second['result']['account_id'] == event['accountId'] + 1
+        assert missing['status'] == 400
+        assert 'Missing required fields' in missing['result']['error']
+
+        single = client.post('/api/analytics/event', json=event).get_json()
+        assert single.keys() == first['result'].keys()
+
+    def test_event_batch_uses_request_host(self, client, monkeypatch):
+        calls = []
+
+        def handle_event(data, host, debug=False):
+            calls.append((data['n'], host))
+            return {"n": data['n']}, 200
+
+        monkeypatch.setattr(event_route, 'handle_event', handle_event)
+        response = client.post('/event/batch', json={'events': [{'n': 1}, {'n': 2}]}, base_url='http://dev.example')
+
+        assert [r['result']['n'] for r in response.get_json()['results']] == [1, 2]
+        assert sorted(calls) == [(1, 'dev.example'), (2, 'dev.example')]
+
+    def test_rejects_non_array(self, client):
+        assert client.post('/event/batch', json={'eventEnum': 'RENEW_ACTION_PLAN'}).status_code == 400
+        assert client.post('/api/analytics/events/batch', data="nope").status_code == 400
@@ -0,0 +1,141 @@
+"""Tests for the pluggable cache layer"""
+
+import pytest
+from unittest.mock import patch
+
+from src.utils import cache as cache_module
+from src.utils.cache import (
+    Cache, MemoryCacheBackend, SQLiteCacheBackend, NullCacheBackend,
+    get_cache, invalidate, cache_stats
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, '_caches', {})
+    monkeypatch.setattr(cache_module.Config, 'CACHE_DB_PATH', str(tmp_path / "cache.db"))
+
+
+class TestMemoryCacheBackend:
+    """Test the in-process LRU + TTL backend"""
+
+    def test_lru_eviction(self):
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.set("a", 1, None)
+        backend.set("b", 2, None)
+        backend.get("a")
+        backend.set("c", 3, None)
+
+        assert backend.get("a") == (True, 1)
+        assert backend.get("b") == (False, None)
+        assert backend.size() == 2
+
+    def test_ttl_expiry(self):
+        backend = MemoryCacheBackend()
+        with patch.object(cache_module.time, 'monotonic', return_value=100.0):
+            backend.set("a", 1, 10)
+        with patch.object(cache_module.time, 'monotonic', return_value=109.0):
+            assert backend.get("a") == (True, 1)
+        with patch.object(cache_module.time, 'monotonic', return_value=111.0):
+            assert backend.get("a") == (False, None)
+
+
+class TestSQLiteCacheBackend:
+    """Test the backend shared across worker processes"""
+
+    def test_entries_visible_to_other_instances(self, tmp_path):
+        path = str(tmp_path / "shared.db")
+        writer = SQLiteCacheBackend(path, "strapi")
+        reader = SQLiteCacheBackend(path, "strapi")
+        other_namespace = SQLiteCacheBackend(path, "typeform")
+
+        writer.set("k", {"data": [1, 2]}, None)
+
+        assert reader.get("k") == (True, {"data": [1, 2]})
+        assert other_namespace.get("k") == (False, None)
+
+    def test_size_limit_evicts_least_recently_used(self, tmp_path):
+        backend = SQLiteCacheBackend(str(tmp_path / "shared.db"), "ns", max_entries=2)
+        with patch.object(cache_module.time, 'time', side_effect=[1.0, 2.0, 3.0, 4.0]):
+            backend.set("a", 1, None)
+            backend.set("b", 2, None)
+            backend.get("a")
+            backend.set("c", 3, None)
+
+        assert backend.size() == 2
+        assert backend.get("b") == (False, None)
+        assert backend.get("a") == (True, 1)
+
+    def test_expired_entries_are_misses(self, tmp_path):
+        backend = SQLiteCacheBackend(str(tmp_path / "shared.db"), "ns")
+        with patch.object(cache_module.time, 'time', return_value=100.0):
+            backend.set("a", 1, 5)
+        with patch.object(cache_module.time, 'time', return_value=106.0):
+            assert backend.get("a") == (False, None)
+        assert backend.size() == 0
+
+
+class TestCache:
+    """Test the namespaced cache front-end"""
+
+    def test_hit_miss_counters(self):
+        cache = Cache("ns", MemoryCacheBackend())
+        cache.get("missing")
+        cache.set("present", 1)
+        cache.get("present")
+
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 0.5
+        assert stats['entries'] == 1
+
+    def test_get_or_set_does_not_cache_none(self):
+        cache = Cache("ns", MemoryCacheBackend())
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return None
+
+        cache.get_or_set("k", factory)
+        cache.get_or_set("k", factory)
+
+        assert len(calls) == 2
+
+    def test_invalidation_hooks(self):
+        cache = Cache("ns", MemoryCacheBackend())
+        events = []
+        cache.on_invalidate(lambda namespace, key: events.append((namespace, key)))
+
+        cache.set("k", 1)
+        cache.delete("k")
+        cache.clear()
+
+        assert events == [("ns", "k"), ("ns", None)]
+        assert cache.get("k") is None
+
+
+class TestRegistry:
+    """Test get_cache and the module-level helpers"""
+
+    def test_same_namespace_returns_same_cache(self):
+        assert get_cache("ns") is get_cache("ns")
+        assert isinstance(get_cache("shared-ns", backend="shared").backend, SQLiteCacheBackend)
+
+    def test_disabled_caching_uses_null_backend(self, monkeypatch):
+        monkeypatch.setattr(cache_module.Config, 'ENABLE_CACHING', False)
+        cache = get_cache("ns")
+        cache.set("k", 1)
+
+        assert isinstance(cache.backend, NullCacheBackend)
+        assert cache.get("k") is None
+
+    def test_invalidate_and_stats(self):
+        cache = get_cache("ns", ttl=None)
+        cache.set("k", 1)
+        invalidate("ns", "k")
+        invalidate("unknown-namespace")
+
+        assert cache.get("k") is None
+        assert cache_stats()["ns"]["misses"] == 1
@@ -0,0 +1,185 @@
+"""Tests for the durable write outbox"""
+
+import time
+
+import pytest
+from unittest.mock import MagicMock
+
+from src.utils import outbox as outbox_module
+from src.utils.outbox import Outbox, PermanentDeliveryError, RateLimiter
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox_module, '_handlers', {})
+    box = Outbox(str(tmp_path / "outbox.db"), max_attempts=3, rate_per_second=0)
+    yield box
+    box.stop()
+
+
+def _make_due(box):
+    box._connect().execute("UPDATE outbox_messages SET next_attempt_at = 0")
+
+
+class TestOutboxDelivery:
+    """Test claiming and delivering queued messages"""
+
+    def test_delivered_message_is_removed(self, outbox):
+        handler = MagicMock()
+        outbox_module.register_handler("plan", handler)
+        outbox.enqueue("plan", {"id": 1}, "production")
+
+        assert outbox.process_due() == 1
+
+        handler.assert_called_once_with({"id": 1}, "production")
+        stats = outbox.stats()
+        assert stats['pending'] == 0
+        assert stats['delivered'] == 1
+        assert stats['delivery_latency_seconds']['p50'] is not None
+
+    def test_messages_survive_a_new_outbox_instance(self, outbox, tmp_path):
+        outbox.enqueue("plan", {"id": 1}, "production")
+        handler = MagicMock()
+        outbox_module.register_handler("plan", handler)
+
+        reopened = Outbox(outbox.path, rate_per_second=0)
+        assert reopened.process_due() == 1
+        handler.assert_called_once()
+
+    def test_batch_size_limits_one_claim(self, outbox):
+        outbox_module.register_handler("plan", MagicMock())
+        outbox.batch_size = 2
+        for i in range(3):
+            outbox.enqueue("plan", {"id": i}, "production")
+
+        assert outbox.process_due() == 2
+        assert outbox.process_due() == 1
+        assert outbox.process_due() == 0
+
+    def test_stale_claim_is_reclaimed(self, outbox):
+        outbox_module.register_handler("plan", MagicMock())
+        outbox.enqueue("plan", {"id": 1}, "production")
+        outbox._connect().execute(
+            "UPDATE outbox_messages SET status = ?, claimed_at = ?",
+            (outbox_module.IN_FLIGHT, time.time() - outbox_module.CLAIM_TIMEOUT - 1)
+        )
+
+        assert outbox.process_due() == 1
+
+    def test_background_sender_delivers(self, outbox):
+        handler = MagicMock()
+        outbox_module.register_handler("plan", handler)
+        outbox.start()
+        outbox.enqueue("plan", {"id": 1}, "production")
+
+        deadline = time.time() + 5
+        while handler.call_count == 0 and time.time() < deadline:
+            time.sleep(0.01)
+
+        handler.assert_called_once()
+
+
+class TestOutboxFailures:
+    """Test retries, backoff and dead-lettering"""
+
+    def test_transient_failure_is_retried_with_backoff(self, outbox):
+        outbox_module.register_handler("plan", MagicMock(side_effect=RuntimeError("503")))
+        outbox.enqueue("plan", {"id": 1}, "production")
+
+        outbox.process_due()
+
+        assert outbox.stats()['pending'] == 1
+        assert outbox.process_due() == 0  # not due until the backoff expires
+        next_attempt_at, attempts = outbox._connect().execute(
+            "SELECT next_attempt_at, attempts FROM outbox_messages"
+        ).fetchone()
+        assert attempts == 1
+        assert next_attempt_at > time.time()
+
+    def test_dead_lettered_after_max_attempts(self, outbox):
+        outbox_module.register_handler("plan", MagicMock(side_effect=RuntimeError("503")))
+        outbox.enqueue("plan", {"id": 1}, "production")
+
+        for _ in range(outbox.max_attempts):
+            _make_due(outbox)
+            outbox.process_due()
+
+        stats = outbox.stats()
+        assert stats['dead'] == 1
+        assert stats['retried'] == outbox.max_attempts - 1
+        assert outbox.dead_letters()[0]['last_error'] == "503"
+
+    def test_permanent_failure_skips_retries(self, outbox):
+        outbox_module.register_handler("plan", MagicMock(side_effect=PermanentDeliveryError("400")))
+        outbox.enqueue("plan", {"id": 1}, "production")
+
+        outbox.process_due()
+
+        assert outbox.dead_letters()[0]['attempts'] == 1
+
+    def test_requeue_dead(self, outbox):
+        outbox.enqueue("unknown", {"id": 1}, "production")
+        outbox.process_due()
+        assert outbox.stats()['dead'] == 1
+
+        outbox_module.register_handler("unknown", MagicMock())
+        assert outbox.requeue_dead() == 1
+        assert outbox.process_due() == 1
+        assert outbox.stats()['dead'] == 0
+
+
+class TestOutboxOrdering:
+    """Test that messages with the same ordering key never overtake each other"""
+
+    def test_newer_message_supersedes_pending_one(self, outbox):
+        handler = MagicMock()
+        outbox_module.register_handler("plan", handler)
+        outbox.enqueue("plan", {"id": 1}, "production", ordering_key="plan:494")
+        outbox.enqueue("plan", {"id": 2}, "production", ordering_key="plan:494")
+        outbox.enqueue("plan", {"id": 3}, "production", ordering_key="plan:495")
+
+        assert outbox.process_due() == 2
+        assert [c.args[0] for c in handler.call_args_list] == [{"id": 2}, {"id": 3}]
+        assert outbox.stats()['superseded'] == 1
+
+    def test_key_in_flight_is_not_claimed(self, outbox):
+        outbox_module.register_handler("plan", MagicMock())
+        outbox.enqueue("plan", {"id": 1}, "production", ordering_key="plan:494")
+        outbox._connect().execute(
+            "UPDATE outbox_messages SET status = ?, claimed_at = ?", (outbox_module.IN_FLIGHT, time.time())
+        )
+        outbox.enqueue("plan", {"id": 2}, "production", ordering_key="plan:494")
+
+        assert outbox.has_pending("plan:494")
+        assert outbox.process_due() == 0
+
+    def test_failed_message_is_dropped_when_a_newer_one_is_queued(self, outbox):
+        def fail_after_newer_write(payload, environment):
+            if payload["id"] == 1:
+                outbox.enqueue("plan", {"id": 2}, "production", ordering_key="plan:494")
+                raise RuntimeError("503")
+
+        handler = MagicMock(side_effect=fail_after_newer_write)
+        outbox_module.register_handler("plan", handler)
+        outbox.enqueue("plan", {"id": 1}, "production", ordering_key="plan:494")
+
+        outbox.process_due()
+        _make_due(outbox)
+        outbox.process_due()
+
+        assert [c.args[0] for c in handler.call_args_list] == [{"id": 1}, {"id": 2}]
+        stats = outbox.stats()
+        assert stats['pending'] == 0
+        assert stats['superseded'] == 1
+
+
+class TestRateLimiter:
+    """Test the token bucket"""
+
+    def test_waits_once_burst_is_spent(self):
+        limiter = RateLimiter(rate_per_second=20, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.acquire()
+
+        assert time.monotonic() - start >= 0.09
@@ -0,0 +1,77 @@
+"""Tests for request coalescing"""
+
+import threading
+import time
+
+import pytest
+
+from src.utils.singleflight import SingleFlight
+
+
+def _run_concurrently(count, target):
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results, errors
+
+
+class TestSingleFlight:
+    """Test SingleFlight.do"""
+
+    def test_concurrent_callers_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            release.wait(timeout=5)
+            return {"data": [1]}
+
+        def call():
+            return flight.do("key", fetch)
+
+        timer = threading.Timer(0.2, release.set)
+        timer.start()
+        results, errors = _run_concurrently(5, call)
+
+        assert len(calls) == 1
+        assert errors == [None] * 5
+        assert all(result == {"data": [1]} for result in results)
+        assert len({id(result) for result in results}) == 5
+        assert flight.stats() == {'in_flight': 0, 'executed': 1, 'coalesced': 4}
+
+    def test_error_propagates_to_followers(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def fetch():
+            release.wait(timeout=5)
+            raise RuntimeError("strapi down")
+
+        timer = threading.Timer(0.2, release.set)
+        timer.start()
+        results, errors = _run_concurrently(3, lambda: flight.do("key", fetch))
+
+        assert all(isinstance(error, RuntimeError) for error in errors)
+
+    def test_sequential_calls_are_not_coalesced(self):
+        flight = SingleFlight()
+        calls = []
+
+        flight.do("key", lambda: calls.append(1))
+        flight.do("key", lambda: calls.append(1))
+
+        assert len(calls) == 2
+        assert flight.stats()['coalesced'] == 0
@@ -0,0 +1,146 @@
+"""Tests for Strapi reads and writes"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from src.utils import outbox as outbox_module
+from src.utils import strapi_api
+
+
+PLAN_RESPONSE = {"data": [{"id": 1, "attributes": {"actionPlanUniqueId": "plan-1", "routines": []}}]}
+SCORES_RESPONSE = {"data": [{"id": 7, "attributes": {"accountId": 494}}]}
+
+
+def _response(json_data):
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = json_data
+    return response
+
+
+@pytest.fixture(autouse=True)
+def isolated_outbox(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox_module, '_outbox', outbox_module.Outbox(str(tmp_path / "outbox.db"), rate_per_second=0))
+    monkeypatch.setattr(strapi_api, '_inline_paused_until', 0.0)
+
+
+class TestStrapiReads:
+    """Test that per-account Strapi reads are not cached across requests"""
+
+    def test_every_read_goes_to_strapi(self):
+        with patch.object(strapi_api.requests.Session, 'get', return_value=_response(PLAN_RESPONSE)) as mock_get:
+            first = strapi_api.strapi_get_old_action_plan("plan-1", "localhost")
+            attributes = strapi_api.strapi_get_action_plan("plan-1", "localhost")
+
+        assert mock_get.call_count == 2
+        assert first == PLAN_RESPONSE
+        assert attributes["actionPlanUniqueId"] == "plan-1"
+
+    def test_read_after_write_sees_the_write(self):
+        updated = {"data": [{"id": 7, "attributes": {"accountId": 494, "score": 80}}]}
+        with patch.object(strapi_api.requests.Session, 'get',
+                          side_effect=[_response(SCORES_RESPONSE), _response(updated)]), \
+             patch.object(strapi_api.requests.Session, 'post', return_value=_response({})):
+            strapi_api.strapi_get_health_scores(494, "localhost")
+            strapi_api.strapi_post_health_scores({"data": {"accountId": 494, "score": 80}}, "production")
+            assert strapi_api.strapi_get_health_scores(494, "localhost") == updated
+
+
+class TestStrapiReadCoalescing:
+    """Test that concurrent identical reads share one request"""
+
+    def test_concurrent_health_score_reads(self):
+        import threading
+
+        release = threading.Event()
+
+        def slow_get(*args, **kwargs):
+            release.wait(timeout=5)
+            return _response({"data": []})
+
+        results = []
+        with patch.object(strapi_api.requests.Session, 'get', side_effect=slow_get) as mock_get:
+            threads = [
+                threading.Thread(target=lambda: results.append(strapi_api.strapi_get_health_scores(494, "localhost")))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            threading.Timer(0.2, release.set).start()
+            for thread in threads:
+                thread.join(timeout=5)
+
+        assert mock_get.call_count == 1
+        assert results == [{"data": []}] * 4
+
+
+class TestStrapiWrites:
+    """Test that Strapi writes are delivered inline, with the outbox for retries"""
+
+    def test_post_is_delivered_before_returning(self):
+        plan = {"data": {"actionPlanUniqueId": "plan-1"}}
+        with patch.object(strapi_api.requests.Session, 'post', return_value=_response({})) as mock_post:
+            strapi_api.strapi_post_action_plan(plan, 494, "development")
+
+        assert mock_post.call_args.args[0] == strapi_api.DEV_ACTION_PLAN_ENDPOINT
+        assert mock_post.call_args.kwargs['json'] == plan
+        assert mock_post.call_args.kwargs['timeout'] == strapi_api.Config.STRAPI_INLINE_TIMEOUT
+        assert outbox_module._outbox.stats()['pending'] == 0
+
+    def test_unavailable_strapi_queues_for_retry(self):
+        plan = {"data": {"actionPlanUniqueId": "plan-1"}}
+        unavailable = _response({})
+        unavailable.status_code = 503
+        with patch.object(strapi_api.requests.Session, 'post', return_value=unavailable):
+            strapi_api.strapi_post_action_plan(plan, 494, "production")
+        assert outbox_module._outbox.stats()['pending'] == 1
+
+        with patch.object(strapi_api.requests.Session, 'post', return_value=_response({})) as mock_post:
+            assert outbox_module._outbox.process_due() == 1
+
+        assert mock_post.call_args.args[0] == strapi_api.STAGING_ACTION_PLAN_ENDPOINT
+        assert outbox_module._outbox.stats()['pending'] == 0
+
+    def test_client_error_is_not_retried(self):
+        rejected = _response({})
+        rejected.status_code = 400
+        rejected.text = "ValidationError"
+
+        with patch.object(strapi_api.requests.Session, 'post', return_value=rejected) as mock_post:
+            strapi_api.strapi_post_health_scores({"data": {"accountId": 494}}, "production")
+
+        mock_post.assert_called_once()
+        assert outbox_module._outbox.stats()['pending'] == 0
+
+    def test_no_outbox_when_async_disabled(self, monkeypatch):
+        monkeypatch.setattr(strapi_api.Config, 'USE_ASYNC_PROCESSING', False)
+        with patch.object(strapi_api.requests.Session, 'post', side_effect=ConnectionError("down")) as mock_post:
+            strapi_api.strapi_post_health_scores({"data": {"accountId": 494}}, "production")
+
+        mock_post.assert_called_once()
+        assert outbox_module._outbox.stats()['pending'] == 0
+
+    def test_writes_skip_inline_delivery_after_a_failure(self):
+        with patch.object(strapi_api.requests.Session, 'post', side_effect=ConnectionError("down")) as mock_post:
+            strapi_api.strapi_post_health_scores({"data": {"accountId": 494}}, "production")
+            strapi_api.strapi_post_health_scores({"data": {"accountId": 495}}, "production")
+
+        mock_post.assert_called_once()
+        assert outbox_module._outbox.stats()['pending'] == 2
+
+    def test_write_is_queued_behind_an_older_one(self, monkeypatch):
+        unavailable = _response({})
+        unavailable.status_code = 503
+        with patch.object(strapi_api.requests.Session, 'post', return_value=unavailable):
+            strapi_api.strapi_post_action_plan({"data": {"actionPlanUniqueId": "plan-1"}}, 494, "production")
+        monkeypatch.setattr(strapi_api, '_inline_paused_until', 0.0)
+
+        newer = {"data": {"actionPlanUniqueId": "plan-2"}}
+        with patch.object(strapi_api.requests.Session, 'post', return_value=_response({})) as mock_post:
+            strapi_api.strapi_post_action_plan(newer, 494, "production")
+            strapi_api.strapi_post_action_plan({"data": {"actionPlanUniqueId": "other"}}, 495, "production")
+            assert mock_post.call_count == 1  # only the other account's write went inline
+            assert outbox_module._outbox.process_due() == 1
+
+        assert mock_post.call_args.kwargs['json'] == newer
+        assert outbox_module._outbox.stats()['pending'] == 0
@@ -0,0 +1,155 @@
+"""Tests for the cached Typeform form definition"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from src.utils import typeform_api
+from src.utils.typeform_api import (
+    get_field_mapping, get_field_table, process_latest_response,
+    invalidate_form_cache, TypeformField
+)
+
+
+FORM_DEFINITION = {
+    "fields": [
+        {"id": "f_sleep", "title": "Wie ist deine Schlafqualität?", "type": "multiple_choice",
+         "properties": {"allow_multiple_selection": False}},
+        {"id": "f_problems", "title": "Welche Schlafprobleme hast du?", "type": "multiple_choice",
+         "properties": {"allow_multiple_selection": True}},
+        {"id": "f_weight", "title": "Wie viel wiegst du (in kg)?", "type": "number"},
+        {"id": "7RNIAzXy1eCa", "title": "Wie heißt du?", "type": "short_text"}
+    ]
+}
+
+RESPONSES = {
+    "items": [{
+        "submitted_at": "2025-01-01T10:00:00Z",
+        "hidden": {"accountid": "494"},
+        "answers": [
+            {"field": {"id": "f_sleep"}, "type": "choice", "choice": {"label": "gut"}},
+            {"field": {"id": "f_problems"}, "type": "choices", "choices": {"labels": ["Einschlafen", "Durchschlafen"]}},
+            {"field": {"id": "f_weight"}, "type": "number", "number": 80},
+            {"field": {"id": "7RNIAzXy1eCa"}, "type": "text", "text": "Max"},
+            {"field": {"id": "f_missing"}, "type": "email", "email": "a@b.de"}
+        ]
+    }]
+}
+
+
+def _response(status_code, json_data=None, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = json_data
+    response.headers = headers or {}
+    return response
+
+
+@pytest.fixture(autouse=True)
+def clear_form_cache():
+    invalidate_form_cache()
+    yield
+    invalidate_form_cache()
+
+
+class TestFormDefinitionCache:
+    """Test TTL caching of the form definition"""
+
+    def test_form_fetched_once_within_ttl(self):
+        with patch.object(typeform_api.requests, 'get',
+                          return_value=_response(200, FORM_DEFINITION, {"ETag": "v1"})) as mock_get:
+            first = get_field_mapping("production")
+            second = get_field_mapping("production")
+
+        assert mock_get.call_count == 1
+        assert first == second
+        assert first["f_weight"] == "Wie viel wiegst du (in kg)?"
+
+    def test_failed_fetch_is_not_cached(self):
+        with patch.object(typeform_api.requests, 'get', return_value=_response(500)) as mock_get:
+            assert get_field_mapping("production") is None
+            assert get_field_mapping("production") is None
+
+        assert mock_get.call_count == 2
+
+    def test_revalidation_sends_validators_and_keeps_table_on_304(self):
+        with patch.object(typeform_api.requests, 'get',
+                          return_value=_response(200, FORM_DEFINITION,
+                                                 {"ETag": "v1", "Last-Modified": "Mon, 01 Jan 2025 00:00:00 GMT"})):
+            table = get_field_table("production")
+
+        form_id, form_url = typeform_api._get_form_target("production")
+        cached = typeform_api._form_cache.get(form_id)
+        cached.fetched_at -= typeform_api.Config.CACHE_TTL + 1
+        assert cached.is_stale()
+
+        with patch.object(typeform_api.requests, 'get', return_value=_response(304)) as mock_get:
+            typeform_api._refresh_form(form_id, form_url, cached)
+
+        sent_headers = mock_get.call_args.kwargs['headers']
+        assert sent_headers['If-None-Match'] == "v1"
+        assert sent_headers['If-Modified-Since'] == "Mon, 01 Jan 2025 00:00:00 GMT"
+        assert typeform_api._form_cache.get(form_id).table is table
+        assert not typeform_api._form_cache.get(form_id).is_stale()
+
+    def test_stale_entry_served_while_refreshing_in_background(self):
+        with patch.object(typeform_api.requests, 'get', return_value=_response(200, FORM_DEFINITION)):
+            table = get_field_table("production")
+
+        form_id, _ = typeform_api._get_form_target("production")
+        typeform_api._form_cache.get(form_id).fetched_at -= typeform_api.Config.CACHE_TTL + 1
+
+        with patch.object(typeform_api.threading, 'Thread') as mock_thread:
+            assert get_field_table("production") is table
+            assert get_field_table("production") is table
+
+        mock_thread.assert_called_once()
+        mock_thread.return_value.start.assert_called_once()
+
+    def test_failed_refresh_allows_the_next_one(self):
+        with patch.object(typeform_api.requests, 'get', return_value=_response(200, FORM_DEFINITION)):
+            table = get_field_table("production")
+
+        form_id, form_url = typeform_api._get_form_target("production")
+        cached = typeform_api._form_cache.get(form_id)
+        cached.fetched_at -= typeform_api.Config.CACHE_TTL + 1
+        cached.refreshing = True
+
+        with patch.object(typeform_api.requests, 'get',
+                          side_effect=typeform_api.requests.Timeout("read timed out")) as mock_get:
+            typeform_api._refresh_form(form_id, form_url, cached)
+
+        assert mock_get.call_args.kwargs['timeout'] == typeform_api.Config.REQUEST_TIMEOUT
+        assert not cached.refreshing
+        assert typeform_api._form_cache.get(form_id).table is table
+
+
+class TestCompiledFieldTable:
+    """Test the precompiled field table"""
+
+    def test_table_entries(self):
+        table = typeform_api.compile_field_table(FORM_DEFINITION["fields"])
+
+        assert table["f_sleep"] == TypeformField(
+            label="Wie ist deine Schlafqualität?", pillar="sleep",
+            answer_type="choice", parse=typeform_api.ANSWER_PARSERS["choice"]
+        )
+        assert table["f_problems"].answer_type == "choices"
+        assert table["f_weight"].pillar == "nutrition"
+        assert table["7RNIAzXy1eCa"].label == "Vorname"
+
+    def test_compiled_table_matches_plain_mapping(self):
+        table = typeform_api.compile_field_table(FORM_DEFINITION["fields"])
+        mapping = {field["id"]: field["title"] for field in FORM_DEFINITION["fields"]}
+
+        from_table = process_latest_response(RESPONSES, table)
+        from_mapping = process_latest_response(RESPONSES, mapping)
+
+        assert from_table == from_mapping
+        assert from_table == {
+            "accountid": "494",
+            "Wie ist deine Schlafqualität?": "gut",
+            "Welche Schlafprobleme hast du?": "Einschlafen, Durchschlafen",
+            "Wie viel wiegst du (in kg)?": 80,
+            "Vorname": "Max",
+            "Unknown Field (f_missing)": "Unknown Type"
+        }
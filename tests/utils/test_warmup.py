@@ -0,0 +1,42 @@
+"""Tests for lazy loading of the heavy modules and their background warm-up"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from src.utils.warmup import warm_imports
+
+ROOT = Path(__file__).parent.parent.parent
+
+
+class TestLazyImports:
+    """Test that booting the app leaves the heavy modules for first use"""
+
+    def test_app_import_skips_heavy_modules(self, tmp_path):
+        check = (
+            "import sys, src.app; "
+            "print(' '.join(m for m in ('numpy', 'scipy', 'src.analytics.analytics_service',"
+            " 'src.scheduling.scheduler') if m in sys.modules))"
+        )
+        env = dict(os.environ, PYTHONPATH=str(ROOT), FLASK_ENV='testing')
+        result = subprocess.run(
+            [sys.executable, "-c", check], cwd=tmp_path, env=env, capture_output=True, text=True, check=True
+        )
+        assert result.stdout.strip() == ""
+
+    def test_package_exports_load_on_access(self):
+        import src.analytics as analytics
+        from src.analytics.trend_analyzer import TrendAnalyzer
+
+        assert analytics.TrendAnalyzer is TrendAnalyzer
+        assert 'get_analytics_service' in dir(analytics)
+
+
+class TestWarmImports:
+    """Test the background warm-up"""
+
+    def test_imports_and_times_modules(self):
+        timings = warm_imports(('json', 'no_such_module_for_warmup'))
+        assert list(timings) == ['json']
+        assert timings['json'] >= 0
@@ -0,0 +1,76 @@
+"""Tests for the bounded worker pool"""
+
+import operator
+import threading
+
+import pytest
+
+from src.utils.worker_pool import BoundedWorkerPool
+
+
+@pytest.fixture
+def thread_pool():
+    pool = BoundedWorkerPool(max_workers=1, max_queue=1, use_processes=False)
+    yield pool
+    pool.shutdown()
+
+
+class TestBoundedWorkerPool:
+    """Test queueing, shedding and counters"""
+
+    def test_sheds_when_queue_is_full(self, thread_pool):
+        release = threading.Event()
+        running = thread_pool.submit(release.wait, 5)
+        queued = thread_pool.submit(operator.add, 1, 2)
+        shed = thread_pool.submit(operator.add, 3, 4)
+
+        stats = thread_pool.stats()
+        assert shed is None
+        assert stats['shed'] == 1
+        assert stats['running'] == 1
+        assert stats['queue_depth'] == 1
+
+        release.set()
+        assert running.result(timeout=5) is True
+        assert queued.result(timeout=5) == 3
+
+    def test_counters_and_timings(self, thread_pool):
+        thread_pool.submit(operator.add, 1, 2).result(timeout=5)
+        failing = thread_pool.submit(operator.truediv, 1, 0)
+        with pytest.raises(ZeroDivisionError):
+            failing.result(timeout=5)
+
+        stats = thread_pool.stats()
+        assert stats['submitted'] == 2
+        assert stats['completed'] == 1
+        assert stats['failed'] == 1
+        assert stats['queue_depth'] == 0
+        assert stats['wait_seconds']['max'] is not None
+        assert stats['run_seconds']['p50'] is not None
+
+    def test_runs_in_worker_processes(self):
+        pool = BoundedWorkerPool(max_workers=1, max_queue=4)
+        try:
+            assert pool.submit(operator.mul, 6, 7).result(timeout=60) == 42
+        finally:
+            pool.shutdown()
+        assert pool.stats()['completed'] == 1
+
+    def test_broken_pool_is_shut_down_and_replaced(self, thread_pool):
+        class BrokenExecutor:
+            def __init__(self):
+                self.shutdown_calls = []
+
+            def submit(self, *args):
+                from concurrent.futures.process import BrokenProcessPool
+                raise BrokenProcessPool("worker died")
+
+            def shutdown(self, **kwargs):
+                self.shutdown_calls.append(kwargs)
+
+        broken = BrokenExecutor()
+        thread_pool._executor = broken
+
+        assert thread_pool.submit(operator.add, 1, 2).result(timeout=5) == 3
+        assert broken.shutdown_calls == [{'wait': False, 'cancel_futures': True}]
+        assert thread_pool._executor is not broken